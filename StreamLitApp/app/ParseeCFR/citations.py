@@ -0,0 +1,236 @@
+import re
+import time
+
+import pandas as pd
+
+# Matches citations such as "12 CFR 1026.5", "12 C.F.R. § 1026.5(b)(1)",
+# "26 CFR 1.401(k)-1", "40 CFR Part 60 Subpart A" and "12 CFR Part 1026,
+# Appendix J".
+CITATION_PATTERN = re.compile(
+    r"""
+    ^(?P<title>\d+)\s*C\.?\s*F\.?\s*R\.?\s*
+    (?:(?:§+|sec(?:tion)?\.?)\s*)?
+    (?:chapter\s+(?P<chapter>[IVXLCDM]+|\d+)\s*,?\s*)?
+    (?:parts?\s+)?
+    (?P<part>\d+[A-Z]?)?
+    (?:\.(?P<section_number>\d+[A-Z0-9\-]*))?
+    (?P<paragraph>(?:\([A-Z0-9]+\))*)
+    (?:(?P<suffix>-\d+[A-Z]?)(?P<suffix_paragraph>(?:\([A-Z0-9]+\))*))?
+    \s*,?\s*
+    (?:subpart\s+(?P<subpart>[A-Z][A-Z0-9\-]*))?
+    \s*,?\s*
+    (?:app(?:endix|\.)\s+(?P<appendix>[A-Z0-9][A-Z0-9\-]*)(?:\s+to\s+part\s+\d+[A-Z]?)?)?
+    $
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Matches lists and ranges of parts or sections, such as "5 CFR parts 2634
+# and 2635", "40 CFR 60.1 through 60.5" and "12 CFR §§ 1026.5, 1026.6".
+ENUMERATION_PATTERN = re.compile(
+    r"""
+    ^(?P<title>\d+)\s*C\.?\s*F\.?\s*R\.?\s*
+    (?P<kind>§+|sec(?:tion)?s?\.?|parts?)?\s*
+    (?P<items>\d.*(?:,|\band\b|\bthrough\b|\bthru\b|\bto\b|–|-).*)$
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+_PART_ITEM = re.compile(r"^\d+[A-Z]?$", re.IGNORECASE)
+_SECTION_ITEM = re.compile(r"^(?P<part>\d+[A-Z]?)\.(?P<number>[A-Z0-9\-()]+)$", re.IGNORECASE)
+_RANGE = {"through", "thru", "to", "-", "–"}
+
+# Ranges of whole part or section numbers spanning at most this many
+# numbers are expanded to each of them; longer ones to their endpoints.
+MAX_RANGE = 100
+
+# Columns that identify a citation's target, from the top of the hierarchy.
+KEY_COLUMNS = ["title", "chapter", "part", "subpart", "section", "appendix"]
+
+def _range(first, last, parts):
+    # Every part or section from first to last, or just the two if they are
+    # not whole numbers of the same part
+    if parts:
+        start, end = first, last
+    else:
+        first_match, last_match = _SECTION_ITEM.match(first), _SECTION_ITEM.match(last)
+        if first_match["part"] != last_match["part"]:
+            return [first, last]
+        start, end = first_match["number"], last_match["number"]
+    if not (start.isdigit() and end.isdigit() and 0 < int(end) - int(start) < MAX_RANGE):
+        return [first, last]
+    prefix = "" if parts else first_match["part"] + "."
+    return [f"{prefix}{number}" for number in range(int(start), int(end) + 1)]
+
+def expand_citation(citation):
+    """
+    Split a list or range of parts or sections into one citation each.
+
+    "5 CFR parts 2634 and 2635" becomes "5 CFR part 2634" and "5 CFR part
+    2635"; "40 CFR 60.1 through 60.3" becomes 60.1, 60.2 and 60.3 (see
+    MAX_RANGE). Anything else, including lists mixing parts and sections,
+    is returned as is.
+
+    Returns:
+        list: Citation strings
+    """
+    match = ENUMERATION_PATTERN.match(citation)
+    if match is None:
+        return [citation]
+    part_kind = (match["kind"] or "").lower().startswith("part")
+    # A hyphen ends a section's number, as in 1.401(k)-1, unless another
+    # section follows it
+    hyphen = "-" if part_kind else r"-(?=\s*\d+[A-Z]?\.)"
+    tokens = re.split(
+        rf"\s*(,\s*and\b|,|\band\b|\bthrough\b|\bthru\b|\bto\b|–|{hyphen})\s*",
+        match["items"], flags=re.IGNORECASE)
+    items, separators = tokens[::2], [token.lower() for token in tokens[1::2]]
+    parts = part_kind or _SECTION_ITEM.match(items[0]) is None
+    item_pattern = _PART_ITEM if parts else _SECTION_ITEM
+    if len(items) < 2 or not all(item_pattern.match(item) for item in items):
+        return [citation]
+
+    targets = [items[0]]
+    for separator, item in zip(separators, items[1:]):
+        if separator in _RANGE:
+            targets.extend(_range(targets.pop(), item, parts))
+        else:
+            targets.append(item)
+    prefix = f"{match['title']} CFR {'part ' if parts else ''}"
+    return [prefix + target for target in targets]
+
+def parse_citations(citations):
+    """
+    Parse CFR citation strings into hierarchy columns.
+
+    Args:
+        citations (list or pandas.Series): Citation strings
+
+    Returns:
+        pandas.DataFrame: citation, the KEY_COLUMNS (empty string where the
+        citation does not name that level), paragraph and valid; a row per
+        citation, or per part or section of a list or range (see
+        expand_citation)
+    """
+    citations = pd.Series(citations, dtype=object).fillna("").astype(str)
+    normalized = citations.str.strip().str.replace(r"\s+", " ", regex=True)
+    enumerations = normalized.str.extract(ENUMERATION_PATTERN)["title"].notna()
+    if enumerations.any():
+        normalized = normalized.where(
+            ~enumerations, normalized[enumerations].map(expand_citation)).explode()
+        citations = citations.loc[normalized.index]
+    parsed = normalized.str.extract(CITATION_PATTERN).fillna("")
+
+    # Section numbers with a suffix, as in 1.401(k)-1, include the
+    # parenthesized part before it, as written
+    section = (parsed["part"] + "." + parsed["section_number"]).str.upper()
+    suffixed = parsed["suffix"] != ""
+    section = section.where(~suffixed, section + parsed["paragraph"] + parsed["suffix"])
+    df = pd.DataFrame({
+        "citation": citations,
+        "title": parsed["title"],
+        "chapter": parsed["chapter"].str.upper(),
+        "part": parsed["part"].str.upper(),
+        "subpart": parsed["subpart"].str.upper(),
+        "section": section.where(parsed["section_number"] != "", ""),
+        "appendix": parsed["appendix"].str.upper(),
+        "paragraph": parsed["paragraph"].where(~suffixed, parsed["suffix_paragraph"]),
+    })
+    df["valid"] = (df["title"] != "") & (
+        df[["chapter", "part", "subpart", "section", "appendix"]] != "").any(axis=1)
+    return df
+
+def _appendix_identifiers(appendix, part):
+    # Structure nodes name appendices in full, e.g. "Appendix J to Part 1026".
+    candidates = [appendix, f"Appendix {appendix}"]
+    if part:
+        candidates.insert(0, f"Appendix {appendix} to Part {part}")
+    return candidates
+
+def _resolve_one(index, key):
+    hierarchy = {
+        level: key[level] or None
+        for level in ["chapter", "part", "subpart", "section"]
+    }
+    if not key["appendix"]:
+        return index.resolve(**hierarchy)
+    for appendix in _appendix_identifiers(key["appendix"], key["part"]):
+        node = index.resolve(appendix=appendix, **hierarchy)
+        if node is not None:
+            return node
+    return None
+
+def resolve_citations(citations, cache, date):
+    """
+    Parse and resolve citations in bulk against cached structure indexes.
+
+    Citations are deduplicated before resolving, and resolved a title at a
+    time, so each title's structure is loaded once and fetched over the
+    network only if the cache does not already hold it.
+
+    Args:
+        citations (list or pandas.Series): Citation strings
+        cache (StructureIndexCache): Cache of structure indexes
+        date (str): Date of the structures, in YYYY-MM-DD format
+
+    Returns:
+        tuple: (resolved, report). resolved has the columns of
+        parse_citations plus resolved, node_type, label and path (the
+        identifiers from the title down to the node, joined by '/').
+        report has counts and throughput of parsing and resolving.
+    """
+    start = time.perf_counter()
+    parsed = parse_citations(citations)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keys = parsed.loc[parsed["valid"], KEY_COLUMNS].drop_duplicates(ignore_index=True)
+    results = []
+    titles_cached = 0
+    titles_fetched = 0
+    for title, group in keys.groupby("title", sort=False):
+        if cache.is_cached(date, title):
+            titles_cached += 1
+        else:
+            titles_fetched += 1
+        try:
+            index = cache.get(date, title)
+        except RuntimeError:
+            index = None
+
+        for key in group.to_dict("records"):
+            node = _resolve_one(index, key) if index is not None else None
+            if node is None:
+                results.append({**key, "resolved": False, "node_type": "", "label": "", "path": ""})
+                continue
+            ancestors = index.ancestors(node)
+            details = index.node(node)
+            results.append({
+                **key,
+                "resolved": True,
+                "node_type": details["type"],
+                "label": details["label"],
+                "path": "/".join(str(index.identifiers[i]) for i in ancestors),
+            })
+    resolve_seconds = time.perf_counter() - start
+
+    resolved_keys = pd.DataFrame(
+        results, columns=KEY_COLUMNS + ["resolved", "node_type", "label", "path"])
+    resolved = parsed.merge(resolved_keys, on=KEY_COLUMNS, how="left")
+    resolved["resolved"] = resolved["resolved"].fillna(False).astype(bool)
+    resolved[["node_type", "label", "path"]] = \
+        resolved[["node_type", "label", "path"]].fillna("")
+
+    report = {
+        "citations": len(citations),
+        "targets": len(parsed),
+        "invalid": int((~parsed["valid"]).sum()),
+        "unique": len(keys),
+        "unresolved": int((~resolved_keys["resolved"]).sum()),
+        "titles_cached": titles_cached,
+        "titles_fetched": titles_fetched,
+        "parse_seconds": parse_seconds,
+        "parse_per_second": len(parsed) / parse_seconds if parse_seconds else None,
+        "resolve_seconds": resolve_seconds,
+        "resolve_per_second": len(keys) / resolve_seconds if resolve_seconds else None,
+    }
+    return resolved, report
@@ -0,0 +1,333 @@
+import hashlib
+import json
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .parse_title_xml import iter_sections
+from .text_metrics import WORD_PATTERN
+
+SHINGLE_SIZE = 5
+
+# Odd multiplier for combining token hashes into shingle hashes.
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+def text_digest(text):
+    """Content key of a section text in the signature cache"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def shingles(text, k=SHINGLE_SIZE):
+    """
+    Hashes of the word k-shingles of a text.
+
+    Texts shorter than k words are a single shingle of all their words.
+
+    Returns:
+        numpy.ndarray: Distinct uint64 shingle hashes
+    """
+    tokens = np.fromiter(
+        (zlib.crc32(word.lower().encode("utf-8")) for word in WORD_PATTERN.findall(text)),
+        dtype=np.uint64)
+    if not len(tokens):
+        return tokens
+    k = min(k, len(tokens))
+    count = len(tokens) - k + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(k):
+            hashes = hashes * _SHINGLE_MULTIPLIER + tokens[offset:offset + count]
+    return np.unique(hashes)
+
+class MinHasher:
+    """
+    MinHash signatures, one uint32 per permutation.
+
+    Permutations are multiply-shift hashes of the shingle hashes, so the
+    same seed and num_perm always give the same signatures.
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets, chunk_size=1 << 13):
+        """
+        Signatures of a batch of shingle sets.
+
+        All shingles of the batch are hashed together, a chunk of shingles
+        at a time, and reduced to per-set minimums with reduceat.
+
+        Returns:
+            numpy.ndarray: uint32 array of shape (len(shingle_sets), num_perm);
+            an empty set gets the maximum value in every position
+        """
+        signatures = np.full((len(shingle_sets), self.num_perm), np.iinfo(np.uint32).max,
+                             dtype=np.uint32)
+        lengths = np.array([len(s) for s in shingle_sets], dtype=np.int64)
+        nonempty = np.flatnonzero(lengths)
+        if not len(nonempty):
+            return signatures
+
+        values = np.concatenate([shingle_sets[i] for i in nonempty])
+        owners = np.repeat(nonempty, lengths[nonempty])
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            chunk_owners = owners[start:start + chunk_size]
+            with np.errstate(over="ignore"):
+                hashed = ((chunk[:, None] * self.a[None, :] + self.b[None, :])
+                          >> np.uint64(32)).astype(np.uint32)
+            boundaries = np.flatnonzero(np.r_[True, chunk_owners[1:] != chunk_owners[:-1]])
+            minimums = np.minimum.reduceat(hashed, boundaries, axis=0)
+            rows = chunk_owners[boundaries]
+            signatures[rows] = np.minimum(signatures[rows], minimums)
+        return signatures
+
+class SignatureCache:
+    """
+    MinHash signatures by section text digest, saved as one .npz file.
+
+    A section whose text did not change between snapshots keeps its digest,
+    so its signature is computed once.
+    """
+
+    def __init__(self, path, num_perm=128, seed=1):
+        self.path = Path(path)
+        self.hasher = MinHasher(num_perm, seed)
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.path) as data:
+                if int(data["num_perm"]) != self.hasher.num_perm or int(data["seed"]) != self.hasher.seed:
+                    return
+                self._signatures = dict(zip(data["digests"].tolist(), data["signatures"]))
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def get(self, digest):
+        return self._signatures.get(digest)
+
+    def signatures(self, texts):
+        """
+        Signatures of texts, computing only those not cached.
+
+        Returns:
+            tuple: (digests, signatures array, number computed)
+        """
+        digests = [text_digest(text) for text in texts]
+        with self._lock:
+            missing = {digest: text for digest, text in zip(digests, texts)
+                       if digest not in self._signatures}
+        if missing:
+            computed = self.hasher.signatures([shingles(text) for text in missing.values()])
+            with self._lock:
+                self._signatures.update(zip(missing, computed))
+        with self._lock:
+            signatures = np.array([self._signatures[digest] for digest in digests],
+                                  dtype=np.uint32).reshape(len(digests), self.hasher.num_perm)
+        return digests, signatures, len(missing)
+
+    def save(self, keep=None):
+        """
+        Write the cache; keep, a set of digests, drops every other signature.
+        """
+        with self._lock:
+            if keep is not None:
+                self._signatures = {d: s for d, s in self._signatures.items() if d in keep}
+            digests = list(self._signatures)
+            signatures = np.array([self._signatures[d] for d in digests], dtype=np.uint32) \
+                .reshape(len(digests), self.hasher.num_perm)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.stem + ".tmp.npz")
+        np.savez(tmp_path, digests=np.array(digests, dtype="U40"), signatures=signatures,
+                 num_perm=self.hasher.num_perm, seed=self.hasher.seed)
+        tmp_path.replace(self.path)
+
+class NearDuplicateIndex:
+    """
+    LSH index of section signatures for finding near-duplicate text.
+
+    Signatures are split into bands of rows; sections sharing any band are
+    candidates, and candidates whose estimated Jaccard similarity passes the
+    threshold are clustered. With b bands of r rows, a pair of similarity s
+    becomes a candidate with probability 1 - (1 - s^r)^b.
+
+    The index holds the latest snapshot added for each title; adding a new
+    snapshot of a title replaces its sections. Entries are saved next to the
+    signature cache so the index can be reopened and extended.
+
+    Args:
+        cache (SignatureCache): Signature cache; its num_perm must equal
+            bands * rows
+        bands (int): Number of LSH bands
+        rows (int): Signature rows per band
+    """
+
+    def __init__(self, cache, bands=32, rows=4):
+        if bands * rows != cache.hasher.num_perm:
+            raise ValueError(
+                f"bands * rows ({bands * rows}) must equal num_perm ({cache.hasher.num_perm})")
+        self.cache = cache
+        self.bands = bands
+        self.rows = rows
+        self.entries_path = cache.path.with_name(cache.path.stem + "_entries.json")
+        self._entries = {}
+        self._buckets = defaultdict(set)
+        self._load_entries()
+
+    def _band_keys(self, signature):
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        for band_key in self._band_keys(self.cache.get(entry["digest"])):
+            self._buckets[band_key].add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for band_key in self._band_keys(self.cache.get(entry["digest"])):
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def _load_entries(self):
+        try:
+            with open(self.entries_path, "r") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for entry in entries:
+            if self.cache.get(entry["digest"]) is not None:
+                self._insert((entry["title"], entry["identifier"]), entry)
+
+    def snapshots(self):
+        """Title to the date of its snapshot in the index"""
+        return {entry["title"]: entry["date"] for entry in self._entries.values()}
+
+    def add_snapshot(self, title, snapshot_date, xml_text, min_words=20):
+        """
+        Add (or replace) a title's sections from its source XML.
+
+        Args:
+            title (str): Title number
+            snapshot_date (str): Date of the XML in YYYY-MM-DD format
+            xml_text (str): Source XML from get_title_source_route
+            min_words (int): Sections shorter than this are skipped, as
+                short boilerplate such as "[Reserved]" matches everywhere
+
+        Returns:
+            dict: sections indexed and signatures computed (not cached)
+        """
+        title = str(title)
+        sections = [
+            section for section in iter_sections(xml_text)
+            if len(WORD_PATTERN.findall(section["text"])) >= min_words
+        ]
+        digests, _, computed = self.cache.signatures([section["text"] for section in sections])
+
+        for key in [key for key in self._entries if key[0] == title]:
+            self._remove(key)
+        for section, digest in zip(sections, digests):
+            self._insert((title, section["identifier"]), {
+                "title": title, "date": snapshot_date, "part": section["part"],
+                "identifier": section["identifier"], "digest": digest,
+            })
+        return {"title": title, "sections": len(sections), "signatures_computed": computed}
+
+    def candidate_pairs(self):
+        """
+        Pairs of entry keys sharing at least one band.
+
+        Each bucket's members are paired with a single representative (its
+        smallest key) rather than with each other, so a bucket of k
+        sections, e.g. repeated boilerplate, gives k - 1 pairs, not
+        k * (k - 1) / 2; clusters joins the members through it.
+        """
+        pairs = set()
+        for bucket in self._buckets.values():
+            if len(bucket) < 2:
+                continue
+            representative = min(bucket)
+            pairs.update((representative, member) for member in bucket if member != representative)
+        return pairs
+
+    def similarity(self, first, second):
+        """Estimated Jaccard similarity of two entries' texts"""
+        a = self.cache.get(self._entries[first]["digest"])
+        b = self.cache.get(self._entries[second]["digest"])
+        return float(np.mean(a == b))
+
+    def clusters(self, threshold=0.8, part_agencies=None, across_titles=False):
+        """
+        Clusters of near-duplicate sections.
+
+        Args:
+            threshold (float): Minimum estimated similarity of a linked pair
+            part_agencies (dict, optional): (title, part) to agency slugs,
+                adding an agencies column
+            across_titles (bool): Keep only clusters spanning several titles
+
+        Returns:
+            pandas.DataFrame: cluster, size, title, part, identifier, date and
+            digest (plus agencies), one row per section, largest clusters first
+        """
+        parent = {}
+
+        def find(key):
+            parent.setdefault(key, key)
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for first, second in self.candidate_pairs():
+            if self.similarity(first, second) >= threshold:
+                parent[find(first)] = find(second)
+
+        groups = defaultdict(list)
+        for key in parent:
+            groups[find(key)].append(key)
+
+        columns = ["cluster", "size", "title", "part", "identifier", "date", "digest"]
+        if part_agencies is not None:
+            columns.append("agencies")
+        rows = []
+        clusters = sorted(
+            (sorted(members) for members in groups.values() if len(members) > 1),
+            key=lambda members: (-len(members), members[0]))
+        for cluster_id, members in enumerate(clusters):
+            if across_titles and len({title for title, _ in members}) < 2:
+                continue
+            for key in members:
+                entry = self._entries[key]
+                row = {"cluster": cluster_id, "size": len(members), **entry}
+                if part_agencies is not None:
+                    row["agencies"] = ",".join(
+                        part_agencies.get((entry["title"], entry["part"]), []))
+                rows.append(row)
+        return pd.DataFrame(rows, columns=columns)
+
+    def save(self):
+        """Write the entries and drop signatures no entry uses from the cache"""
+        self.cache.save(keep={entry["digest"] for entry in self._entries.values()})
+        self.entries_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.entries_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._entries.values()), f)
+        tmp_path.replace(self.entries_path)
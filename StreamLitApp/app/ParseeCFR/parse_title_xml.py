@@ -0,0 +1,73 @@
+import xml.etree.ElementTree as ET
+
+# eCFR source XML marks hierarchy levels with numbered DIV elements.
+PART_TAG = "DIV5"
+SECTION_TAGS = ("DIV8", "DIV9")
+
+def _get_root(xml_text):
+    if isinstance(xml_text, ET.Element):
+        return xml_text
+    return ET.fromstring(xml_text)
+
+def _section_identifier(element):
+    identifier = element.get("N", "")
+    return identifier.replace("§", "").strip()
+
+def _section_text(element):
+    # Body text only; the HEAD element repeats the section number and title.
+    pieces = []
+    if element.text:
+        pieces.append(element.text)
+    for child in element:
+        if child.tag != "HEAD":
+            pieces.extend(child.itertext())
+        if child.tail:
+            pieces.append(child.tail)
+    return " ".join(" ".join(pieces).split())
+
+def iter_parts(xml_text):
+    """
+    Split title (or part) source XML from get_title_source_route into parts.
+
+    Yields:
+        tuple: (part, part_xml) with the part number and the part's XML text
+    """
+    root = _get_root(xml_text)
+    parts = [root] if root.tag == PART_TAG else root.iter(PART_TAG)
+    for part in parts:
+        yield part.get("N"), ET.tostring(part, encoding="unicode")
+
+def iter_sections(xml_text, part=None):
+    """
+    Iterate over the sections and appendices in title source XML.
+
+    Args:
+        xml_text (str): XML from get_title_source_route, for a whole title, a
+            part or a single section
+        part (str, optional): Part number to report for sections outside of
+            any part element
+
+    Yields:
+        dict: identifier, part, type, heading and text of each section
+    """
+    root = _get_root(xml_text)
+    if root.tag == PART_TAG:
+        containers = [(root.get("N"), root)]
+    elif root.tag in SECTION_TAGS:
+        containers = [(part, root)]
+    else:
+        containers = [(p.get("N"), p) for p in root.iter(PART_TAG)] or [(part, root)]
+
+    for part_number, container in containers:
+        for element in container.iter():
+            if element.tag not in SECTION_TAGS:
+                continue
+            identifier = _section_identifier(element)
+            head = element.find("HEAD")
+            yield {
+                "identifier": identifier,
+                "part": part_number or identifier.split(".")[0],
+                "type": (element.get("TYPE") or "").lower(),
+                "heading": "".join(head.itertext()).strip() if head is not None else "",
+                "text": _section_text(element),
+            }
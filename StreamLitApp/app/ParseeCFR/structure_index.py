@@ -0,0 +1,222 @@
+import numpy as np
+
+# Hierarchy levels of get_structure nodes, in the order the ancestry route
+# accepts them.
+NODE_TYPES = [
+    "title",
+    "subtitle",
+    "chapter",
+    "subchapter",
+    "part",
+    "subpart",
+    "subject_group",
+    "section",
+    "appendix",
+]
+TYPE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+UNKNOWN_TYPE = len(NODE_TYPES)
+
+class StructureIndex:
+    """
+    Array-backed index of one get_structure(date, title) payload.
+
+    Nodes are stored in preorder, so a node's subtree is the contiguous range
+    of indices from the node up to end[node] (its Euler-tour interval).
+    Ancestry, descendants and subtree sizes are then array lookups instead of
+    HTTP calls or recursive walks of the nested JSON.
+
+    Attributes:
+        parent (numpy.ndarray): Index of each node's parent, -1 for the root
+        type_code (numpy.ndarray): TYPE_CODES code of each node
+        end (numpy.ndarray): Index of the last node in each node's subtree
+        size (numpy.ndarray): The 'size' reported for each node, 0 if absent
+        identifiers (numpy.ndarray): Identifier of each node
+        labels (numpy.ndarray): Label of each node
+    """
+
+    def __init__(self, parent, type_code, end, size, identifiers, labels):
+        self.parent = parent
+        self.type_code = type_code
+        self.end = end
+        self.size = size
+        self.identifiers = identifiers
+        self.labels = labels
+        # Plain list copy for the parent walk, where per-element NumPy
+        # indexing would dominate.
+        self._parent_list = parent.tolist()
+        self._lookup = {}
+        for index, (code, identifier) in enumerate(zip(type_code.tolist(), identifiers.tolist())):
+            self._lookup.setdefault((code, identifier), []).append(index)
+
+    @classmethod
+    def from_structure(cls, structure):
+        """
+        Build the index from a get_structure response.
+
+        Args:
+            structure (dict): Root node of the structure JSON
+        """
+        parent = []
+        type_code = []
+        end = []
+        size = []
+        identifiers = []
+        labels = []
+
+        # Iterative preorder walk; a None marker closes a node's subtree.
+        stack = [(structure, -1)]
+        while stack:
+            node, parent_index = stack.pop()
+            if node is None:
+                end[parent_index] = len(parent) - 1
+                continue
+            index = len(parent)
+            parent.append(parent_index)
+            type_code.append(TYPE_CODES.get(node.get("type"), UNKNOWN_TYPE))
+            end.append(index)
+            size.append(node.get("size") or 0)
+            identifiers.append(str(node.get("identifier") or ""))
+            labels.append(node.get("label") or "")
+
+            stack.append((None, index))
+            for child in reversed(node.get("children") or []):
+                stack.append((child, index))
+
+        return cls(
+            np.asarray(parent, dtype=np.int32),
+            np.asarray(type_code, dtype=np.int8),
+            np.asarray(end, dtype=np.int32),
+            np.asarray(size, dtype=np.int64),
+            np.asarray(identifiers, dtype=str),
+            np.asarray(labels, dtype=str),
+        )
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, node_type, identifier, within=None):
+        """
+        Get the index of a node.
+
+        Args:
+            node_type (str): Node type, e.g. 'part' or 'section'
+            identifier (str): Node identifier, e.g. '1026' or '1026.5'
+            within (int, optional): Only match nodes in this node's subtree,
+                for identifiers that repeat, like subpart 'A'
+
+        Returns:
+            int: Node index, or None if there is no such node
+        """
+        matches = self._lookup.get((TYPE_CODES.get(node_type, UNKNOWN_TYPE), str(identifier)), [])
+        for index in matches:
+            if within is None or self.contains(within, index):
+                return index
+        return None
+
+    def contains(self, ancestor, node):
+        """True if node is in ancestor's subtree (or is ancestor)"""
+        return ancestor <= node <= self.end[ancestor]
+
+    def ancestors(self, node):
+        """Indices from the root down to node, including node"""
+        path = []
+        parent = self._parent_list
+        while node >= 0:
+            path.append(node)
+            node = parent[node]
+        return path[::-1]
+
+    def descendants(self, node):
+        """Indices of every node below node, in preorder"""
+        return np.arange(node + 1, self.end[node] + 1)
+
+    def subtree_size(self, node):
+        """Number of nodes in node's subtree, including node"""
+        return int(self.end[node]) - node + 1
+
+    def children(self, node):
+        """Indices of node's direct children"""
+        descendants = self.descendants(node)
+        return descendants[self.parent[descendants] == node]
+
+    def node(self, index):
+        """The indexed fields of a node as a dict"""
+        return {
+            "identifier": str(self.identifiers[index]),
+            "type": NODE_TYPES[self.type_code[index]] \
+                if self.type_code[index] < UNKNOWN_TYPE else None,
+            "label": str(self.labels[index]),
+            "size": int(self.size[index]),
+        }
+
+    def resolve(
+        self,
+        subtitle=None,
+        chapter=None,
+        subchapter=None,
+        part=None,
+        subpart=None,
+        section=None,
+        appendix=None
+    ):
+        """
+        Find the lowest node named by a hierarchy, using each given level to
+        narrow down the next.
+
+        Args take the same values as versioner_api.get_ancestry.
+
+        Returns:
+            int: Node index, or None if any given level does not exist
+        """
+        levels = [
+            ("subtitle", subtitle),
+            ("chapter", chapter),
+            ("subchapter", subchapter),
+            ("part", part),
+            ("subpart", subpart),
+            ("section", section),
+            ("appendix", appendix),
+        ]
+        node = 0
+        for node_type, identifier in levels:
+            if not identifier:
+                continue
+            node = self.find(node_type, identifier, within=node)
+            if node is None:
+                return None
+        return node
+
+    def ancestry(self, **hierarchy):
+        """
+        Local equivalent of versioner_api.get_ancestry.
+
+        Returns:
+            list: Node dicts from the title down to the requested node, or
+            None if it does not exist
+        """
+        node = self.resolve(**hierarchy)
+        if node is None:
+            return None
+        return [self.node(index) for index in self.ancestors(node)]
+
+    def to_arrays(self):
+        """The index as a dict of arrays, e.g. for numpy.savez_compressed"""
+        return {
+            "parent": self.parent,
+            "type_code": self.type_code,
+            "end": self.end,
+            "size": self.size,
+            "identifiers": self.identifiers,
+            "labels": self.labels,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            arrays["parent"],
+            arrays["type_code"],
+            arrays["end"],
+            arrays["size"],
+            arrays["identifiers"],
+            arrays["labels"],
+        )
@@ -0,0 +1,246 @@
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from .parse_title_xml import iter_sections
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9]+(?:['\-][A-Za-z0-9]+)*")
+
+# A sentence ends at terminal punctuation (optionally closed by a quote or
+# bracket) followed by whitespace and an upper-case letter, a digit, an
+# opening bracket or a quote, or at the end of the text.
+SENTENCE_END_PATTERN = re.compile(r"""[.!?]+["')\]]*(?=\s+[A-Z0-9("'§]|\s*$)""")
+
+# Abbreviations common in the CFR whose period does not end a sentence.
+ABBREVIATION_PATTERN = re.compile(
+    r"\b(?:U\.S|U\.S\.C|C\.F\.R|Pub\.\s*L|No|Nos|Sec|Secs|Stat|Fed|Reg|e\.g|i\.e"
+    r"|etc|et al|Inc|Co|Corp|Ltd|Mr|Mrs|Ms|Dr|St|Jan|Feb|Mar|Apr|Aug|Sept|Oct|Nov|Dec)\.$")
+
+VOWEL_GROUP_PATTERN = re.compile(r"[aeiouy]+")
+
+# Function words excluded when counting content words for lexical density.
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just may me more most must my
+myself no nor not of off on once only or other our ours ourselves out over own
+same shall she should so some such than that the their theirs them themselves
+then there these they this those through to too under until up upon very was
+we were what when where which while who whom why will with would you your
+yours yourself yourselves
+""".split())
+
+METRIC_COLUMNS = [
+    "words", "sentences", "syllables", "content_words", "lexical_density",
+    "avg_sentence_length", "flesch_reading_ease", "flesch_kincaid_grade",
+]
+
+MODES = ("fast", "nltk")
+
+def _syllables(word):
+    # Vowel groups, less a silent final 'e'; every word has at least one.
+    groups = VOWEL_GROUP_PATTERN.findall(word)
+    count = len(groups)
+    if count > 1 and word.endswith("e") and not word.endswith(("le", "ee")):
+        count -= 1
+    return max(count, 1)
+
+def _fast_tokens(text):
+    words = WORD_PATTERN.findall(text)
+    sentences = sum(
+        1 for match in SENTENCE_END_PATTERN.finditer(text)
+        if not ABBREVIATION_PATTERN.search(text, max(0, match.start() - 16), match.start() + 1)
+    )
+    if words and not sentences:
+        sentences = 1
+    return words, sentences
+
+def _nltk_tokens(text):
+    # Imported only in this mode: nltk is slow to import, and word_tokenize
+    # and sent_tokenize need the punkt data (nltk.download("punkt_tab")).
+    import nltk
+
+    words = [
+        word for word in nltk.word_tokenize(text)
+        if any(character.isalnum() for character in word)
+    ]
+    return words, len(nltk.sent_tokenize(text))
+
+def _metrics(words, sentences):
+    lowered = [word.lower() for word in words]
+    word_count = len(lowered)
+    syllables = sum(_syllables(word) for word in lowered if not word.isdigit())
+    content_words = sum(1 for word in lowered if word not in STOPWORDS)
+
+    if not word_count:
+        return dict.fromkeys(METRIC_COLUMNS, 0) | {
+            "lexical_density": None, "avg_sentence_length": None,
+            "flesch_reading_ease": None, "flesch_kincaid_grade": None,
+        }
+    words_per_sentence = word_count / sentences
+    syllables_per_word = syllables / word_count
+    return {
+        "words": word_count,
+        "sentences": sentences,
+        "syllables": syllables,
+        "content_words": content_words,
+        "lexical_density": content_words / word_count,
+        "avg_sentence_length": words_per_sentence,
+        "flesch_reading_ease": 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word,
+        "flesch_kincaid_grade": 0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59,
+    }
+
+def text_metrics(text, mode="fast"):
+    """
+    Word, sentence and readability metrics of a text.
+
+    Args:
+        text (str): Plain text, e.g. the text of a section from iter_sections
+        mode (str): 'fast' for the compiled regex tokenizer, or 'nltk' for
+            NLTK's tokenizers, which are slower but handle more edge cases
+
+    Returns:
+        dict: The METRIC_COLUMNS. The ratios are None for a text with no words.
+    """
+    if mode == "fast":
+        return _metrics(*_fast_tokens(text))
+    if mode == "nltk":
+        return _metrics(*_nltk_tokens(text))
+    raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+
+def iter_metrics(sections, mode="fast", batch_size=1000):
+    """
+    Metrics of a stream of sections, a batch at a time.
+
+    Args:
+        sections (iterable): Section dicts from iter_sections
+        mode (str): Tokenizer mode, see text_metrics
+        batch_size (int): Sections per yielded frame
+
+    Yields:
+        pandas.DataFrame: identifier, part and type of each section of the
+        batch, followed by the METRIC_COLUMNS
+    """
+    sections = iter(sections)
+    while True:
+        batch = list(islice(sections, batch_size))
+        if not batch:
+            return
+        yield pd.DataFrame(
+            [
+                {"identifier": section["identifier"], "part": section["part"],
+                 "type": section["type"], **text_metrics(section["text"], mode)}
+                for section in batch
+            ],
+            columns=["identifier", "part", "type"] + METRIC_COLUMNS,
+        )
+
+def section_metrics(sections, mode="fast", batch_size=1000):
+    """Metrics of every section, as one frame; see iter_metrics"""
+    frames = list(iter_metrics(sections, mode, batch_size))
+    if not frames:
+        return pd.DataFrame(columns=["identifier", "part", "type"] + METRIC_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def _title_metrics(args):
+    title, xml_text, mode, batch_size = args
+    return section_metrics(iter_sections(xml_text), mode, batch_size).assign(title=str(title))
+
+def title_metrics(xml_by_title, mode="fast", batch_size=1000, max_workers=None):
+    """
+    Section metrics of several titles, parsed and measured in parallel
+    processes, one title per task.
+
+    Args:
+        xml_by_title (dict): Title number to its source XML from
+            get_title_source_route
+        mode (str): Tokenizer mode, see text_metrics
+        batch_size (int): Sections per batch within a title
+        max_workers (int, optional): Number of processes; 1 runs in this
+            process
+
+    Returns:
+        pandas.DataFrame: title, identifier, part, type and the METRIC_COLUMNS
+    """
+    tasks = [(title, xml_text, mode, batch_size) for title, xml_text in xml_by_title.items()]
+    if max_workers == 1 or len(tasks) <= 1:
+        frames = [_title_metrics(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(_title_metrics, tasks))
+    columns = ["title", "identifier", "part", "type"] + METRIC_COLUMNS
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+def aggregate_metrics(metrics, by="title"):
+    """
+    Roll section metrics up, recomputing the ratios from the summed counts.
+
+    Args:
+        metrics (pandas.DataFrame): From section_metrics or title_metrics
+        by (str or list): Columns to group by
+
+    Returns:
+        pandas.DataFrame: The METRIC_COLUMNS per group
+    """
+    totals = metrics.groupby(by, as_index=False)[
+        ["words", "sentences", "syllables", "content_words"]].sum()
+    words = totals["words"].where(totals["words"] > 0)
+    words_per_sentence = words / totals["sentences"].where(totals["sentences"] > 0)
+    syllables_per_word = totals["syllables"] / words
+    totals["lexical_density"] = totals["content_words"] / words
+    totals["avg_sentence_length"] = words_per_sentence
+    totals["flesch_reading_ease"] = 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word
+    totals["flesch_kincaid_grade"] = 0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59
+    return totals
+
+def benchmark(texts, modes=MODES, repeat=3):
+    """
+    Throughput of each tokenizer mode over the same texts.
+
+    Returns:
+        pandas.DataFrame: mode, seconds (best of repeat), texts_per_second
+        and words_per_second; a mode that cannot run (e.g. nltk without its
+        data) has error set instead
+    """
+    texts = list(texts)
+    rows = []
+    for mode in modes:
+        try:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                words = sum(text_metrics(text, mode)["words"] for text in texts)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            rows.append({
+                "mode": mode, "seconds": best,
+                "texts_per_second": len(texts) / best if best else None,
+                "words_per_second": words / best if best else None,
+                "error": "",
+            })
+        except (ImportError, LookupError) as e:
+            rows.append({"mode": mode, "seconds": None, "texts_per_second": None,
+                         "words_per_second": None, "error": str(e).strip().splitlines()[0]})
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    # Benchmark on real title text, from the repository root:
+    # python -m StreamLitApp.app.ParseeCFR.text_metrics 2024-01-01 1
+    import sys
+
+    from StreamLitApp.app.eCFRAPI import versioner_api
+
+    snapshot_date, title = sys.argv[1], sys.argv[2]
+    status_code, is_expected_status_code, response_data = \
+        versioner_api.get_title_source_route(snapshot_date, title)
+    if not is_expected_status_code:
+        sys.exit(f"Failed to fetch title {title}: Status code {status_code}")
+    texts = [section["text"] for section in iter_sections(response_data)]
+    print(f"Title {title} on {snapshot_date}: {len(texts)} sections")
+    print(benchmark(texts).to_string(index=False))
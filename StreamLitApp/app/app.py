@@ -9,9 +9,8 @@ root@678c273b8639:/app/StreamLitApp/app# streamlit run app.py
 
 import streamlit as st
 from components.header import create_header
-from utils.data_loader import load_sample_data
-import pages.overview
-import pages.detailed_view
+from utils.data_loader import load_sample_data, load_indexed_data
+import pages
 from pathlib import Path
 
 # Get the directory where the current file is located
@@ -46,8 +45,9 @@ page = st.sidebar.radio(
     ["Overview", "Detailed View"]
 )
 
-# Display selected page
+# Display selected page; each page module (and the libraries it uses) is
+# imported the first time it is shown
 if page == "Overview":
     pages.overview.show(data)
 elif page == "Detailed View":
-    pages.detailed_view.show(data)
+    pages.detailed_view.show(load_indexed_data())
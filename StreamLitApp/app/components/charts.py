@@ -3,11 +3,62 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
-def time_series_chart(data, x_col, y_col, title="Time Series"):
-    """Create a time series chart"""
+try:
+    # Imported as StreamLitApp.app.components
+    from ..utils.downsampling import downsample as downsample_series
+except ImportError:
+    # Imported as a top-level package, with the app directory on the path
+    from utils.downsampling import downsample as downsample_series
+
+def time_series_chart(data, x_col, y_col, title="Time Series", downsample=None,
+                      width=1200, zoomable=True, key=None):
+    """
+    Create a time series chart
+
+    Args:
+        data: DataFrame sorted by x_col
+        downsample: None to plot every point, or 'lttb' / 'minmax' to plot
+            at most width points
+        width: Point budget when downsampling, about the chart's width in
+            pixels
+        zoomable: When downsampling, box-select a range on the chart to zoom
+            in; the zoomed range is downsampled again from the full data.
+            Reruns the script, so leave off for charts shown only after a
+            button press.
+        key: Widget key; needed when downsampling if several charts share
+            a title
+    """
+    if downsample is None:
+        fig = px.line(
+            data, 
+            x=x_col, 
+            y=y_col,
+            title=title,
+            template="plotly_white"
+        )
+        
+        fig.update_layout(
+            xaxis_title=x_col,
+            yaxis_title=y_col,
+            height=400
+        )
+        
+        return st.plotly_chart(fig, use_container_width=True)
+
+    key = key or f"time_series_{title}"
+    zoom_key = f"{key}_zoom"
+    zoom = st.session_state.get(zoom_key) if zoomable else None
+
+    # Full-resolution rows of the zoomed range, then at most width points
+    view = data
+    if zoom is not None:
+        x_values = data[x_col]
+        view = data[(x_values >= zoom[0]) & (x_values <= zoom[1])]
+    plotted = downsample_series(view, x_col, y_col, width, method=downsample)
+
     fig = px.line(
-        data, 
-        x=x_col, 
+        plotted,
+        x=x_col,
         y=y_col,
         title=title,
         template="plotly_white"
@@ -16,10 +67,35 @@ def time_series_chart(data, x_col, y_col, title="Time Series"):
     fig.update_layout(
         xaxis_title=x_col,
         yaxis_title=y_col,
-        height=400
+        height=400,
+        dragmode="select" if zoomable else "zoom"
     )
     
-    return st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Showing {len(plotted):,} of {len(view):,} points ({downsample})")
+    
+    if not zoomable:
+        return st.plotly_chart(fig, use_container_width=True, key=key)
+    
+    event = st.plotly_chart(
+        fig, use_container_width=True, key=key,
+        on_select="rerun", selection_mode="box"
+    )
+    
+    # The selection stays in the widget state across reruns, so only a new
+    # box changes the zoom
+    boxes = event.selection.box if event else []
+    if boxes:
+        x0, x1 = sorted(boxes[0]["x"][:2])
+        if pd.api.types.is_datetime64_any_dtype(data[x_col]):
+            x0, x1 = pd.Timestamp(x0), pd.Timestamp(x1)
+        if (x0, x1) != zoom:
+            st.session_state[zoom_key] = (x0, x1)
+            st.rerun()
+    if zoom is not None and st.button("Reset zoom", key=f"{key}_reset"):
+        del st.session_state[zoom_key]
+        st.rerun()
+    
+    return event
 
 def bar_chart(data, x_col, y_col, title="Bar Chart"):
     """Create a bar chart"""
@@ -57,3 +133,21 @@ def pie_chart(data, names_col, values_col, title="Distribution"):
     fig.update_layout(height=400)
     
     return st.plotly_chart(fig, use_container_width=True)
+
+def heatmap_chart(data, title="Heatmap", x_title="Agency", y_title="Term"):
+    """Create a heatmap of a DataFrame's values (rows on y, columns on x)"""
+    fig = px.imshow(
+        data,
+        title=title,
+        aspect="auto",
+        color_continuous_scale="Blues",
+        template="plotly_white"
+    )
+    
+    fig.update_layout(
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        height=max(400, 30 * len(data.index))
+    )
+    
+    return st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,70 @@
+import streamlit as st
+
+try:
+    # Imported as StreamLitApp.app.components
+    from ..utils.table_window import TableWindow
+except ImportError:
+    # Imported as a top-level package, with the app directory on the path
+    from utils.table_window import TableWindow
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+def data_grid(data, key, page_size=50, data_key=None):
+    """
+    Create a paginated table, searched, sorted and sliced on the server
+
+    Only the rows of the current page are sent to the browser, so the table
+    renders in the same time whatever the size of data.
+
+    Args:
+        data: DataFrame to show
+        key: Widget key prefix, unique per table
+        page_size: Initial rows per page, one of PAGE_SIZES
+        data_key: Hashable value that changes whenever data does (e.g. the
+            filters it was built with), so sort orders and searches are kept
+            across reruns; without it they are kept only while the same
+            frame object is passed
+    """
+    # Sort orders and search results live with the session's table
+    identity = data_key if data_key is not None else (id(data), len(data))
+    cached = st.session_state.get(f"{key}_window")
+    if cached is None or cached[0] != identity:
+        cached = (identity, TableWindow(data))
+        st.session_state[f"{key}_window"] = cached
+    window = cached[1]
+
+    columns = list(data.columns)
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        query = st.text_input("Search", key=f"{key}_query")
+    with col2:
+        sort_by = st.selectbox(
+            "Sort by", [None] + columns, key=f"{key}_sort",
+            format_func=lambda column: "(unsorted)" if column is None else str(column))
+    with col3:
+        descending = st.checkbox("Descending", key=f"{key}_descending")
+    with col4:
+        rows_per_page = st.selectbox(
+            "Rows", PAGE_SIZES, key=f"{key}_page_size",
+            index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1)
+
+    total = window.count(query)
+    pages = max(1, -(-total // rows_per_page))
+    # A narrower search can leave the chosen page past the last one
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+
+    rows, total = window.page(
+        st.session_state.get(f"{key}_page", 1), rows_per_page,
+        sort_by=sort_by, ascending=not descending, query=query)
+    st.dataframe(rows, use_container_width=True)
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page = st.number_input(
+            "Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    with col2:
+        first = (page - 1) * rows_per_page
+        st.caption(
+            f"Rows {min(first + 1, total):,}-{min(first + rows_per_page, total):,} "
+            f"of {total:,} (page {page} of {pages})")
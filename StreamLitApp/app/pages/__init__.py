@@ -1,4 +1,11 @@
 # This file makes the pages directory a Python package
-# Import submodules to make them available through the package
-from . import overview
-from . import detailed_view
+# Submodules are imported on first access (pages.overview), so starting the
+# app only loads the page being shown and its dependencies
+import importlib
+
+__all__ = ["overview", "detailed_view", "agency_search_analysis"]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
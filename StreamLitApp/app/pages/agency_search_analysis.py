@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from StreamLitApp.app.eCFRAPI.admin_api import get_agencies
 from StreamLitApp.app.ParseeCFR.parse_admin_api import get_all_abridged_agencies
 from StreamLitApp.app.eCFRApplications import get_count_for_agency_slugs
+from StreamLitApp.app.components.charts import time_series_chart, heatmap_chart
+from StreamLitApp.app.utils.daily_counts_store import get_daily_counts_store
+from StreamLitApp.app.utils.term_matrix import get_term_agency_matrix
+from StreamLitApp.app.utils.figure_renderer import figure_key, get_figure_renderer
+from StreamLitApp.app.utils.export import (
+    FORMATS, export_name, iter_frame_batches, iter_search_results, write_export)
 
 def get_all_agency_slugs():
     """Get all agency slugs from the eCFR API"""
@@ -22,6 +26,19 @@ def get_all_agency_slugs():
 
     return list_of_agency_slugs
 
+def draw_agency_counts(ax, results_df, query):
+    """Draw the bar chart of search counts by agency on a matplotlib axes"""
+    # Imported here so seaborn (and matplotlib) only load once there is
+    # something to plot
+    import seaborn as sns
+
+    # Use seaborn for better styling
+    sns.barplot(x='total_count', y='agency_name', data=results_df, ax=ax)
+    
+    ax.set_title(f"Count of '{query}' Mentions by Agency")
+    ax.set_xlabel("Count")
+    ax.set_ylabel("Agency")
+
 def run_agency_search_analysis():
     st.title("eCFR Agency Search Analysis")
     
@@ -96,33 +113,82 @@ def run_agency_search_analysis():
                     
                     # Create histogram
                     st.subheader("Results Visualization")
-                    
-                    fig, ax = plt.subplots(figsize=(12, 8))
-                    
-                    # Use seaborn for better styling
-                    sns.barplot(x='total_count', y='agency_name', data=results_df, ax=ax)
-                    
-                    ax.set_title(f"Count of '{query}' Mentions by Agency")
-                    ax.set_xlabel("Count")
-                    ax.set_ylabel("Agency")
-                    
-                    # Adjust layout
-                    plt.tight_layout()
+
+                    # Rendered once per distinct result and query, off the
+                    # script thread, and shared across sessions and reruns
+                    plot_df = results_df[['agency_name', 'total_count']]
+                    png = get_figure_renderer().render(
+                        figure_key(plot_df, query), draw_agency_counts, plot_df, query)
                     
                     # Display the plot
-                    st.pyplot(fig)
+                    st.image(png, use_container_width=True)
+
+                    # Daily trend, served from the local daily counts store
+                    # which only fetches days it does not have yet
+                    st.subheader("Mentions Over Time")
+                    daily_counts = get_daily_counts_store().get_many(
+                        query, st.session_state.selected_agencies)
+                    if not daily_counts.empty:
+                        trend = daily_counts.groupby('date', as_index=False)['count'].sum()
+                        time_series_chart(trend, 'date', 'count', f"Daily Count of '{query}'",
+                                          downsample='minmax', zoomable=False)
                     
-                    # Add download button for the data
-                    csv = results_df.to_csv(index=False)
+                    # Add download button for the data, written to disk in
+                    # chunks and only read back when the button is clicked;
+                    # Streamlit serves the download from memory, so the file
+                    # is then read whole
+                    path = write_export(
+                        iter_frame_batches(results_df),
+                        export_name("ecfr_search", query, *st.session_state.selected_agencies))
                     st.download_button(
                         label="Download data as CSV",
-                        data=csv,
-                        file_name=f"ecfr_search_{query.replace('*', '')}.csv",
-                        mime="text/csv"
+                        data=path.read_bytes,
+                        file_name=path.name,
+                        mime=FORMATS["csv"]
                     )
                     
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
 
+    # Export every search result, streamed page by page from the search
+    # API into a file on disk. The download reads it whole into memory when
+    # clicked, which MAX_SEARCH_RESULTS keeps bounded.
+    st.subheader("Export Search Results")
+    export_format = st.radio("Format", list(FORMATS), horizontal=True, key="export_format")
+    if st.button("Export Search Results", disabled=not query):
+        with st.spinner("Exporting search results..."):
+            try:
+                st.session_state.search_export = write_export(
+                    iter_search_results(
+                        query, agency_slugs=st.session_state.selected_agencies or None),
+                    export_name("ecfr_results", query, *st.session_state.selected_agencies),
+                    export_format)
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+    export_path = st.session_state.get('search_export')
+    if export_path is not None and export_path.exists():
+        st.download_button(
+            label=f"Download {export_path.name}",
+            data=export_path.read_bytes,
+            file_name=export_path.name,
+            mime=FORMATS[export_path.suffix.lstrip('.')]
+        )
+
+    # Keyword comparison from the offline term x agency matrix, if built
+    term_matrix = get_term_agency_matrix()
+    if term_matrix is not None:
+        st.subheader("Compare Keywords Across Agencies")
+        keywords = st.text_input("Enter keywords separated by commas (single words)",
+                                 key="heatmap_keywords")
+        normalize = st.checkbox("Mentions per 10,000 words", key="heatmap_normalize")
+        terms = [keyword.strip() for keyword in keywords.split(",") if keyword.strip()]
+        if terms:
+            agency_slugs = st.session_state.selected_agencies or None
+            heatmap = term_matrix.heatmap(terms, agency_slugs, normalize=normalize)
+            # Agencies without a name (e.g. child agencies) keep their slug
+            names = dict(zip(agencies_df['slug'], agencies_df['name']))
+            heatmap.columns = heatmap.columns.map(lambda slug: names.get(slug, slug))
+            heatmap_chart(heatmap, "Keyword Mentions by Agency")
+
 if __name__ == "__main__":
     run_agency_search_analysis()
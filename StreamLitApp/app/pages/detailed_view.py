@@ -1,22 +1,29 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from components.charts import time_series_chart
+from components.data_grid import data_grid
+from utils.indexed_frame import TimeIndexedFrame
 
 def show(data):
-    """Display detailed view with interactive filters"""
+    """
+    Display detailed view with interactive filters
+
+    Args:
+        data: TimeIndexedFrame (e.g. from load_indexed_data), or a DataFrame
+            with date and category columns, which is indexed on every call
+    """
     st.header("Detailed Analysis")
     
-    # Convert date column to datetime if it's not already
-    if not pd.api.types.is_datetime64_any_dtype(data['date']):
-        data['date'] = pd.to_datetime(data['date'])
+    # Sorted, indexed data, so filters slice it instead of scanning it
+    if not isinstance(data, TimeIndexedFrame):
+        data = TimeIndexedFrame(data)
     
     # Filters
     st.sidebar.subheader("Filters")
     
     # Date range filter
-    date_min = data['date'].min().date()
-    date_max = data['date'].max().date()
+    date_min = data.date_min.date()
+    date_max = data.date_max.date()
     
     start_date, end_date = st.sidebar.date_input(
         "Date Range",
@@ -26,21 +33,12 @@ def show(data):
     )
     
     # Category filter
-    categories = ['All'] + sorted(data['category'].unique().tolist())
+    categories = ['All'] + sorted(data.categories)
     selected_category = st.sidebar.selectbox("Category", categories)
     
-    # Apply filters
-    filtered_data = data.copy()
-    
-    # Date filter
-    filtered_data = filtered_data[
-        (filtered_data['date'].dt.date >= start_date) & 
-        (filtered_data['date'].dt.date <= end_date)
-    ]
-    
-    # Category filter
-    if selected_category != 'All':
-        filtered_data = filtered_data[filtered_data['category'] == selected_category]
+    # Apply filters: a binary search of the sorted dates, then the
+    # precomputed rows of the category; no copy of the whole frame
+    filtered_data = data.filter(start_date, end_date, selected_category)
     
     # Show filtered data info
     st.info(f"Showing {len(filtered_data)} records")
@@ -55,7 +53,9 @@ def show(data):
     )
     
     # Display time series
-    time_series_chart(filtered_data, 'date', metric, f"{metric.title()} Over Time")
+    # Downsampled, as the filtered range can hold millions of rows
+    time_series_chart(filtered_data, 'date', metric, f"{metric.title()} Over Time",
+                      downsample='lttb')
     
     # Correlation heatmap
     st.subheader("Correlation Between Metrics")
@@ -71,4 +71,6 @@ def show(data):
     
     # Raw data table
     st.subheader("Raw Data")
-    st.dataframe(filtered_data, use_container_width=True)
+    # One page at a time, sorted and searched on the server
+    data_grid(filtered_data, key="raw_data",
+              data_key=(start_date, end_date, selected_category))
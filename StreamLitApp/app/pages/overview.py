@@ -1,14 +1,43 @@
+import uuid
+
 import streamlit as st
 import pandas as pd
 from components.charts import time_series_chart, bar_chart, pie_chart
-from utils.ecfr_service import ECFRService
+from components.data_grid import data_grid
+from utils.ecfr_service import get_ecfr_service
+from utils.figure_renderer import figure_key
+
+def _structure_date(titles, title_number):
+    """Date of a title's current structure, as YYYY-MM-DD, if known"""
+    if 'up_to_date_as_of' not in titles.columns:
+        return None
+    dates = titles.loc[titles['number'].astype(str) == title_number, 'up_to_date_as_of'].dropna()
+    return pd.Timestamp(dates.iloc[0]).date().isoformat() if len(dates) else None
+
+def _show_part_sections(prefetcher, title_number, structure_date, part, session):
+    """Sections of a part, from the title's prefetched structure index"""
+    try:
+        index = prefetcher.structure(title_number, structure_date, session=session)
+    except RuntimeError as e:
+        st.warning(f"Structure unavailable: {e}")
+        return
+    node = index.find('part', part) if index is not None else None
+    if node is None:
+        return
+    sections = pd.DataFrame([
+        index.node(descendant) for descendant in index.descendants(node)
+        if index.node(descendant)['type'] in ('section', 'appendix')
+    ])
+    st.write(f"{len(sections)} sections")
+    if not sections.empty:
+        st.dataframe(sections[['identifier', 'label', 'size']], use_container_width=True)
 
 def show(data):
     """Display overview dashboard"""
     st.header("eCFR Analyzer Dashboard")
     
-    # Initialize eCFR service
-    ecfr_service = ECFRService()
+    # Shared eCFR service, whose cache is warm across sessions
+    ecfr_service = get_ecfr_service()
     
     # Add a section for eCFR Titles
     st.subheader("Federal Regulation Titles")
@@ -20,11 +49,11 @@ def show(data):
         # Display the number of titles
         st.metric("Total CFR Titles", f"{len(titles)}")
         
-        # Display titles in a dataframe
-        st.dataframe(
-            titles[['number', 'name']].rename(columns={'number': 'Title Number', 'name': 'Title Name'}),
-            use_container_width=True
-        )
+        # Display titles a page at a time, keeping sort orders and searches
+        # until the titles' contents change
+        title_table = titles[['number', 'name']].rename(
+            columns={'number': 'Title Number', 'name': 'Title Name'})
+        data_grid(title_table, key="titles", data_key=figure_key(title_table))
         
         # Create a selectbox for exploring titles
         title_options = [f"{row['number']} - {row['name']}" for _, row in titles.iterrows()]
@@ -37,7 +66,41 @@ def show(data):
             title_name = title_parts[1] if len(title_parts) > 1 else ""
             
             st.write(f"### Title {title_number}: {title_name}")
-            st.write("In a full implementation, this would show parts and sections of this title.")
+            
+            parts = ecfr_service.fetch_title_parts(title_number)
+            if parts.empty or 'identifier' not in parts.columns:
+                st.info("No parts available for this title.")
+            else:
+                # Warm the part drill-down below in the background; picking
+                # another title cancels what has not been fetched yet.
+                # Imported here so the structure index only loads once a
+                # title is selected.
+                from utils.prefetcher import get_prefetcher
+                prefetcher = get_prefetcher()
+                session = st.session_state.setdefault('prefetch_session', uuid.uuid4().hex)
+                structure_date = _structure_date(titles, title_number)
+                prefetcher.prefetch(
+                    title_number, structure_date,
+                    parts=parts['identifier'].astype(str), session=session)
+                
+                label_column = 'label' if 'label' in parts.columns else 'identifier'
+                part_options = {
+                    str(row['identifier']): str(row[label_column])
+                    for _, row in parts.iterrows()
+                }
+                selected_part = st.selectbox(
+                    "Select a Part", [""] + list(part_options),
+                    format_func=lambda part: part_options.get(part, ""))
+                
+                if selected_part:
+                    # Count each new view once, not once per rerun
+                    if st.session_state.get('viewed_part') != (title_number, selected_part):
+                        st.session_state['viewed_part'] = (title_number, selected_part)
+                        prefetcher.record_view(title_number, selected_part)
+                    _show_part_sections(prefetcher, title_number, structure_date,
+                                        selected_part, session)
+                    with st.expander(f"Part {selected_part} content"):
+                        st.json(ecfr_service.fetch_part_content(title_number, selected_part))
     else:
         st.info("No title data available in Supabase.")
         
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pyarrow as pa
+import streamlit as st
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is only locked between threads
+    fcntl = None
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+# eCFR XML wraps each section in a DIV8 element and each appendix in a DIV9.
+XML_SECTION_PATTERN = re.compile(r"(<DIV[89]\b.*?</DIV[89]>)", re.DOTALL)
+
+# JSON objects smaller than this are kept inline in their parent.
+MIN_CHUNK_BYTES = 256
+
+# One-byte codec tag stored in front of every blob.
+CODECS = {b"z": "zstd", b"g": "gzip", b"n": None}
+
+class BlobStore:
+    """
+    Compressed, content-addressed store for part content snapshots.
+
+    Every blob is stored once under the SHA-256 of its uncompressed bytes.
+    A snapshot of a part is a manifest blob listing the hashes of its
+    sections, so a section that is unchanged between dates is stored only
+    once no matter how many snapshots reference it. Snapshots are indexed by
+    (title, part, date).
+
+    The snapshot index is shared with other processes using the same root
+    (e.g. the refresh pipeline): changes to it are made under a file lock,
+    on the index as last written to disk. Within a process, use
+    get_blob_store() so every caller shares one store.
+    """
+
+    def __init__(self, root=None, codec="zstd"):
+        self.root = Path(root or data_dir / "blobs")
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "snapshots.json"
+        self.codec = codec
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+        self._index_mtime = None
+        self._index = self._load_index()
+
+    @contextmanager
+    def _locked(self):
+        # Excludes other threads and, where fcntl is available, other
+        # processes; re-entrant within a thread.
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.root / "snapshots.lock", "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    # Closing the file releases the lock
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    # Blobs
+
+    def put_blob(self, data):
+        """
+        Store bytes, compressed, under their content hash.
+
+        Returns:
+            tuple: (hash, is_new) where is_new is False if the blob was
+            already stored
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if path.exists():
+            return digest, False
+
+        path.parent.mkdir(exist_ok=True)
+        # Unique per writer, so concurrent writes of one blob do not collide
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.compress(data))
+        tmp_path.replace(path)
+        return digest, True
+
+    def get_blob(self, digest, fetch_missing=None):
+        """
+        Get the uncompressed bytes of a blob.
+
+        Args:
+            digest (str): Content hash
+            fetch_missing (callable, optional): Called with the hash to get the
+                compressed blob from elsewhere (e.g. Supabase) if it is not
+                stored locally; the result is stored locally
+
+        Raises:
+            KeyError: If the blob is not stored and cannot be fetched
+        """
+        path = self._blob_path(digest)
+        try:
+            with open(path, "rb") as f:
+                return self.decompress(f.read())
+        except FileNotFoundError:
+            if fetch_missing is None:
+                raise KeyError(digest)
+
+        compressed = fetch_missing(digest)
+        if compressed is None:
+            raise KeyError(digest)
+        data = self.decompress(compressed)
+        self.put_blob(data)
+        return data
+
+    def read_compressed(self, digest):
+        """Compressed bytes of a blob, as stored on disk"""
+        with open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def compress(self, data):
+        tag = next(tag for tag, codec in CODECS.items() if codec == self.codec)
+        header = tag + struct.pack("<Q", len(data))
+        if self.codec is None:
+            return header + data
+        return header + pa.compress(data, codec=self.codec, asbytes=True)
+
+    @staticmethod
+    def decompress(blob):
+        codec = CODECS[blob[:1]]
+        (size,) = struct.unpack("<Q", blob[1:9])
+        if codec is None:
+            return blob[9:]
+        return pa.decompress(blob[9:], decompressed_size=size, codec=codec, asbytes=True)
+
+    # Snapshots
+
+    def put_snapshot(self, title, part, date, content):
+        """
+        Store a snapshot of a part's content.
+
+        Args:
+            title (str): Title number
+            part (str): Part number
+            date (str): Date of the content in YYYY-MM-DD format
+            content (dict, list or str): Part content as parsed JSON, or XML
+                text from the title source route
+
+        Returns:
+            tuple: (manifest_hash, new_hashes) where new_hashes lists every
+            blob that was not already stored
+        """
+        with self._locked():
+            return self._put_snapshot(title, part, date, content)
+
+    def _put_snapshot(self, title, part, date, content):
+        # Runs under the lock so gc() cannot free blobs of a snapshot that is
+        # not indexed yet, in this process or another.
+        new_hashes = []
+
+        def put(data):
+            digest, is_new = self.put_blob(data)
+            if is_new:
+                new_hashes.append(digest)
+            return digest
+
+        if isinstance(content, str):
+            chunks = [chunk for chunk in XML_SECTION_PATTERN.split(content) if chunk]
+            manifest = {
+                "kind": "xml",
+                "chunks": [put(chunk.encode("utf-8")) for chunk in chunks],
+            }
+        else:
+            manifest = {"kind": "json", "doc": self._split_json(content, put)}
+
+        manifest_hash = put(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+        self._index = self._load_index()
+        self._index[self._snapshot_key(title, part, date)] = manifest_hash
+        self._save_index()
+        return manifest_hash, new_hashes
+
+    def get_snapshot(self, title, part, date=None, fetch_missing=None):
+        """
+        Get a stored snapshot of a part's content.
+
+        Args:
+            date (str, optional): Snapshot date; defaults to the latest
+
+        Raises:
+            KeyError: If no matching snapshot is stored
+        """
+        if date is None:
+            dates = [d for t, p, d in self.snapshots(title, part)]
+            if not dates:
+                raise KeyError((str(title), str(part)))
+            date = max(dates)
+        with self._lock:
+            self._reload_index()
+            manifest_hash = self._index[self._snapshot_key(title, part, date)]
+        return self.get_content(manifest_hash, fetch_missing)
+
+    def get_content(self, manifest_hash, fetch_missing=None):
+        """Rebuild the content a manifest blob describes"""
+        def get(digest):
+            return self.get_blob(digest, fetch_missing)
+
+        manifest = json.loads(get(manifest_hash))
+        if manifest["kind"] == "xml":
+            return "".join(get(digest).decode("utf-8") for digest in manifest["chunks"])
+        return self._join_json(manifest["doc"], get)
+
+    def manifest_hashes(self, manifest_hash, fetch_missing=None):
+        """Every blob hash a manifest references, including its own"""
+        manifest = json.loads(self.get_blob(manifest_hash, fetch_missing))
+        hashes = {manifest_hash}
+        if manifest["kind"] == "xml":
+            hashes.update(manifest["chunks"])
+        else:
+            self._collect_json_hashes(
+                manifest["doc"], hashes, lambda d: self.get_blob(d, fetch_missing))
+        return hashes
+
+    def snapshots(self, title=None, part=None):
+        """List stored snapshots as (title, part, date) tuples"""
+        with self._lock:
+            self._reload_index()
+            keys = list(self._index)
+        result = []
+        for key in keys:
+            t, p, d = key.split("/")
+            if title is not None and t != str(title):
+                continue
+            if part is not None and p != str(part):
+                continue
+            result.append((t, p, d))
+        return sorted(result)
+
+    def delete_snapshot(self, title, part, date):
+        """Remove a snapshot from the index; its blobs are freed by gc()"""
+        with self._locked():
+            self._index = self._load_index()
+            self._index.pop(self._snapshot_key(title, part, date), None)
+            self._save_index()
+
+    def gc(self):
+        """
+        Delete every blob no stored snapshot references.
+
+        Returns:
+            dict: removed (number of blobs) and bytes_freed
+        """
+        with self._locked():
+            self._index = self._load_index()
+            live = set()
+            for manifest_hash in self._index.values():
+                live |= self.manifest_hashes(manifest_hash)
+
+            removed = 0
+            bytes_freed = 0
+            for path in self.objects_dir.glob("*/*"):
+                if path.suffix == ".tmp" or path.parent.name + path.name in live:
+                    continue
+                bytes_freed += path.stat().st_size
+                path.unlink()
+                removed += 1
+        return {"removed": removed, "bytes_freed": bytes_freed}
+
+    def stats(self):
+        """Number of snapshots and blobs, and bytes used on disk"""
+        paths = list(self.objects_dir.glob("*/*"))
+        with self._lock:
+            self._reload_index()
+        return {
+            "snapshots": len(self._index),
+            "blobs": len(paths),
+            "bytes": sum(path.stat().st_size for path in paths),
+        }
+
+    def _split_json(self, value, put):
+        # Replace large objects inside lists (sections, subparts, ...) with
+        # references to their own blobs, innermost first.
+        if isinstance(value, dict):
+            return {key: self._split_json(item, put) for key, item in value.items()}
+        if isinstance(value, list):
+            result = []
+            for item in value:
+                item = self._split_json(item, put)
+                data = json.dumps(item, sort_keys=True).encode("utf-8")
+                if isinstance(item, dict) and len(data) >= MIN_CHUNK_BYTES:
+                    item = {"$blob": put(data)}
+                result.append(item)
+            return result
+        return value
+
+    def _join_json(self, value, get):
+        if isinstance(value, dict):
+            if set(value) == {"$blob"}:
+                return self._join_json(json.loads(get(value["$blob"])), get)
+            return {key: self._join_json(item, get) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._join_json(item, get) for item in value]
+        return value
+
+    def _collect_json_hashes(self, value, hashes, get):
+        if isinstance(value, dict):
+            if set(value) == {"$blob"}:
+                hashes.add(value["$blob"])
+                value = json.loads(get(value["$blob"]))
+            for item in value.values():
+                self._collect_json_hashes(item, hashes, get)
+        elif isinstance(value, list):
+            for item in value:
+                self._collect_json_hashes(item, hashes, get)
+
+    def _blob_path(self, digest):
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    @staticmethod
+    def _snapshot_key(title, part, date):
+        return f"{title}/{part}/{date}"
+
+    def _index_stamp(self):
+        try:
+            return self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_index(self):
+        self._index_mtime = self._index_stamp()
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _reload_index(self):
+        # Pick up snapshots another process indexed since the last read
+        if self._index_stamp() != self._index_mtime:
+            self._index = self._load_index()
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, sort_keys=True)
+        tmp_path.replace(self.index_path)
+        self._index_mtime = self._index_stamp()
+
+@st.cache_resource
+def get_blob_store():
+    """
+    Get the process-wide blob store.
+
+    Returns:
+        BlobStore shared by every session and service in the process
+    """
+    return BlobStore()
@@ -0,0 +1,137 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+# Declared schemas for datasets whose columns are known up front. Datasets
+# without an entry keep the dtypes of the DataFrame they were written from.
+SCHEMAS = {
+    "sample_data": pa.schema([
+        ("date", pa.timestamp("ns")),
+        ("value", pa.float64()),
+        ("category", pa.dictionary(pa.int32(), pa.string())),
+        ("metric1", pa.float64()),
+        ("metric2", pa.float64()),
+    ]),
+}
+
+class ColumnarStore:
+    """
+    Local Parquet store used for backups and fallback reads.
+
+    Each dataset is a directory under root. Partitions are hive-style
+    subdirectories, e.g. ecfr_history/title=12/part=1026/data.parquet, so a
+    single title or date can be read without touching the rest.
+    """
+
+    def __init__(self, root=None, compression="zstd"):
+        self.root = Path(root or data_dir / "columnar")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+
+    def path_for(self, dataset, partition=None):
+        """
+        Get the file path of a dataset partition.
+
+        Args:
+            dataset (str): Dataset name, e.g. 'ecfr_parts'
+            partition (dict, optional): Ordered partition keys and values,
+                e.g. {'title': 12, 'date': '2024-01-01'}
+        """
+        path = self.root / dataset
+        for key, value in (partition or {}).items():
+            path = path / f"{key}={value}"
+        return path / "data.parquet"
+
+    def exists(self, dataset, partition=None):
+        if partition:
+            return self.path_for(dataset, partition).exists()
+        return (self.root / dataset).exists()
+
+    def write(self, dataset, df, partition=None, schema=None):
+        """
+        Write df as one compressed Parquet partition, replacing what was there.
+
+        Args:
+            dataset (str): Dataset name
+            df (pandas.DataFrame): Data to write
+            partition (dict, optional): Partition keys and values
+            schema (pyarrow.Schema, optional): Schema to cast to; defaults to
+                the declared schema of the dataset, if any
+        """
+        table = self._to_table(df, schema or SCHEMAS.get(dataset))
+        path = self.path_for(dataset, partition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write then rename so readers never see a partial file.
+        # Dot-prefixed, so dataset reads skip a file still being written
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        pq.write_table(table, tmp_path, compression=self.compression)
+        tmp_path.replace(path)
+        return path
+
+    def read_table(self, dataset, partition=None, columns=None, filters=None):
+        """
+        Read a dataset or one partition as a memory-mapped Arrow table.
+
+        Args:
+            dataset (str): Dataset name
+            partition (dict, optional): Read only this partition
+            columns (list, optional): Read only these columns
+            filters (list, optional): Parquet filters on partition keys or
+                columns, e.g. [('title', '=', '12')]
+
+        Raises:
+            FileNotFoundError: If the dataset or partition was never written
+        """
+        path = self.path_for(dataset, partition) if partition else self.root / dataset
+        if not path.exists():
+            raise FileNotFoundError(path)
+        return pq.read_table(
+            path,
+            columns=columns,
+            filters=filters,
+            memory_map=True,
+            partitioning="hive",
+        )
+
+    def read(self, dataset, partition=None, columns=None, filters=None, arrow_dtypes=False):
+        """
+        Read a dataset or one partition as a DataFrame.
+
+        Args:
+            arrow_dtypes (bool): Keep Arrow-backed columns instead of converting
+                to NumPy, which avoids copying the memory-mapped buffers
+
+        Raises:
+            FileNotFoundError: If the dataset or partition was never written
+        """
+        table = self.read_table(dataset, partition, columns, filters)
+        if arrow_dtypes:
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    @staticmethod
+    def _to_table(df, schema=None):
+        if schema is not None:
+            columns = [name for name in schema.names if name in df.columns]
+            schema = pa.schema([schema.field(name) for name in columns])
+            return pa.Table.from_pandas(df[columns], schema=schema, preserve_index=False)
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Nested API fields (lists of dicts with varying keys) have no
+            # single Arrow type, so store them as JSON text.
+            df = df.copy()
+            for column in df.columns[df.dtypes == object]:
+                if df[column].map(lambda v: isinstance(v, (dict, list))).any():
+                    df[column] = df[column].map(
+                        lambda v: json.dumps(v) if isinstance(v, (dict, list)) else v)
+            return pa.Table.from_pandas(df, preserve_index=False)
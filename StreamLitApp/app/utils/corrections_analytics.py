@@ -0,0 +1,208 @@
+import json
+from datetime import date, timedelta
+
+import pandas as pd
+
+from StreamLitApp.app.eCFRAPI import admin_api
+from .columnar_store import ColumnarStore
+from .regulation_size import REFERENCE_LEVELS, attribute_nodes
+
+# A gap longer than this is refreshed with one full download instead of one
+# request per missing day.
+MAX_INCREMENTAL_DAYS = 31
+
+CATEGORICAL_COLUMNS = ["title", "corrective_action"]
+DATE_COLUMNS = ["error_occurred", "error_corrected", "last_modified"]
+
+def corrections_frame(corrections):
+    """
+    Typed frame of corrections from admin_api.get_corrections.
+
+    Args:
+        corrections (list): The ecfr_corrections list of the response
+
+    Returns:
+        tuple: (corrections, references). corrections has one row per
+        correction with categorical title and corrective_action, datetime
+        columns and days_to_correct. references has one row per CFR
+        reference of a correction, with the hierarchy levels it names.
+    """
+    rows = []
+    references = []
+    for correction in corrections:
+        rows.append({
+            "id": correction["id"],
+            "title": str(correction.get("title") or ""),
+            "year": correction.get("year"),
+            "corrective_action": correction.get("corrective_action") or "",
+            "fr_citation": correction.get("fr_citation") or "",
+            **{column: correction.get(column) for column in DATE_COLUMNS},
+        })
+        for reference in correction.get("cfr_references") or []:
+            hierarchy = reference.get("hierarchy") or {}
+            references.append({
+                "correction_id": correction["id"],
+                "cfr_reference": reference.get("cfr_reference") or "",
+                "title": str(hierarchy.get("title") or correction.get("title") or ""),
+                **{level: str(hierarchy.get(level) or "") for level in REFERENCE_LEVELS},
+                "section": str(hierarchy.get("section") or ""),
+            })
+
+    df = pd.DataFrame(rows, columns=[
+        "id", "title", "year", "corrective_action", "fr_citation"] + DATE_COLUMNS)
+    return _typed(df), _typed_references(pd.DataFrame(references, columns=[
+        "correction_id", "cfr_reference", "title"] + REFERENCE_LEVELS + ["section"]))
+
+def _typed(df):
+    df = df.astype({"id": "Int64", "year": "Int16"})
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column], errors="coerce")
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype("category")
+    df["days_to_correct"] = (df["error_corrected"] - df["error_occurred"]).dt.days.astype("Int32")
+    return df
+
+def _typed_references(df):
+    df = df.astype({"correction_id": "Int64"})
+    for column in ["title"] + REFERENCE_LEVELS:
+        df[column] = df[column].astype("category")
+    return df
+
+class CorrectionsStore:
+    """
+    Every eCFR correction, kept in the columnar store and refreshed by
+    error_corrected_date, one day at a time since the last refresh.
+
+    The date of the last successful refresh is kept beside the columnar
+    store, as corrections are too sparse to tell it from the data.
+    """
+
+    dataset = "corrections"
+    references_dataset = "correction_references"
+
+    def __init__(self, store=None):
+        self.store = store or ColumnarStore()
+        self.state_path = self.store.root / "corrections_refresh.json"
+
+    def last_refresh(self):
+        """Date of the last successful refresh, or None"""
+        try:
+            with open(self.state_path, "r") as f:
+                return date.fromisoformat(json.load(f)["last_refresh"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def load(self):
+        """
+        Stored corrections and references.
+
+        Raises:
+            FileNotFoundError: If refresh() never ran
+        """
+        corrections = self.store.read(self.dataset)
+        references = self.store.read(self.references_dataset)
+        return _typed(corrections.drop(columns="days_to_correct")), _typed_references(references)
+
+    def refresh(self, today=None):
+        """
+        Download corrections made since the last refresh and merge them in.
+
+        Returns:
+            tuple: (corrections, references) after the refresh
+        """
+        today = today or date.today()
+        last = self.last_refresh()
+        try:
+            corrections, references = self.load()
+        except FileNotFoundError:
+            corrections, references, last = None, None, None
+
+        if last is None or (today - last).days > MAX_INCREMENTAL_DAYS:
+            new_corrections, new_references = self._fetch()
+            corrections, references = new_corrections, new_references
+        else:
+            # Re-read the day of the last refresh too, as it was partial.
+            day = last
+            while day <= today:
+                new_corrections, new_references = self._fetch(day.isoformat())
+                corrections, references = self._merge(
+                    corrections, references, new_corrections, new_references)
+                day += timedelta(days=1)
+
+        self.store.write(self.dataset, corrections)
+        self.store.write(self.references_dataset, references)
+        self._save_last_refresh(today)
+        return corrections, references
+
+    def _save_last_refresh(self, day):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"last_refresh": day.isoformat()}, f)
+        tmp_path.replace(self.state_path)
+
+    def _fetch(self, error_corrected_date=None):
+        status_code, is_expected_status_code, response_data = admin_api.get_corrections(
+            error_corrected_date=error_corrected_date)
+        if not is_expected_status_code or response_data is None:
+            raise RuntimeError(f"Failed to fetch corrections: Status code {status_code}")
+        return corrections_frame(response_data["ecfr_corrections"])
+
+    @staticmethod
+    def _merge(corrections, references, new_corrections, new_references):
+        if new_corrections.empty:
+            return corrections, references
+        ids = set(new_corrections["id"].dropna())
+        corrections = pd.concat(
+            [corrections[~corrections["id"].isin(ids)].astype(object),
+             new_corrections.astype(object)],
+            ignore_index=True)
+        references = pd.concat(
+            [references[~references["correction_id"].isin(ids)].astype(object),
+             new_references.astype(object)],
+            ignore_index=True)
+        return _typed(corrections.drop(columns="days_to_correct")), _typed_references(references)
+
+def corrections_per_title_year(corrections):
+    """Number of corrections per title (rows) and year (columns)"""
+    return corrections.pivot_table(
+        index="title", columns="year", values="id", aggfunc="count",
+        fill_value=0, observed=True)
+
+def time_to_correct(corrections, by="title"):
+    """
+    Distribution of days from error to correction.
+
+    Returns:
+        pandas.DataFrame: count, mean and quantiles of days_to_correct per
+        value of by
+    """
+    days = corrections.dropna(subset=["days_to_correct"])
+    grouped = days.groupby(by, observed=True)["days_to_correct"]
+    summary = grouped.quantile([0.5, 0.9, 0.99]).unstack()
+    summary.columns = ["p50", "p90", "p99"]
+    summary.insert(0, "mean", grouped.mean())
+    summary.insert(0, "count", grouped.count())
+    return summary.reset_index()
+
+def agency_correction_rates(corrections, references, agency_references):
+    """
+    Corrections per agency, in total and per year covered by the data.
+
+    Args:
+        corrections (pandas.DataFrame): From CorrectionsStore.load
+        references (pandas.DataFrame): From CorrectionsStore.load
+        agency_references (pandas.DataFrame): From
+            regulation_size.agency_references
+
+    Returns:
+        pandas.DataFrame: agency_slug, agency_name, corrections and
+        corrections_per_year, sorted by corrections
+    """
+    attributed = attribute_nodes(
+        references.rename(columns={"correction_id": "identifier"}), agency_references)
+    counts = attributed.groupby(["agency_slug", "agency_name"], observed=True)[
+        "identifier"].nunique().rename("corrections").reset_index()
+    years = corrections["year"].dropna()
+    span = int(years.max() - years.min() + 1) if len(years) else 1
+    counts["corrections_per_year"] = counts["corrections"] / span
+    return counts.sort_values("corrections", ascending=False, ignore_index=True)
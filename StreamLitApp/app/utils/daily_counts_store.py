@@ -0,0 +1,179 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from StreamLitApp.app.eCFRAPI import search_api
+from .columnar_store import ColumnarStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: the manifest is only locked between threads
+    fcntl = None
+
+class DailyCountsStore:
+    """
+    Materialized search_api.get_counts_daily histograms, one per (query,
+    agency filter).
+
+    Each refresh asks only for dates after the last stored day, through the
+    last_modified_on_or_after filter, and merges them in. A key already
+    refreshed today is served from local storage without a request.
+
+    The manifest of refresh dates is shared with other processes using the
+    same store: entries are added under a file lock, to the manifest as
+    last written to disk. Within a process, use get_daily_counts_store() so
+    every session shares one store.
+    """
+
+    dataset = "daily_counts"
+
+    def __init__(self, store=None, max_workers=8):
+        self.store = store or ColumnarStore()
+        self.max_workers = max_workers
+        self.manifest_path = self.store.root / self.dataset / "manifest.json"
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self._manifest = self._load_manifest()
+
+    @contextmanager
+    def _locked(self):
+        # Excludes other threads and, where fcntl is available, other
+        # processes
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.manifest_path.with_suffix(".lock"), "a") as lock_file:
+                # Closing the file releases the lock
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    @staticmethod
+    def key(query, agency_slugs=None):
+        """Partition key of a query and agency filter"""
+        payload = json.dumps([query, sorted(agency_slugs or [])])
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def stored(self, query, agency_slugs=None):
+        """Stored daily counts without refreshing; empty if never fetched"""
+        try:
+            return self.store.read(
+                self.dataset, partition={"key": self.key(query, agency_slugs)})
+        except FileNotFoundError:
+            return pd.DataFrame({
+                "date": pd.Series(dtype="datetime64[ns]"),
+                "count": pd.Series(dtype="int64"),
+            })
+
+    def get(self, query, agency_slugs=None, today=None):
+        """
+        Daily counts for a query and agency filter, fetching only new days.
+
+        Args:
+            query (str): Search term
+            agency_slugs (list, optional): Agency slugs to limit the search to
+            today (datetime.date, optional): Date of the refresh
+
+        Returns:
+            pandas.DataFrame: date and count columns, sorted by date
+
+        Raises:
+            RuntimeError: If the counts could not be fetched
+        """
+        today = today or date.today()
+        key = self.key(query, agency_slugs)
+        with self._lock:
+            self._reload_manifest()
+            entry = self._manifest.get(key)
+        stored = self.stored(query, agency_slugs)
+        if entry and entry["refreshed_on"] == today.isoformat():
+            return stored
+
+        since = None
+        if not stored.empty:
+            since = (stored["date"].max().date() + timedelta(days=1)).isoformat()
+        status_code, is_expected_status_code, response_data = search_api.get_counts_daily(
+            query, agency_slugs=agency_slugs, last_modified_on_or_after=since)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch daily counts for '{query}': Status code {status_code}")
+
+        new = pd.DataFrame(
+            list((response_data.get("dates") or {}).items()), columns=["date", "count"])
+        new["date"] = pd.to_datetime(new["date"])
+        new["count"] = new["count"].astype("int64")
+        merged = pd.concat([stored, new], ignore_index=True) \
+            .drop_duplicates("date", keep="last") \
+            .sort_values("date", ignore_index=True)
+
+        self.store.write(self.dataset, merged, partition={"key": key})
+        with self._locked():
+            self._reload_manifest()
+            self._manifest[key] = {
+                "query": query,
+                "agency_slugs": sorted(agency_slugs or []),
+                "refreshed_on": today.isoformat(),
+            }
+            self._save_manifest()
+        return merged
+
+    def get_many(self, query, agency_slugs, today=None):
+        """
+        Daily counts of a query for each agency separately, fetched
+        concurrently.
+
+        Returns:
+            pandas.DataFrame: date, agency_slug and count columns
+        """
+        def fetch(agency_slug):
+            return self.get(query, [agency_slug], today=today).assign(agency_slug=agency_slug)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            frames = list(executor.map(fetch, agency_slugs))
+        if not frames:
+            return pd.DataFrame(columns=["date", "agency_slug", "count"])
+        return pd.concat(frames, ignore_index=True)[["date", "agency_slug", "count"]]
+
+    def _manifest_stamp(self):
+        try:
+            return self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_manifest(self):
+        self._manifest_mtime = self._manifest_stamp()
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _reload_manifest(self):
+        # Pick up keys another process refreshed since the last read
+        if self._manifest_stamp() != self._manifest_mtime:
+            self._manifest = self._load_manifest()
+
+    def _save_manifest(self):
+        # Only written under the file lock, so one temporary file will do
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f, indent=2)
+        tmp_path.replace(self.manifest_path)
+        self._manifest_mtime = self._manifest_stamp()
+
+@st.cache_resource
+def get_daily_counts_store():
+    """
+    Get the process-wide daily counts store.
+
+    Returns:
+        DailyCountsStore shared by every session
+    """
+    return DailyCountsStore()
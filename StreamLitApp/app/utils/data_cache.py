@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+
+class DataCache:
+    """
+    Process-wide cache of loaded data, shared by every session.
+
+    Entries are keyed by (namespace, key), e.g. ("parts", "12"). Each
+    namespace can have its own time to live; the cache as a whole holds at
+    most max_entries, least recently used first out. Concurrent loads of the
+    same entry run the loader once and share its result, and a load that an
+    invalidate() overtakes is not cached.
+
+    Cached values are shared, so callers must not modify them in place.
+    """
+
+    def __init__(self, max_entries=256, default_ttl=3600, ttls=None, clock=time.monotonic):
+        """
+        Args:
+            max_entries (int): Maximum number of entries across namespaces
+            default_ttl (float): Seconds an entry stays fresh; None for no
+                expiry
+            ttls (dict, optional): Time to live per namespace, overriding
+                default_ttl
+            clock (callable): Time source, for tests
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._loading = {}
+        # Invalidations per entry while it loads
+        self._generations = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _fresh(self, entry):
+        expires_at = entry[1]
+        return expires_at is None or self._clock() < expires_at
+
+    def get(self, namespace, key, loader, cacheable=None):
+        """
+        The cached value of an entry, loading it with loader() if it is
+        missing or expired.
+
+        Args:
+            cacheable (callable, optional): Called with a loaded value;
+                returning False hands the value back without caching it,
+                and a number caches it for that many seconds instead of the
+                namespace's time to live, e.g. a fallback returned after a
+                failed fetch
+        """
+        cache_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and self._fresh(entry):
+                self._entries.move_to_end(cache_key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+            event = self._loading.get(cache_key)
+            if event is None:
+                event = self._loading[cache_key] = threading.Event()
+                generation = self._generations[cache_key] = 0
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            # Another thread is loading this entry; wait for its result.
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(cache_key)
+            if entry is not None:
+                return entry[0]
+            return self.get(namespace, key, loader, cacheable)
+
+        try:
+            value = loader()
+            keep = True if cacheable is None else cacheable(value)
+            if keep:
+                # A number is a time to live, anything else just true
+                ttl = keep if isinstance(keep, (int, float)) and not isinstance(keep, bool) else None
+                with self._lock:
+                    # Invalidated while loading: the value may predate it
+                    if self._generations.get(cache_key) == generation:
+                        self._put(namespace, key, value, ttl)
+            return value
+        finally:
+            with self._lock:
+                self._loading.pop(cache_key, None)
+                self._generations.pop(cache_key, None)
+            event.set()
+
+    def put(self, namespace, key, value, ttl=None):
+        """
+        Store a value, e.g. one loaded by a background refresh.
+
+        Args:
+            ttl (float, optional): Seconds the value stays fresh; the
+                namespace's time to live if None
+        """
+        with self._lock:
+            self._put(namespace, key, value, ttl)
+
+    def _put(self, namespace, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttls.get(namespace, self.default_ttl)
+        expires_at = None if ttl is None else self._clock() + ttl
+        self._entries[(namespace, key)] = (value, expires_at)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, namespace=None, key=None, match=None):
+        """
+        Drop entries: one entry, a whole namespace, or everything.
+
+        Args:
+            match (callable, optional): Drop only entries whose key it
+                returns True for, e.g. keys that start with a title number
+
+        Returns:
+            int: Number of entries dropped
+        """
+        def matches(cache_key):
+            return (namespace is None or cache_key[0] == namespace) \
+                and (key is None or cache_key[1] == key) \
+                and (match is None or match(cache_key[1]))
+
+        with self._lock:
+            doomed = [cache_key for cache_key in self._entries if matches(cache_key)]
+            for cache_key in doomed:
+                del self._entries[cache_key]
+            for cache_key in self._loading:
+                if matches(cache_key):
+                    self._generations[cache_key] += 1
+        return len(doomed)
+
+    def refresh(self, namespace, key, loader, cacheable=None):
+        """Reload an entry now, replacing any cached value"""
+        self.invalidate(namespace, key)
+        return self.get(namespace, key, loader, cacheable)
+
+    def metrics(self):
+        """Entry count and hit, miss and eviction counters"""
+        with self._lock:
+            namespaces = {}
+            for namespace, _ in self._entries:
+                namespaces[namespace] = namespaces.get(namespace, 0) + 1
+            return {
+                "entries": len(self._entries),
+                "namespaces": namespaces,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
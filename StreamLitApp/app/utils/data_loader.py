@@ -1,6 +1,8 @@
 import pandas as pd
 import streamlit as st
 from pathlib import Path
+from .columnar_store import ColumnarStore
+from .indexed_frame import TimeIndexedFrame
 
 # Get the app directory (parent of utils)
 app_dir = Path(__file__).parent.parent
@@ -12,13 +14,34 @@ data_dir.mkdir(exist_ok=True)
 # Use absolute path for CSV
 csv_path = data_dir / "sample_data.csv"
 
-@st.cache_data
+def _csv_version():
+    # Modification time and size of the CSV, or None if there is none
+    try:
+        stat = csv_path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
 def load_sample_data():
-    """Load and cache sample data"""
+    """Load and cache sample data, again whenever the CSV changes"""
+    return _load_sample_data(_csv_version())
+
+@st.cache_data(max_entries=1)
+def _load_sample_data(csv_version):
+    store = ColumnarStore()
+    parquet_path = store.path_for('sample_data')
+    # Typed Parquet copy, read without re-parsing text, unless the CSV was
+    # edited after the copy was made
+    if parquet_path.exists() and (
+            csv_version is None or parquet_path.stat().st_mtime_ns >= csv_version[0]):
+        return store.read('sample_data')
+
     try:
         # Try to load from data directory
         # Parse dates when reading the CSV
-        return pd.read_csv(csv_path, parse_dates=['date'])
+        df = pd.read_csv(csv_path, parse_dates=['date'])
+        store.write('sample_data', df)
+        return store.read('sample_data')
     except FileNotFoundError:
         # If file doesn't exist, create sample data
         import numpy as np
@@ -42,4 +65,19 @@ def load_sample_data():
         
         # Save for future use
         df.to_csv(csv_path, index=False)
-        return df
+        store.write('sample_data', df)
+        return store.read('sample_data')
+
+def load_indexed_data():
+    """
+    Load the sample data sorted and indexed for filtering, once per process
+    and version of the CSV.
+
+    Cached as a resource so reruns share the same frame instead of getting
+    a copy of it.
+    """
+    return _load_indexed_data(_csv_version())
+
+@st.cache_resource(max_entries=1)
+def _load_indexed_data(csv_version):
+    return TimeIndexedFrame(_load_sample_data(csv_version))
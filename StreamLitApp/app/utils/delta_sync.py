@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import streamlit as st
+from .supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+def hash_record(record):
+    """Content hash of a single row, independent of column order"""
+    payload = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class DeltaSync:
+    """
+    Upsert only rows whose content changed since they were last written.
+
+    The content hash of every row written is kept in a local manifest, grouped
+    by table and scope. A scope is the subset of a table one fetch returns
+    (e.g. the parts of one title), so rows missing from a fetch can be
+    tombstoned without touching rows of other scopes.
+    """
+
+    def __init__(self, supabase, manifest_path=None, history_size=50):
+        self.supabase = supabase
+        self.manifest_path = Path(manifest_path or data_dir / "sync_manifest.json")
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+        self.reports = deque(maxlen=history_size)
+
+    def sync(
+        self,
+        table,
+        df,
+        key_columns=None,
+        scope=None,
+        tombstone_column="deleted_at"
+    ):
+        """
+        Upsert the new or changed rows of df into table.
+
+        Args:
+            table (str): Supabase table name
+            df (pandas.DataFrame): Every row currently in scope
+            key_columns (list, optional): Columns identifying a row. If not
+                given, or df lacks any of them, the row hash itself is the key,
+                so a changed row is written as a new row.
+            scope (str, optional): Subset of the table df covers; defaults to
+                the whole table
+            tombstone_column (str): Column set to the deletion time on rows
+                that are no longer returned, and cleared on rows that are
+                returned again. With key_columns, the table must have it as
+                a nullable column (see supabase/migrations).
+
+        Returns:
+            dict: table, scope, written, skipped, tombstoned counts
+
+        Raises:
+            RuntimeError: If rows cannot be tombstoned, e.g. because the
+                table lacks tombstone_column; the rows upserted are still
+                recorded, and the tombstones are retried on the next sync
+        """
+        records = df.to_dict("records")
+        if key_columns and not all(column in df.columns for column in key_columns):
+            key_columns = None
+
+        current = {}
+        for record in records:
+            row_hash = hash_record(record)
+            key = self._row_key(record, key_columns) if key_columns else row_hash
+            current[key] = (row_hash, record)
+
+        scope = "*" if scope is None else str(scope)
+        with self._lock:
+            state = self._manifest.setdefault(table, {}).setdefault(
+                scope, {"rows": {}, "tombstones": {}})
+            previous = dict(state["rows"])
+            tombstoned = set(state["tombstones"])
+
+        changed = [
+            # A row returned again after being tombstoned is live again
+            {**record, tombstone_column: None} if key in tombstoned and key_columns else record
+            for key, (row_hash, record) in current.items()
+            if previous.get(key) != row_hash
+        ]
+        deleted = [key for key in previous if key not in current]
+
+        deleted_at = datetime.now().isoformat()
+        if self.supabase and changed:
+            self.supabase.table(table).upsert(changed).execute()
+
+        pending = deleted if self.supabase and key_columns else []
+        with self._lock:
+            state["rows"] = {key: row_hash for key, (row_hash, _) in current.items()}
+            for key in current:
+                state["tombstones"].pop(key, None)
+            for key in deleted:
+                if key in pending:
+                    # Kept until tombstoned below, so a failed update is
+                    # retried on the next sync
+                    state["rows"][key] = previous[key]
+                else:
+                    state["tombstones"][key] = deleted_at
+            self._save_manifest()
+
+        try:
+            for key in pending:
+                match = dict(zip(key_columns, json.loads(key)))
+                try:
+                    self.supabase.table(table).update(
+                        {tombstone_column: deleted_at}).match(match).execute()
+                except Exception as e:
+                    raise RuntimeError(
+                        f"Failed to tombstone {match} in {table}: {e}. The table needs a "
+                        f"nullable {tombstone_column} column, see supabase/migrations") from e
+                with self._lock:
+                    state["rows"].pop(key, None)
+                    state["tombstones"][key] = deleted_at
+        finally:
+            if pending:
+                with self._lock:
+                    self._save_manifest()
+
+        report = {
+            "table": table,
+            "scope": scope,
+            "written": len(changed),
+            "skipped": len(current) - len(changed),
+            "tombstoned": len(deleted),
+            "synced_at": deleted_at,
+        }
+        self.reports.append(report)
+        logger.info(
+            "Synced %s[%s]: %d written, %d skipped, %d tombstoned",
+            table, scope, report["written"], report["skipped"], report["tombstoned"])
+        return report
+
+    def tombstones(self, table, scope=None):
+        """Keys of rows tombstoned in table/scope, with their deletion times"""
+        scope = "*" if scope is None else str(scope)
+        with self._lock:
+            state = self._manifest.get(table, {}).get(scope, {})
+            return dict(state.get("tombstones", {}))
+
+    def forget(self, table, scope=None):
+        """Drop stored hashes so the next sync rewrites every row"""
+        with self._lock:
+            if scope is None:
+                self._manifest.pop(table, None)
+            else:
+                self._manifest.get(table, {}).pop(str(scope), None)
+            self._save_manifest()
+
+    @staticmethod
+    def _row_key(record, key_columns):
+        return json.dumps([record[column] for column in key_columns], default=str)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f)
+        tmp_path.replace(self.manifest_path)
+
+@st.cache_resource
+def get_delta_sync():
+    """
+    Get the process-wide delta sync, bound to the cached Supabase client.
+
+    Returns:
+        DeltaSync shared by every session
+    """
+    return DeltaSync(get_supabase_client())
@@ -0,0 +1,169 @@
+from collections import defaultdict
+
+import pandas as pd
+
+try:
+    # Imported as StreamLitApp.app.utils
+    from ..ParseeCFR.text_metrics import WORD_PATTERN
+except ImportError:
+    # Imported as a top-level package, with the app directory on the path
+    from ParseeCFR.text_metrics import WORD_PATTERN
+from .columnar_store import ColumnarStore
+
+def tokenize(text):
+    """Lowercased word tokens of text"""
+    return [word.lower() for word in WORD_PATTERN.findall(text)]
+
+class WordCountIndex:
+    """
+    Word count of every section, updated one section at a time.
+
+    Stored in the columnar store as the word_counts dataset, one partition
+    per title.
+    """
+
+    dataset = "word_counts"
+
+    def __init__(self, store=None):
+        self.store = store or ColumnarStore()
+        self._titles = {}
+
+    def _title(self, title):
+        title = str(title)
+        if title not in self._titles:
+            try:
+                df = self.store.read(self.dataset, partition={"title": title})
+                self._titles[title] = {
+                    row["identifier"]: (row["part"], int(row["word_count"]))
+                    for row in df.to_dict("records")
+                }
+            except FileNotFoundError:
+                self._titles[title] = {}
+        return self._titles[title]
+
+    def update(self, title, section):
+        """Recount one section, a dict from parse_title_xml.iter_sections"""
+        self._title(title)[section["identifier"]] = (
+            section["part"], len(tokenize(section["text"])))
+
+    def remove(self, title, identifier):
+        self._title(title).pop(identifier, None)
+
+    def replace_title(self, title, sections):
+        """Recount every section of a title, dropping sections not given"""
+        self._titles[str(title)] = {}
+        for section in sections:
+            self.update(title, section)
+
+    def frame(self, title):
+        """Per-section word counts of a title"""
+        rows = [
+            {"identifier": identifier, "part": part, "word_count": count}
+            for identifier, (part, count) in self._title(title).items()
+        ]
+        return pd.DataFrame(rows, columns=["identifier", "part", "word_count"])
+
+    def totals(self, titles):
+        """Total word count per title"""
+        return pd.DataFrame([
+            {"title": str(title), "word_count": self.frame(title)["word_count"].sum()}
+            for title in titles
+        ])
+
+    def save(self, title):
+        self.store.write(self.dataset, self.frame(title), partition={"title": str(title)})
+
+class SearchIndex:
+    """
+    Inverted index from lowercased terms to the sections containing them,
+    updated one section at a time.
+
+    Stored in the columnar store as the search_postings dataset, one partition
+    per title.
+    """
+
+    dataset = "search_postings"
+
+    def __init__(self, store=None):
+        self.store = store or ColumnarStore()
+        self._section_terms = {}
+        self._postings = defaultdict(set)
+
+    def _title(self, title):
+        title = str(title)
+        if title not in self._section_terms:
+            section_terms = defaultdict(set)
+            try:
+                df = self.store.read(self.dataset, partition={"title": title})
+                for identifier, term in zip(df["identifier"], df["term"]):
+                    section_terms[identifier].add(term)
+            except FileNotFoundError:
+                pass
+            self._section_terms[title] = dict(section_terms)
+            for identifier, terms in section_terms.items():
+                for term in terms:
+                    self._postings[term].add((title, identifier))
+        return self._section_terms[title]
+
+    def update(self, title, section):
+        """Re-index one section, a dict from parse_title_xml.iter_sections"""
+        title = str(title)
+        self.remove(title, section["identifier"])
+        terms = set(tokenize(section["heading"] + " " + section["text"]))
+        self._title(title)[section["identifier"]] = terms
+        for term in terms:
+            self._postings[term].add((title, section["identifier"]))
+
+    def remove(self, title, identifier):
+        title = str(title)
+        for term in self._title(title).pop(identifier, ()):
+            self._postings[term].discard((title, identifier))
+
+    def replace_title(self, title, sections):
+        """Re-index every section of a title, dropping sections not given"""
+        for identifier in list(self._title(title)):
+            self.remove(title, identifier)
+        for section in sections:
+            self.update(title, section)
+
+    def search(self, query, titles=None):
+        """
+        Find sections containing every term of query.
+
+        Args:
+            query (str): Search terms
+            titles (list, optional): Only search these titles
+
+        Returns:
+            list: Sorted (title, identifier) tuples
+        """
+        for title in (titles if titles is not None else self.indexed_titles()):
+            self._title(title)
+        terms = tokenize(query)
+        if not terms:
+            return []
+        matches = set.intersection(*(self._postings.get(term, set()) for term in terms))
+        if titles is not None:
+            titles = {str(title) for title in titles}
+            matches = {match for match in matches if match[0] in titles}
+        return sorted(matches)
+
+    def indexed_titles(self):
+        """Titles indexed in memory or on disk"""
+        titles = set(self._section_terms)
+        dataset_dir = self.store.root / self.dataset
+        if dataset_dir.exists():
+            titles.update(
+                path.name.split("=", 1)[1] for path in dataset_dir.glob("title=*"))
+        return sorted(titles)
+
+    def save(self, title):
+        rows = [
+            {"identifier": identifier, "term": term}
+            for identifier, terms in self._title(title).items()
+            for term in sorted(terms)
+        ]
+        self.store.write(
+            self.dataset,
+            pd.DataFrame(rows, columns=["identifier", "term"]),
+            partition={"title": str(title)})
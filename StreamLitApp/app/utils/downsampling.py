@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("lttb", "minmax")
+
+def _numeric(values):
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("int64").to_numpy(dtype=float)
+    return values.to_numpy(dtype=float)
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indexes of threshold points that keep
+    the visual shape of a series.
+
+    The first and last points are kept; every bucket in between keeps the
+    point forming the largest triangle with the point kept from the bucket
+    before and the average of the bucket after.
+
+    Args:
+        x (array-like): Sorted x values (numbers or datetimes)
+        y (array-like): y values
+        threshold (int): Number of points to keep
+
+    Returns:
+        numpy.ndarray: Sorted row positions
+    """
+    x = _numeric(x)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[a] - average_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (average_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+    return selected
+
+def minmax_indices(y, buckets):
+    """
+    Indexes of the minimum and maximum of each of buckets equal-width
+    buckets, plus the first and last points; keeps every spike.
+
+    Returns:
+        numpy.ndarray: Sorted, distinct row positions (at most
+        2 * buckets + 2)
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * buckets + 2:
+        return np.arange(n)
+    bucket_of = np.arange(n) * buckets // n
+    # Sorted by bucket, then value: each bucket's first row is its minimum
+    # and its last row its maximum.
+    order = np.lexsort((y, bucket_of))
+    boundaries = np.flatnonzero(np.diff(bucket_of[order])) + 1
+    firsts = order[np.r_[0, boundaries]]
+    lasts = order[np.r_[boundaries - 1, n - 1]]
+    return np.unique(np.concatenate([[0, n - 1], firsts, lasts]))
+
+def downsample(data, x_col, y_col, max_points, method="lttb"):
+    """
+    Rows of data to plot at most max_points of one series.
+
+    Args:
+        data (pandas.DataFrame): Series sorted by x_col
+        max_points (int): Point budget, e.g. the chart width in pixels
+        method (str): 'lttb' or 'minmax'
+
+    Returns:
+        pandas.DataFrame: The kept rows, in order; data itself if it is
+        already within the budget
+    """
+    if len(data) <= max_points:
+        return data
+    if method == "lttb":
+        positions = lttb_indices(data[x_col], data[y_col], max_points)
+    elif method == "minmax":
+        positions = minmax_indices(data[y_col], max(1, (max_points - 2) // 2))
+    else:
+        raise ValueError(f"Unknown downsampling method {method!r}, expected one of {METHODS}")
+    return data.iloc[positions]
+
+def benchmark(points=500_000, max_points=1200, seed=0):
+    """
+    Payload size and figure build time of a random walk, in full and
+    downsampled.
+
+    Returns:
+        pandas.DataFrame: method, points, payload_bytes (the figure JSON
+        sent to the browser) and seconds (downsampling plus building and
+        serializing the figure)
+    """
+    import plotly.express as px
+
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=points, freq="min"),
+        "value": np.cumsum(rng.normal(size=points)),
+    })
+    rows = []
+    for method in (None,) + METHODS:
+        start = time.perf_counter()
+        plotted = data if method is None else downsample(data, "date", "value", max_points, method)
+        payload = px.line(plotted, x="date", y="value").to_json()
+        rows.append({
+            "method": method or "full",
+            "points": len(plotted),
+            "payload_bytes": len(payload),
+            "seconds": time.perf_counter() - start,
+        })
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    # Downsampling benchmark, from the repository root:
+    # python -m StreamLitApp.app.utils.downsampling
+    print(benchmark().to_string(index=False))
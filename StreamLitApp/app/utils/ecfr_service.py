@@ -1,31 +1,276 @@
 import pandas as pd
 import streamlit as st
 import requests
-from datetime import datetime
+from datetime import datetime, date
+import base64
 import json
+import os
+import threading
 from pathlib import Path
 from .supabase_client import get_supabase_client
+from .write_behind import get_write_behind_queue
+from .delta_sync import get_delta_sync
+from .columnar_store import ColumnarStore
+from .blob_store import get_blob_store
+from .frame_schemas import apply_schema, memory_report
+from .data_cache import DataCache
 
 # Get the app directory
 app_dir = Path(__file__).parent.parent
 data_dir = app_dir / "data"
 data_dir.mkdir(exist_ok=True)
 
+# Seconds each kind of data stays cached before it is fetched again
+CACHE_TTLS = {
+    'titles': 3600,
+    'agencies': 3600,
+    'parts': 6 * 3600,
+    'history': 6 * 3600,
+    'content': 24 * 3600,
+}
+
+# Seconds a local backup returned after a failed fetch stays cached, so the
+# fetch is retried soon
+FALLBACK_TTL = 60
+
+# Sync state the refresh pipeline (refresh_pipeline.py) rewrites after
+# every title it refreshes, in this or another process
+REFRESH_STATE_PATH = data_dir / "refresh_state.json"
+
+# Hashes per Supabase lookup of stored blobs, to keep request URLs short
+BLOB_QUERY_BATCH = 100
+
+def _has_rows(df):
+    # Fallbacks after a failed fetch come back empty and are not cached
+    return not df.empty
+
 class ECFRService:
-    """Service for fetching and analyzing eCFR data"""
+    """
+    Service for fetching and analyzing eCFR data
+
+    Fetched frames are kept in a DataCache; use get_ecfr_service() to share
+    one service, and so one warm cache, across every session. Titles the
+    refresh pipeline refreshes are dropped from the cache: the pipeline's
+    sync state file is checked before every cached read, so this works with
+    the pipeline running as its own process.
+    """
     
-    def __init__(self):
+    def __init__(self, delta_sync=True, cache=None, refresh_state_path=None):
+        """
+        Args:
+            delta_sync (bool): Upsert only rows that changed since the last
+                sync instead of every row fetched
+            cache (DataCache, optional): Cache of fetched frames
+            refresh_state_path (str, optional): Sync state file of the
+                refresh pipeline to watch
+        """
         self.supabase = get_supabase_client()
+        self.writer = get_write_behind_queue()
+        self.delta_sync = get_delta_sync() if delta_sync else None
+        self.store = ColumnarStore()
+        self.blobs = get_blob_store()
         self.base_url = "https://www.ecfr.gov/api/v1"
-        
+        self._memory = {}
+        self.cache = cache or DataCache(max_entries=512, ttls=CACHE_TTLS)
+        self.refresh_state_path = Path(refresh_state_path or REFRESH_STATE_PATH)
+        self._refresh_lock = threading.Lock()
+        self._refresh_stamp, self._synced = self._read_refresh_state()
+        # Whether the current thread's load fell back to a local backup
+        self._fallback = threading.local()
+
+    def _persist(self, table, df, partition=None, key_columns=None, scope=None):
+        """
+        Queue the Supabase upsert and local Parquet backup of df on the
+        write-behind queue so the caller gets the data without waiting on
+        storage.
+
+        With delta sync, only rows whose content changed are upserted, and rows
+        of the same scope that are no longer returned are tombstoned.
+        """
+        df = df.copy()
+        supabase = self.supabase
+        delta_sync = self.delta_sync
+        store = self.store
+
+        def write():
+            if supabase and delta_sync:
+                delta_sync.sync(table, df, key_columns=key_columns, scope=scope)
+            elif supabase:
+                supabase.table(table).upsert(df.to_dict('records')).execute()
+            store.write(table, df, partition=partition)
+
+        self.writer.submit((table, str(store.path_for(table, partition))), write)
+
+    def _typed(self, table, df):
+        """
+        Apply the table's declared schema (frame_schemas.FRAME_SCHEMAS) to a
+        frame at ingestion, and record its memory use before and after.
+        """
+        typed = apply_schema(df, table)
+        report = memory_report(typed, untyped=df).iloc[-1]
+        self._memory[table] = {
+            'table': table,
+            'rows': len(typed),
+            'bytes': int(report['bytes']),
+            'untyped_bytes': int(report['untyped_bytes']),
+        }
+        return typed
+
+    def memory_report(self):
+        """Rows and memory of the last frame returned per table, typed and untyped"""
+        return pd.DataFrame(
+            list(self._memory.values()),
+            columns=['table', 'rows', 'bytes', 'untyped_bytes'])
+
+    def _load_backup(self, table, partition=None, legacy_csv=None):
+        """
+        Load the local backup of a table, falling back to the CSV backups
+        written by earlier versions.
+        """
+        self._fallback.used = True
+        try:
+            return self._typed(table, self.store.read(table, partition=partition))
+        except Exception:
+            pass
+        try:
+            return self._typed(table, pd.read_csv(legacy_csv))
+        except:
+            return pd.DataFrame()
+
+    def persistence_metrics(self):
+        """Queue depth and lag metrics of the background persistence"""
+        return self.writer.metrics()
+
+    def sync_reports(self):
+        """Rows written, skipped and tombstoned by recent delta syncs"""
+        return list(self.delta_sync.reports) if self.delta_sync else []
+
     def fetch_titles(self):
-        """Fetch all CFR titles"""
+        """Fetch all CFR titles (cached; do not modify the frame)"""
+        return self._cached('titles', None, self._load_titles)
+
+    def fetch_agencies(self):
+        """Fetch all agencies (cached; do not modify the frame)"""
+        return self._cached('agencies', None, self._load_agencies)
+
+    def fetch_title_parts(self, title_number):
+        """Fetch parts for a specific title (cached; do not modify the frame)"""
+        return self._cached(
+            'parts', str(title_number), lambda: self._load_title_parts(title_number))
+
+    def fetch_part_content(self, title_number, part_number):
+        """Fetch content for a specific part (cached; do not modify it)"""
+        return self._cached(
+            'content', (str(title_number), str(part_number)),
+            lambda: self._load_part_content(title_number, part_number), cacheable=bool)
+
+    def get_historical_changes(self, title_number, part_number, limit=10):
+        """Get historical changes for a specific part (cached; do not modify the frame)"""
+        return self._cached(
+            'history', (str(title_number), str(part_number), limit),
+            lambda: self._load_historical_changes(title_number, part_number, limit))
+
+    def _cached(self, namespace, key, loader, cacheable=_has_rows):
+        self.check_refreshes()
+        return self.cache.get(
+            namespace, key, self._tracking_fallback(loader), cacheable=self._keep(cacheable))
+
+    def _tracking_fallback(self, loader):
+        def load():
+            self._fallback.used = False
+            return loader()
+        return load
+
+    def _keep(self, cacheable):
+        # Called right after the loader, on the same thread
+        def keep(value):
+            if not cacheable(value):
+                return False
+            return FALLBACK_TTL if self._fallback.used else True
+        return keep
+
+    def _read_refresh_state(self):
+        try:
+            stamp = os.stat(self.refresh_state_path).st_mtime_ns
+            with open(self.refresh_state_path, 'r') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, {}
+        return stamp, {title: synced.get('synced_at') for title, synced in state.items()}
+
+    def check_refreshes(self):
+        """
+        Drop the cached data of titles the refresh pipeline refreshed since
+        the last check. Costs one stat() unless the sync state changed.
+
+        Returns:
+            list: Numbers of the titles dropped
+        """
+        try:
+            stamp = os.stat(self.refresh_state_path).st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._refresh_stamp:
+            return []
+        with self._refresh_lock:
+            if stamp == self._refresh_stamp:
+                return []
+            self._refresh_stamp, synced = self._read_refresh_state()
+            refreshed = [
+                title for title, synced_at in synced.items()
+                if self._synced.get(title) != synced_at
+            ]
+            self._synced = synced
+        for title in refreshed:
+            self.invalidate(title)
+        return refreshed
+
+    def invalidate(self, title_number=None):
+        """
+        Drop cached data so the next request fetches it again.
+
+        Args:
+            title_number (str, optional): Drop only the titles list and this
+                title's parts, part content and history; everything if None
+
+        Returns:
+            int: Number of cache entries dropped
+        """
+        if title_number is None:
+            return self.cache.invalidate()
+        title_number = str(title_number)
+        return (
+            self.cache.invalidate('titles')
+            + self.cache.invalidate('parts', title_number)
+            + self.cache.invalidate('content', match=lambda key: key[0] == title_number)
+            + self.cache.invalidate('history', match=lambda key: key[0] == title_number)
+        )
+
+    def refresh_titles(self):
+        """Fetch the titles list again now, replacing the cached copy"""
+        return self.cache.refresh(
+            'titles', None, self._tracking_fallback(self._load_titles),
+            cacheable=self._keep(_has_rows))
+
+    def on_title_refreshed(self, report):
+        """
+        Listener for RefreshPipeline.add_listener: invalidates the cached
+        data of each title a pipeline running in this process refreshes,
+        without waiting for the next check_refreshes().
+        """
+        self.invalidate(report['title'])
+
+    def cache_metrics(self):
+        """Entries per namespace and hit, miss and eviction counts of the cache"""
+        return self.cache.metrics()
+
+    def _load_titles(self):
         try:
             # Try to get from Supabase first
             if self.supabase:
                 response = self.supabase.table('ecfr_titles').select('*').execute()
                 if response.data:
-                    return pd.DataFrame(response.data)
+                    return self._typed('ecfr_titles', pd.DataFrame(response.data))
     
             # If not in Supabase or no connection, fetch from API
             url = f"{self.base_url}/titles"
@@ -35,33 +280,26 @@ class ECFRService:
             titles = response.json()['data']
             df = pd.DataFrame(titles)
             
-            # Save to Supabase if available
-            if self.supabase:
-                self.supabase.table('ecfr_titles').upsert(df.to_dict('records')).execute()
-            
-            # Save locally as backup
-            df.to_csv(data_dir / "ecfr_titles.csv", index=False)
+            # Save to Supabase if available and locally as backup, in the
+            # background
+            self._persist('ecfr_titles', df, key_columns=['number'])
             
-            return df
+            return self._typed('ecfr_titles', df)
         
         except Exception as e:
             st.error(f"Error fetching titles: {e}")
             
             # Try to load from local backup
-            try:
-                return pd.read_csv(data_dir / "ecfr_titles.csv")
-            except:
-                return pd.DataFrame()
+            return self._load_backup(
+                'ecfr_titles', legacy_csv=data_dir / "ecfr_titles.csv")
     
-    @st.cache_data(ttl=3600)  # Cache for 1 hour
-    def fetch_agencies(self):
-        """Fetch all agencies"""
+    def _load_agencies(self):
         try:
             # Try to get from Supabase first
             if self.supabase:
                 response = self.supabase.table('ecfr_agencies').select('*').execute()
                 if response.data:
-                    return pd.DataFrame(response.data)
+                    return self._typed('ecfr_agencies', pd.DataFrame(response.data))
             
             # If not in Supabase or no connection, fetch from API
             url = f"{self.base_url}/agencies"
@@ -71,33 +309,26 @@ class ECFRService:
             agencies = response.json()['data']
             df = pd.DataFrame(agencies)
             
-            # Save to Supabase if available
-            if self.supabase:
-                self.supabase.table('ecfr_agencies').upsert(df.to_dict('records')).execute()
-            
-            # Save locally as backup
-            df.to_csv(data_dir / "ecfr_agencies.csv", index=False)
+            # Save to Supabase if available and locally as backup, in the
+            # background
+            self._persist('ecfr_agencies', df, key_columns=['slug'])
             
-            return df
+            return self._typed('ecfr_agencies', df)
         
         except Exception as e:
             st.error(f"Error fetching agencies: {e}")
             
             # Try to load from local backup
-            try:
-                return pd.read_csv(data_dir / "ecfr_agencies.csv")
-            except:
-                return pd.DataFrame()
+            return self._load_backup(
+                'ecfr_agencies', legacy_csv=data_dir / "ecfr_agencies.csv")
     
-    @st.cache_data
-    def fetch_title_parts(self, title_number):
-        """Fetch parts for a specific title"""
+    def _load_title_parts(self, title_number):
         try:
             # Try to get from Supabase first
             if self.supabase:
                 response = self.supabase.table('ecfr_parts').select('*').eq('title_number', title_number).execute()
                 if response.data:
-                    return pd.DataFrame(response.data)
+                    return self._typed('ecfr_parts', pd.DataFrame(response.data))
             
             # If not in Supabase or no connection, fetch from API
             url = f"{self.base_url}/titles/{title_number}/parts"
@@ -110,34 +341,45 @@ class ECFRService:
             # Add title_number for reference
             df['title_number'] = title_number
             
-            # Save to Supabase if available
-            if self.supabase:
-                self.supabase.table('ecfr_parts').upsert(df.to_dict('records')).execute()
-            
-            # Save locally as backup
-            local_path = data_dir / f"ecfr_title_{title_number}_parts.csv"
-            df.to_csv(local_path, index=False)
+            # Save to Supabase if available and locally as backup, in the
+            # background
+            self._persist(
+                'ecfr_parts', df,
+                partition={'title': title_number},
+                key_columns=['title_number', 'identifier'],
+                scope=title_number)
             
-            return df
+            return self._typed('ecfr_parts', df)
         
         except Exception as e:
             st.error(f"Error fetching parts for title {title_number}: {e}")
             
             # Try to load from local backup
-            try:
-                local_path = data_dir / f"ecfr_title_{title_number}_parts.csv"
-                return pd.read_csv(local_path)
-            except:
-                return pd.DataFrame()
+            return self._load_backup(
+                'ecfr_parts',
+                partition={'title': title_number},
+                legacy_csv=data_dir / f"ecfr_title_{title_number}_parts.csv")
     
-    def fetch_part_content(self, title_number, part_number):
-        """Fetch content for a specific part"""
+    def _load_part_content(self, title_number, part_number):
+        """
+        Content of a part, from Supabase, the eCFR API or a local backup.
+
+        Content fetched from the API is written to Supabase as the hash of
+        its manifest blob in ecfr_content.content_hash, with the blobs in
+        ecfr_blobs. Both are added by supabase/migrations; without them the
+        background write fails, which is only logged, and the content is
+        kept in the local blob store alone.
+        """
         try:
             # Try to get from Supabase first
             if self.supabase:
                 response = self.supabase.table('ecfr_content').select('*').eq('title_number', title_number).eq('part_number', part_number).execute()
                 if response.data:
-                    content = response.data[0]['content']
+                    row = response.data[0]
+                    if row.get('content_hash'):
+                        return self.blobs.get_content(
+                            row['content_hash'], fetch_missing=self._fetch_blob)
+                    content = row['content']
                     return json.loads(content) if isinstance(content, str) else content
             
             # If not in Supabase or no connection, fetch from API
@@ -147,20 +389,29 @@ class ECFRService:
             
             content = response.json()['data']
             
-            # Save to Supabase if available
-            if self.supabase:
-                record = {
-                    'title_number': title_number,
-                    'part_number': part_number,
-                    'content': json.dumps(content),
-                    'fetched_at': datetime.now().isoformat()
-                }
-                self.supabase.table('ecfr_content').upsert([record]).execute()
-            
-            # Save locally as backup
-            local_path = data_dir / f"ecfr_title_{title_number}_part_{part_number}.json"
-            with open(local_path, 'w') as f:
-                json.dump(content, f)
+            # Save locally in the blob store and to Supabase if available, in
+            # the background. Supabase keeps the snapshot's manifest hash and
+            # only the compressed blobs it does not have yet.
+            supabase = self.supabase
+            blobs = self.blobs
+            snapshot_date = date.today().isoformat()
+
+            def write():
+                manifest_hash, _ = blobs.put_snapshot(
+                    title_number, part_number, snapshot_date, content)
+                if supabase:
+                    # The content row is only written once Supabase has
+                    # every blob its manifest references
+                    self._upload_blobs(manifest_hash)
+                    record = {
+                        'title_number': title_number,
+                        'part_number': part_number,
+                        'content_hash': manifest_hash,
+                        'fetched_at': datetime.now().isoformat()
+                    }
+                    supabase.table('ecfr_content').upsert([record]).execute()
+
+            self.writer.submit(('ecfr_content', title_number, part_number), write)
             
             return content
         
@@ -168,12 +419,55 @@ class ECFRService:
             st.error(f"Error fetching content for title {title_number}, part {part_number}: {e}")
             
             # Try to load from local backup
+            self._fallback.used = True
+            try:
+                return self.blobs.get_snapshot(title_number, part_number)
+            except Exception:
+                pass
             try:
                 local_path = data_dir / f"ecfr_title_{title_number}_part_{part_number}.json"
                 with open(local_path, 'r') as f:
                     return json.load(f)
             except:
                 return {}
+
+    def _upload_blobs(self, manifest_hash):
+        """
+        Upsert the blobs of a snapshot that Supabase does not have yet, into
+        the ecfr_blobs table (see supabase/migrations).
+
+        Checked against Supabase, not against which blobs were new locally,
+        so blobs of an earlier upload that failed are sent again.
+
+        Returns:
+            list: Hashes of the uploaded blobs
+        """
+        hashes = sorted(self.blobs.manifest_hashes(manifest_hash))
+        stored = set()
+        for start in range(0, len(hashes), BLOB_QUERY_BATCH):
+            response = self.supabase.table('ecfr_blobs').select('hash') \
+                .in_('hash', hashes[start:start + BLOB_QUERY_BATCH]).execute()
+            stored.update(row['hash'] for row in response.data or [])
+        missing = [digest for digest in hashes if digest not in stored]
+        if missing:
+            self.supabase.table('ecfr_blobs').upsert([
+                {
+                    'hash': digest,
+                    'data': base64.b64encode(
+                        self.blobs.read_compressed(digest)).decode('ascii')
+                }
+                for digest in missing
+            ]).execute()
+        return missing
+
+    def _fetch_blob(self, digest):
+        """Get a compressed blob from Supabase, for blobs not stored locally"""
+        if not self.supabase:
+            return None
+        response = self.supabase.table('ecfr_blobs').select('data').eq('hash', digest).execute()
+        if not response.data:
+            return None
+        return base64.b64decode(response.data[0]['data'])
     
     def analyze_word_count_by_agency(self):
         """Analyze word count per agency"""
@@ -198,14 +492,13 @@ class ECFRService:
         
         return pd.DataFrame(agency_data)
     
-    def get_historical_changes(self, title_number, part_number, limit=10):
-        """Get historical changes for a specific part"""
+    def _load_historical_changes(self, title_number, part_number, limit=10):
         try:
             # Try to get from Supabase first
             if self.supabase:
                 response = self.supabase.table('ecfr_history').select('*').eq('title_number', title_number).eq('part_number', part_number).order('version_date', desc=True).limit(limit).execute()
                 if response.data:
-                    return pd.DataFrame(response.data)
+                    return self._typed('ecfr_history', pd.DataFrame(response.data))
             
             # If not in Supabase or no connection, fetch from API
             url = f"{self.base_url}/titles/{title_number}/parts/{part_number}/versions"
@@ -219,25 +512,24 @@ class ECFRService:
             df['title_number'] = title_number
             df['part_number'] = part_number
             
-            # Save to Supabase if available
-            if self.supabase:
-                self.supabase.table('ecfr_history').upsert(df.to_dict('records')).execute()
-            
-            # Save locally as backup
-            local_path = data_dir / f"ecfr_title_{title_number}_part_{part_number}_history.csv"
-            df.to_csv(local_path, index=False)
+            # Save to Supabase if available and locally as backup, in the
+            # background
+            self._persist(
+                'ecfr_history', df,
+                partition={'title': title_number, 'part': part_number},
+                key_columns=['title_number', 'part_number', 'version_date'],
+                scope=f"{title_number}/{part_number}")
             
-            return df
+            return self._typed('ecfr_history', df)
         
         except Exception as e:
             st.error(f"Error fetching history for title {title_number}, part {part_number}: {e}")
             
             # Try to load from local backup
-            try:
-                local_path = data_dir / f"ecfr_title_{title_number}_part_{part_number}_history.csv"
-                return pd.read_csv(local_path)
-            except:
-                return pd.DataFrame()
+            return self._load_backup(
+                'ecfr_history',
+                partition={'title': title_number, 'part': part_number},
+                legacy_csv=data_dir / f"ecfr_title_{title_number}_part_{part_number}_history.csv")
     
     def add_test_titles(self):
         """Add test data to the ecfr_titles table in Supabase"""
@@ -327,7 +619,7 @@ class ECFRService:
             if hasattr(response, 'data') and response.data:
                 # Save locally as backup
                 df = pd.DataFrame(test_titles)
-                df.to_csv(data_dir / "ecfr_titles.csv", index=False)
+                self.store.write('ecfr_titles', df)
                 return True
             else:
                 st.error(f"Error adding test data: {response}")
@@ -336,3 +628,13 @@ class ECFRService:
         except Exception as e:
             st.error(f"Error adding test data: {e}")
             return False
+
+@st.cache_resource
+def get_ecfr_service():
+    """
+    Get the process-wide eCFR service.
+
+    Returns:
+        ECFRService shared by every session, with one shared data cache
+    """
+    return ECFRService()
@@ -0,0 +1,247 @@
+import re
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from StreamLitApp.app.eCFRAPI import search_api
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# The search API does not page past this many results
+MAX_SEARCH_RESULTS = 10_000
+
+# Exports older than this many seconds are deleted when another is written
+EXPORT_MAX_AGE = 6 * 60 * 60
+
+def iter_search_results(query, per_page=1000, **filters):
+    """
+    Search results a page at a time, following get_results pagination.
+
+    Args:
+        query (str): Search term
+        per_page (int): Results per request; at most 1,000
+        **filters: Other get_results arguments, e.g. agency_slugs or date
+
+    Yields:
+        pandas.DataFrame: One page of results, nested fields flattened into
+        dotted columns (e.g. 'hierarchy.title'). Numbers are float64 on
+        every page, as JSON does not tell 1 from 1.0.
+
+    Raises:
+        RuntimeError: If a request fails
+    """
+    page = 1
+    while (page - 1) * per_page < MAX_SEARCH_RESULTS:
+        status_code, is_expected_status_code, response_data = search_api.get_results(
+            query, per_page=per_page, page=page, **filters)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch page {page} of results for {query!r}: Status code {status_code}")
+        results = response_data.get("results") or []
+        if results:
+            df = pd.json_normalize(results)
+            numbers = df.select_dtypes("number").columns
+            yield df.astype(dict.fromkeys(numbers, "float64"))
+        total_pages = (response_data.get("meta") or {}).get("total_pages") or page
+        if not results or page >= total_pages:
+            return
+        page += 1
+
+def iter_store_batches(store, dataset, partition=None, columns=None, batch_size=65_536):
+    """
+    Rows of a ColumnarStore dataset in batches, read from disk one batch at
+    a time.
+
+    Args:
+        store (ColumnarStore): Store holding the dataset
+        dataset (str): Dataset name, e.g. 'ecfr_history'
+        partition (dict, optional): Partition to read; the whole dataset if
+            None
+        columns (list, optional): Columns to read
+
+    Yields:
+        pandas.DataFrame: Up to batch_size rows
+    """
+    if partition:
+        source = ds.dataset(store.path_for(dataset, partition), format="parquet")
+    else:
+        source = ds.dataset(store.root / dataset, format="parquet", partitioning="hive")
+    for batch in source.to_batches(columns=columns, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+def iter_frame_batches(df, batch_size=65_536):
+    """Rows of an in-memory frame in batches of up to batch_size rows"""
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+def _conformed(batches):
+    # Later pages can add or omit fields; every batch gets the first one's
+    # columns
+    columns = None
+    for batch in batches:
+        if columns is None:
+            columns = list(batch.columns)
+        yield batch.reindex(columns=columns)
+
+def csv_chunks(batches):
+    """
+    Encode batches as one CSV file, a chunk per batch.
+
+    Yields:
+        bytes: The header and first batch, then one chunk per batch
+    """
+    header = True
+    for batch in _conformed(batches):
+        yield batch.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+class _Drain:
+    """Write-only file whose contents are taken as they are written"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _to_table(batch, schema):
+    # A column empty in the first batch is written as strings, whatever
+    # later batches hold in it
+    text = [
+        field.name for field in schema
+        if pa.types.is_string(field.type) and not pd.api.types.is_string_dtype(batch[field.name])
+    ]
+    if text:
+        batch = batch.assign(**{
+            column: batch[column].astype(str).where(batch[column].notna()) for column in text
+        })
+    return pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+
+def parquet_chunks(batches, schema=None, compression="zstd"):
+    """
+    Encode batches as one Parquet file, a row group per batch.
+
+    Args:
+        schema (pyarrow.Schema, optional): Schema of the file; inferred from
+            the first batch if None, with all-null columns as strings. Every
+            batch is converted to it, so a later batch whose values do not
+            fit (e.g. 1.5 in an int64 column) raises pyarrow.ArrowInvalid.
+
+    Yields:
+        bytes: The file, a chunk per row group, then its footer
+    """
+    sink = _Drain()
+    writer = None
+    try:
+        for batch in _conformed(batches):
+            if schema is None:
+                schema = pa.Schema.from_pandas(batch, preserve_index=False)
+                schema = pa.schema([
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                    for field in schema
+                ])
+            if writer is None:
+                writer = pq.ParquetWriter(sink, schema, compression=compression)
+            writer.write_table(_to_table(batch, schema))
+            yield sink.take()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.take()
+
+def export_chunks(batches, file_format="csv", schema=None):
+    """
+    Encode batches in file_format ('csv' or 'parquet'), as byte chunks; see
+    parquet_chunks for schema
+    """
+    if file_format == "csv":
+        return csv_chunks(batches)
+    if file_format == "parquet":
+        return parquet_chunks(batches, schema=schema)
+    raise ValueError(f"Unknown export format {file_format!r}, expected one of {tuple(FORMATS)}")
+
+def export_name(*parts):
+    """File name stem from free text, e.g. a search query and its filters"""
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", "_".join(map(str, parts))).strip("_")
+    return name[:100] or "export"
+
+def remove_old_exports(root=None, max_age=EXPORT_MAX_AGE):
+    """
+    Delete exports, and temporary files of interrupted ones, older than
+    max_age seconds.
+
+    Returns:
+        int: Number of files deleted
+    """
+    root = Path(root or data_dir / "exports")
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in root.glob("*"):
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            # Removed by another session at the same time
+            pass
+    return removed
+
+def write_export(batches, name, file_format="csv", root=None, schema=None):
+    """
+    Stream batches into a new export file on disk; only one batch and its
+    encoded chunk are in memory at a time. Exports older than EXPORT_MAX_AGE
+    are deleted first.
+
+    Args:
+        batches (iterable): DataFrames to export, e.g. from
+            iter_search_results or iter_store_batches
+        name (str): File name stem, see export_name; a random suffix keeps
+            each export apart from other sessions' exports of the same query
+        root (str, optional): Directory of exports; data/exports if None
+        schema (pyarrow.Schema, optional): Schema of a Parquet export
+
+    Returns:
+        pathlib.Path: The written file
+    """
+    root = Path(root or data_dir / "exports")
+    root.mkdir(parents=True, exist_ok=True)
+    remove_old_exports(root)
+    path = root / f"{name}_{uuid.uuid4().hex[:8]}.{file_format}"
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in export_chunks(batches, file_format, schema=schema):
+                f.write(chunk)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return path
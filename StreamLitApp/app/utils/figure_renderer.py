@@ -0,0 +1,128 @@
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+def figure_key(data, *params):
+    """
+    Cache key of a figure: a hash of the plotted data's contents and of
+    whatever else shapes the figure (query, title, size).
+
+    Args:
+        data (pandas.DataFrame): Data the figure is drawn from
+        *params: JSON-serializable parameters
+    """
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    digest.update(json.dumps([list(map(str, data.columns)), params], default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+def render_png(draw, *args, figsize=(12, 8), dpi=100, **kwargs):
+    """
+    Draw a matplotlib figure and return it as PNG bytes.
+
+    The figure is created with matplotlib.figure.Figure rather than pyplot,
+    so it is never registered with pyplot's global figure manager, and it is
+    cleared as soon as it is saved. Safe to call from worker threads.
+
+    Args:
+        draw (callable): Called as draw(ax, *args, **kwargs) to draw on the
+            figure's axes
+    """
+    # Imported here so matplotlib only loads when a figure is rendered
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    try:
+        draw(fig.add_subplot(), *args, **kwargs)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+class FigureRenderer:
+    """
+    Rendered figures (PNG bytes) by figure_key, least recently used first
+    out, rendered on a small thread pool.
+
+    Concurrent requests for a figure being rendered share the same render.
+    """
+
+    def __init__(self, max_entries=64, max_workers=2):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="figures")
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def submit(self, key, draw, *args, **kwargs):
+        """
+        Start rendering a figure off the calling thread, unless it is cached
+        or already rendering.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the PNG bytes
+        """
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+            if key in self._pending:
+                self.hits += 1
+                return self._pending[key]
+            future = self._executor.submit(self._render, key, draw, args, kwargs)
+            self._pending[key] = future
+            return future
+
+    def render(self, key, draw, *args, timeout=None, **kwargs):
+        """Rendered figure as PNG bytes, waiting for it if need be"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        return self.submit(key, draw, *args, **kwargs).result(timeout=timeout)
+
+    def _render(self, key, draw, args, kwargs):
+        try:
+            png = render_png(draw, *args, **kwargs)
+            with self._lock:
+                self._cache[key] = png
+                self.renders += 1
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return png
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+@st.cache_resource
+def get_figure_renderer():
+    """
+    Get the process-wide figure renderer.
+
+    Returns:
+        FigureRenderer shared by every session
+    """
+    return FigureRenderer()
@@ -0,0 +1,117 @@
+import pandas as pd
+
+# Arrow-backed strings: one contiguous buffer per column instead of one
+# Python object per value.
+STRING = "string[pyarrow]"
+
+# Declared dtypes of the frames ECFRService returns, by table. Columns a
+# response does not have are skipped; columns not declared keep their
+# inferred dtype.
+FRAME_SCHEMAS = {
+    "ecfr_titles": {
+        "id": "Int32",
+        "number": "Int16",
+        "name": STRING,
+        "chapter_label": "category",
+        "chapter_name": "category",
+        "latest_amended_on": "datetime",
+        "latest_issue_date": "datetime",
+        "up_to_date_as_of": "datetime",
+        "reserved": "boolean",
+    },
+    "ecfr_agencies": {
+        "id": "Int32",
+        "parent_id": "Int32",
+        "name": STRING,
+        "short_name": STRING,
+        "display_name": STRING,
+        "sortable_name": STRING,
+        "slug": "category",
+    },
+    "ecfr_parts": {
+        "id": "Int32",
+        "title_number": "Int16",
+        "identifier": "category",
+        "name": STRING,
+        "label": STRING,
+        "type": "category",
+    },
+    "ecfr_history": {
+        "id": "Int64",
+        "title_number": "Int16",
+        "part_number": "Int32",
+        "identifier": "category",
+        "name": STRING,
+        "type": "category",
+        "version_date": "datetime",
+        "amendment_date": "datetime",
+        "issue_date": "datetime",
+        "removed": "boolean",
+    },
+}
+
+INTEGER_DTYPES = ("Int16", "Int32", "Int64")
+
+def _typed_column(values, dtype):
+    if dtype in INTEGER_DTYPES:
+        numbers = pd.to_numeric(values, errors="coerce")
+        # Identifiers such as part "2a" are not numbers; rather than lose
+        # them, such a column is kept as categories.
+        if numbers.isna().sum() > values.isna().sum():
+            return values.astype(str).where(values.notna()).astype("category")
+        return numbers.astype(dtype)
+    if dtype == "datetime":
+        return pd.to_datetime(values, errors="coerce")
+    if dtype == "boolean":
+        return values.astype("boolean")
+    if dtype == "category":
+        return values.where(values.isna(), values.astype(str)).astype("category")
+    return values.astype(dtype)
+
+def apply_schema(df, table):
+    """
+    Cast a frame to the declared dtypes of its table.
+
+    Args:
+        df (pandas.DataFrame): Frame built from API or Supabase records
+        table (str): Key of FRAME_SCHEMAS; other tables are returned as is
+
+    Returns:
+        pandas.DataFrame: A typed copy of df
+    """
+    schema = FRAME_SCHEMAS.get(table)
+    if not schema or df.empty:
+        return df
+    return df.assign(**{
+        column: _typed_column(df[column], dtype)
+        for column, dtype in schema.items()
+        if column in df.columns
+    })
+
+def memory_report(df, untyped=None):
+    """
+    Memory use of a frame per column, counting the contents of object and
+    string values.
+
+    Args:
+        df (pandas.DataFrame): Typed frame
+        untyped (pandas.DataFrame, optional): The same data before
+            apply_schema, for comparison
+
+    Returns:
+        pandas.DataFrame: column, dtype and bytes (plus untyped_bytes), with
+        a final 'total' row
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "column": list(usage.index),
+        "dtype": [str(df[column].dtype) for column in usage.index],
+        "bytes": usage.to_numpy(),
+    })
+    if untyped is not None:
+        report["untyped_bytes"] = report["column"].map(
+            untyped.memory_usage(deep=True, index=False)).astype("Int64")
+    total = {"column": "total", "dtype": "", "bytes": int(report["bytes"].sum())}
+    if untyped is not None:
+        total["untyped_bytes"] = int(report["untyped_bytes"].sum())
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
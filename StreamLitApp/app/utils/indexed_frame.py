@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+class TimeIndexedFrame:
+    """
+    A frame sorted once by date, for filtering by date range and category
+    without scanning or copying every row.
+
+    The frame gets a DatetimeIndex (the date column is kept too, for
+    charts) and a categorical category column. A date range is found with
+    a binary search of the sorted dates and returned as a slice view; a
+    category is filtered through the sorted row positions of each category
+    code, precomputed once.
+    """
+
+    def __init__(self, data, date_column="date", category_column="category"):
+        self.date_column = date_column
+        self.category_column = category_column
+
+        dates = data[date_column]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        frame = data.assign(**{
+            date_column: dates,
+            category_column: data[category_column].astype("category"),
+        })
+        if not dates.is_monotonic_increasing:
+            frame = frame.sort_values(date_column, kind="stable")
+        self.frame = frame.set_index(
+            pd.DatetimeIndex(frame[date_column], name=None), drop=False)
+
+        self._dates = self.frame.index.values
+        codes = self.frame[category_column].cat.codes.to_numpy()
+        self.categories = list(self.frame[category_column].cat.categories)
+        self._positions = {
+            category: np.flatnonzero(codes == code)
+            for code, category in enumerate(self.categories)
+        }
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def date_min(self):
+        return self.frame.index[0] if len(self.frame) else None
+
+    @property
+    def date_max(self):
+        return self.frame.index[-1] if len(self.frame) else None
+
+    def _bounds(self, start_date, end_date):
+        # Whole days: start_date at midnight up to, not including, the day
+        # after end_date.
+        start = np.datetime64(pd.Timestamp(start_date).normalize())
+        end = np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+        start = start.astype(self._dates.dtype)
+        end = end.astype(self._dates.dtype)
+        return (int(np.searchsorted(self._dates, start, side="left")),
+                int(np.searchsorted(self._dates, end, side="left")))
+
+    def filter(self, start_date=None, end_date=None, category=None):
+        """
+        Rows from start_date to end_date (inclusive, whole days) and, if
+        given, of one category.
+
+        Without a category the result is a view of the frame, not a copy.
+
+        Args:
+            start_date (datetime.date, optional): First day; the first date
+                if None
+            end_date (datetime.date, optional): Last day; the last date if
+                None
+            category (str, optional): Category to keep; None or 'All' keeps
+                every category
+
+        Returns:
+            pandas.DataFrame: The matching rows, in date order
+        """
+        if not len(self.frame):
+            return self.frame
+        lo, hi = self._bounds(
+            self.date_min if start_date is None else start_date,
+            self.date_max if end_date is None else end_date)
+        if category is None or category == "All":
+            return self.frame.iloc[lo:hi]
+
+        positions = self._positions.get(category)
+        if positions is None:
+            return self.frame.iloc[:0]
+        first, last = np.searchsorted(positions, [lo, hi], side="left")
+        return self.frame.take(positions[first:last])
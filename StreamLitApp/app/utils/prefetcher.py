@@ -0,0 +1,185 @@
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+
+from .ecfr_service import get_ecfr_service
+from .structure_cache import get_structure_index_cache
+
+class Prefetcher:
+    """
+    Warms what a title's drill-down reads once a part is picked, before it
+    is picked: the title's structure index, then the content of its likely
+    next parts (most viewed first, then in list order), fetched on a small
+    thread pool.
+
+    Each session has at most one prefetch in flight. Selecting another title
+    cancels the fetches of the previous one that have not started yet;
+    fetches already running finish and stay cached. Only the most recent
+    max_sessions sessions are tracked.
+    """
+
+    def __init__(self, service, structures=None, max_workers=2, top_parts=3, max_sessions=256):
+        """
+        Args:
+            service (ECFRService): Service whose cache is warmed
+            structures (StructureIndexCache, optional): Cache of structure
+                indexes to warm as well
+            max_workers (int): Maximum number of concurrent fetches, across
+                all sessions
+            top_parts (int): Number of parts whose content is prefetched per
+                title
+            max_sessions (int): Number of sessions whose prefetch is tracked
+        """
+        self.service = service
+        self.structures = structures
+        self.top_parts = top_parts
+        self.max_sessions = max_sessions
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._views = Counter()
+        self._active = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def record_view(self, title, part):
+        """Count a view of a part, which ranks it for later prefetches"""
+        with self._lock:
+            self._views[(str(title), str(part))] += 1
+
+    def popular_parts(self, title, limit=None):
+        """Parts of a title by number of views, most viewed first"""
+        title = str(title)
+        with self._lock:
+            counts = [(count, part) for (viewed, part), count in self._views.items() if viewed == title]
+        counts.sort(key=lambda item: -item[0])
+        return [part for _, part in counts[:limit]]
+
+    def likely_parts(self, title, parts=()):
+        """
+        Parts whose content to prefetch: the most viewed, then the first of
+        parts (e.g. the title's parts list, in order) never viewed.
+        """
+        likely = self.popular_parts(title, self.top_parts)
+        for part in map(str, parts):
+            if len(likely) >= self.top_parts:
+                break
+            if part not in likely:
+                likely.append(part)
+        return likely
+
+    def prefetch(self, title, date=None, parts=(), session=None):
+        """
+        Start warming a title's drill-down for a session, cancelling the
+        session's previous prefetch. Calling it again for the selection
+        already being prefetched (e.g. on a rerun) does nothing.
+
+        Args:
+            title (str): Title number
+            date (str, optional): Date of the structure to prefetch, as
+                YYYY-MM-DD; the structure is skipped if None
+            parts (iterable): The title's part identifiers, in list order
+            session (str, optional): Id of the requesting session
+
+        Returns:
+            list: Futures of the submitted fetches, in priority order
+        """
+        title = str(title)
+        selection = (title, date)
+        tasks = {}
+        if date and self.structures is not None:
+            tasks["structure"] = (self.structures.get, (date, title))
+        for part in self.likely_parts(title, parts):
+            tasks[("content", part)] = (self.service.fetch_part_content, (title, part))
+
+        with self._lock:
+            previous = self._active.get(session)
+            if previous is not None and previous[0] == selection:
+                self._active.move_to_end(session)
+                return list(previous[1].values())
+            if previous is not None:
+                self._cancel(previous[1])
+            futures = {
+                label: self._executor.submit(self._run, fetch, args)
+                for label, (fetch, args) in tasks.items()
+            }
+            self._active[session] = (selection, futures)
+            self._active.move_to_end(session)
+            while len(self._active) > self.max_sessions:
+                _, (_, stale) = self._active.popitem(last=False)
+                self._cancel(stale)
+        return list(futures.values())
+
+    def structure(self, title, date, session=None, timeout=None):
+        """
+        Structure index of a title, waiting for the session's prefetch of it
+        rather than fetching it a second time.
+
+        Returns:
+            StructureIndex, or None without a structure cache or date
+
+        Raises:
+            RuntimeError: If the structure cannot be fetched
+        """
+        if self.structures is None or not date:
+            return None
+        with self._lock:
+            active = self._active.get(session)
+            future = None
+            if active is not None and active[0] == (str(title), date):
+                future = active[1].get("structure")
+        if future is not None:
+            wait([future], timeout=timeout)
+        return self.structures.get(date, str(title))
+
+    def cancel(self, session=None):
+        """Cancel a session's pending fetches"""
+        with self._lock:
+            previous = self._active.pop(session, None)
+            if previous is not None:
+                self._cancel(previous[1])
+
+    def _cancel(self, futures):
+        for future in futures.values():
+            if future.cancel():
+                self.cancelled += 1
+
+    def _run(self, fetch, args):
+        # Results are not kept on the future: the fetch only warms caches
+        try:
+            fetch(*args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self.completed += 1
+
+    def metrics(self):
+        """Number of fetches completed, cancelled, failed and pending"""
+        with self._lock:
+            pending = sum(
+                not future.done()
+                for _, futures in self._active.values()
+                for future in futures.values()
+            )
+            return {
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "pending": pending,
+            }
+
+@st.cache_resource
+def get_prefetcher():
+    """
+    Get the process-wide prefetcher.
+
+    Returns:
+        Prefetcher shared by every session, warming the shared eCFR service
+        and structure index cache
+    """
+    return Prefetcher(get_ecfr_service(), get_structure_index_cache())
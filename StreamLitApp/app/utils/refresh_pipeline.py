@@ -0,0 +1,246 @@
+import json
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+try:
+    # Imported as StreamLitApp.app.utils
+    from ..eCFRAPI import versioner_api
+    from ..ParseeCFR.parse_title_xml import iter_parts, iter_sections
+except ImportError:
+    # Imported as a top-level package, with the app directory on the path
+    from eCFRAPI import versioner_api
+    from ParseeCFR.parse_title_xml import iter_parts, iter_sections
+from .blob_store import get_blob_store
+from .columnar_store import ColumnarStore
+from .derived_indexes import SearchIndex, WordCountIndex
+
+logger = logging.getLogger(__name__)
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+class RefreshPipeline:
+    """
+    Incremental refresh of eCFR content and the indexes derived from it.
+
+    versioner_api.get_titles tells which titles changed since the last sync,
+    and get_versions which sections within them. Only the parts holding
+    changed sections are downloaded, and only the changed sections are
+    re-derived in the word count and search indexes. A title that was never
+    synced is downloaded once in full.
+    """
+
+    def __init__(
+        self,
+        state_path=None,
+        blobs=None,
+        store=None,
+        word_counts=None,
+        search_index=None
+    ):
+        self.state_path = Path(state_path or data_dir / "refresh_state.json")
+        self.blobs = blobs or get_blob_store()
+        store = store or ColumnarStore()
+        self.word_counts = word_counts or WordCountIndex(store)
+        self.search_index = search_index or SearchIndex(store)
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def add_listener(self, listener):
+        """
+        Call listener(report) after every refreshed title, e.g. to invalidate
+        caches of data derived from that title.
+        """
+        self.listeners.append(listener)
+
+    def last_sync(self, title):
+        """Stored sync state of a title, or None if it was never synced"""
+        return self._state.get(str(title))
+
+    def changed_titles(self):
+        """
+        Poll get_titles for titles amended or reissued since their last sync.
+
+        Returns:
+            list: Title summaries from get_titles that need a refresh
+
+        Raises:
+            RuntimeError: If the titles endpoint does not respond as expected
+        """
+        status_code, is_expected_status_code, response_data = versioner_api.get_titles()
+        if not is_expected_status_code:
+            raise RuntimeError(f"Failed to fetch titles: Status code {status_code}")
+
+        changed = []
+        for title in response_data["titles"]:
+            if title.get("reserved") or title.get("processing_in_progress"):
+                continue
+            synced = self.last_sync(title["number"])
+            if synced is None or \
+                synced.get("latest_issue_date") != title.get("latest_issue_date") or \
+                synced.get("latest_amended_on") != title.get("latest_amended_on"):
+                changed.append(title)
+        return changed
+
+    def changed_sections(self, title, since):
+        """
+        Get the sections of a title with a new version issued after since.
+
+        Args:
+            title (str): Title number
+            since (str): Last synced issue date in YYYY-MM-DD format
+
+        Returns:
+            dict: Part number to {identifier: content version}, keeping only
+            the latest version of each section
+        """
+        next_day = (date.fromisoformat(since) + timedelta(days=1)).isoformat()
+        status_code, is_expected_status_code, response_data = versioner_api.get_versions(
+            title, issue_date_gte=next_day)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch versions of title {title}: Status code {status_code}")
+
+        by_part = defaultdict(dict)
+        for version in response_data["content_versions"]:
+            current = by_part[version["part"]].get(version["identifier"])
+            if current is None or version["issue_date"] >= current["issue_date"]:
+                by_part[version["part"]][version["identifier"]] = version
+        return dict(by_part)
+
+    def refresh_title(self, title_summary):
+        """
+        Bring one title up to date.
+
+        Args:
+            title_summary (dict): Title entry from get_titles
+
+        Returns:
+            dict: title, mode ('full' or 'incremental'), parts_fetched,
+            sections_updated and sections_removed
+        """
+        title = str(title_summary["number"])
+        content_date = title_summary.get("up_to_date_as_of") or \
+            title_summary["latest_issue_date"]
+        synced = self.last_sync(title)
+
+        if synced is None or not synced.get("latest_issue_date"):
+            report = self._refresh_full(title, content_date)
+        else:
+            report = self._refresh_incremental(
+                title, content_date, synced["latest_issue_date"])
+
+        self.word_counts.save(title)
+        self.search_index.save(title)
+        with self._lock:
+            self._state[title] = {
+                "latest_issue_date": title_summary.get("latest_issue_date"),
+                "latest_amended_on": title_summary.get("latest_amended_on"),
+                "content_date": content_date,
+                "synced_at": datetime.now().isoformat(),
+            }
+            self._save_state()
+
+        for listener in self.listeners:
+            listener(report)
+        return report
+
+    def run(self):
+        """
+        Refresh every title that changed since its last sync.
+
+        Returns:
+            list: One report per title, as returned by refresh_title; a title
+            that failed has an 'error' instead and is retried on the next run
+        """
+        reports = []
+        for title_summary in self.changed_titles():
+            try:
+                reports.append(self.refresh_title(title_summary))
+            except Exception as e:
+                logger.exception("Refresh failed for title %s", title_summary["number"])
+                reports.append({"title": str(title_summary["number"]), "error": str(e)})
+        return reports
+
+    def _fetch_xml(self, content_date, title, part=None):
+        status_code, is_expected_status_code, response_data = \
+            versioner_api.get_title_source_route(content_date, title, part=part)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch title {title} part {part}: Status code {status_code}")
+        return response_data
+
+    def _refresh_full(self, title, content_date):
+        xml_text = self._fetch_xml(content_date, title)
+        sections = []
+        for part, part_xml in iter_parts(xml_text):
+            self.blobs.put_snapshot(title, part, content_date, part_xml)
+            sections.extend(iter_sections(part_xml))
+
+        self.word_counts.replace_title(title, sections)
+        self.search_index.replace_title(title, sections)
+        return {
+            "title": title,
+            "mode": "full",
+            "parts_fetched": len({section["part"] for section in sections}),
+            "sections_updated": len(sections),
+            "sections_removed": 0,
+        }
+
+    def _refresh_incremental(self, title, content_date, since):
+        report = {
+            "title": title,
+            "mode": "incremental",
+            "parts_fetched": 0,
+            "sections_updated": 0,
+            "sections_removed": 0,
+        }
+        for part, versions in self.changed_sections(title, since).items():
+            removed = {
+                identifier for identifier, version in versions.items()
+                if version.get("removed")
+            }
+            for identifier in removed:
+                self.word_counts.remove(title, identifier)
+                self.search_index.remove(title, identifier)
+            report["sections_removed"] += len(removed)
+
+            changed = set(versions) - removed
+            if not changed:
+                continue
+
+            part_xml = self._fetch_xml(content_date, title, part=part)
+            self.blobs.put_snapshot(title, part, content_date, part_xml)
+            report["parts_fetched"] += 1
+            for section in iter_sections(part_xml, part=part):
+                if section["identifier"] in changed:
+                    self.word_counts.update(title, section)
+                    self.search_index.update(title, section)
+                    report["sections_updated"] += 1
+        return report
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._state, f, indent=2, sort_keys=True)
+        tmp_path.replace(self.state_path)
+
+if __name__ == "__main__":
+    # Nightly refresh, from the repository root:
+    # python -m StreamLitApp.app.utils.refresh_pipeline
+    logging.basicConfig(level=logging.INFO)
+    for report in RefreshPipeline().run():
+        print(report)
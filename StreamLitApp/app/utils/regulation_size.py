@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from StreamLitApp.app.eCFRAPI import versioner_api
+from StreamLitApp.app.ParseeCFR.structure_index import NODE_TYPES, TYPE_CODES
+from .structure_cache import get_structure_index_cache
+
+# Hierarchy levels an agency's cfr_references can point at.
+REFERENCE_LEVELS = ["subtitle", "chapter", "subchapter", "part"]
+
+def flatten_structure(index, title):
+    """
+    Flatten a StructureIndex into one row per content node (sections and
+    appendices, i.e. the leaves), with the identifiers of the levels that
+    enclose it.
+
+    Args:
+        index (StructureIndex): Structure of the title
+        title (str): Title number
+
+    Returns:
+        pandas.DataFrame: title, type, identifier, subtitle, chapter,
+        subchapter, part and size columns
+    """
+    count = len(index)
+    enclosing = {}
+    for level in REFERENCE_LEVELS:
+        # Each node of the level stamps its identifier over its subtree,
+        # which is a contiguous slice in preorder.
+        values = np.full(count, "", dtype=object)
+        for node in np.flatnonzero(index.type_code == TYPE_CODES[level]):
+            values[node:index.end[node] + 1] = index.identifiers[node]
+        enclosing[level] = values
+
+    leaves = np.flatnonzero(index.end == np.arange(count))
+    type_names = np.asarray(NODE_TYPES + [""], dtype=object)
+    df = pd.DataFrame({
+        "title": str(title),
+        "type": type_names[index.type_code[leaves]],
+        "identifier": index.identifiers[leaves].astype(object),
+        **{level: values[leaves] for level, values in enclosing.items()},
+        "size": index.size[leaves],
+    })
+    for column in ["title", "type"] + REFERENCE_LEVELS:
+        df[column] = df[column].astype("category")
+    return df
+
+def agency_references(agencies_response):
+    """
+    Flatten the cfr_references of get_agencies into one row per reference.
+
+    Child agencies keep their own slug and carry their parent's slug, so
+    sizes can be rolled up to parent agencies.
+
+    Returns:
+        pandas.DataFrame: agency_slug, agency_name, parent_slug, title and
+        one column per reference level, empty where the reference does not
+        narrow down to that level
+    """
+    rows = []
+
+    def add(agency, parent_slug):
+        for reference in agency.get("cfr_references") or []:
+            rows.append({
+                "agency_slug": agency["slug"],
+                "agency_name": agency["name"],
+                "parent_slug": parent_slug,
+                "title": str(reference["title"]),
+                **{level: str(reference.get(level) or "") for level in REFERENCE_LEVELS},
+            })
+
+    for agency in agencies_response["agencies"]:
+        add(agency, agency["slug"])
+        for child in agency.get("children") or []:
+            add(child, agency["slug"])
+
+    columns = ["agency_slug", "agency_name", "parent_slug", "title"] + REFERENCE_LEVELS
+    return pd.DataFrame(rows, columns=columns)
+
+def attribute_nodes(nodes, references):
+    """
+    Match structure nodes to agencies by their cfr_references.
+
+    A reference matches every node under the levels it names, e.g. a
+    reference to title 12 chapter X matches every section in that chapter.
+
+    Returns:
+        pandas.DataFrame: One row per (agency, node) match, with the node
+        columns plus agency_slug, agency_name and parent_slug
+    """
+    nodes = nodes.astype({column: str for column in ["title"] + REFERENCE_LEVELS})
+    matched = []
+    # References naming the same set of levels are matched in one merge.
+    keys_of = references[REFERENCE_LEVELS].ne("").apply(
+        lambda row: tuple(level for level, used in row.items() if used), axis=1)
+    for keys, group in references.groupby(keys_of, sort=False):
+        on = ["title"] + list(keys)
+        matched.append(nodes.merge(
+            group[["agency_slug", "agency_name", "parent_slug"] + on], on=on))
+    if not matched:
+        return nodes.iloc[:0].assign(agency_slug="", agency_name="", parent_slug="")
+    return pd.concat(matched, ignore_index=True)
+
+def rollup_agency_sizes(attributed):
+    """
+    Total size per agency and per parent agency.
+
+    A node referenced by an agency through more than one reference (or, for
+    parents, through several children) is counted once.
+
+    Returns:
+        tuple: (agency_sizes, parent_sizes) DataFrames sorted by size
+    """
+    node_key = ["title", "identifier", "part"]
+    by_agency = attributed.drop_duplicates(["agency_slug"] + node_key)
+    agency_sizes = by_agency.groupby(
+        ["agency_slug", "agency_name", "parent_slug"], observed=True
+    ).agg(size=("size", "sum"), sections=("identifier", "size")).reset_index()
+
+    by_parent = attributed.drop_duplicates(["parent_slug"] + node_key)
+    parent_sizes = by_parent.groupby("parent_slug", observed=True).agg(
+        size=("size", "sum"), sections=("identifier", "size")).reset_index()
+    names = attributed.loc[
+        attributed["agency_slug"] == attributed["parent_slug"],
+        ["agency_slug", "agency_name"]].drop_duplicates("agency_slug")
+    parent_sizes = parent_sizes.merge(
+        names, left_on="parent_slug", right_on="agency_slug", how="left"
+    ).drop(columns="agency_slug")
+
+    return (
+        agency_sizes.sort_values("size", ascending=False, ignore_index=True),
+        parent_sizes.sort_values("size", ascending=False, ignore_index=True),
+    )
+
+def estimate_agency_sizes(agencies_response, titles=None, date=None, cache=None):
+    """
+    Estimate regulation size per agency from structure metadata alone.
+
+    Args:
+        agencies_response (dict): Response data of admin_api.get_agencies
+        titles (list, optional): Title numbers to include; defaults to every
+            title that is not reserved
+        date (str, optional): Date in YYYY-MM-DD format; defaults to each
+            title's up-to-date-as-of date
+        cache (StructureIndexCache, optional): Where structures come from;
+            defaults to the process-wide cache
+
+    Returns:
+        tuple: (agency_sizes, parent_sizes) as from rollup_agency_sizes
+    """
+    cache = cache or get_structure_index_cache()
+    status_code, is_expected_status_code, response_data = versioner_api.get_titles()
+    if not is_expected_status_code:
+        raise RuntimeError(f"Failed to fetch titles: Status code {status_code}")
+
+    wanted = None if titles is None else {str(title) for title in titles}
+    frames = []
+    for title in response_data["titles"]:
+        number = str(title["number"])
+        if title.get("reserved") or (wanted is not None and number not in wanted):
+            continue
+        index = cache.get(date or title["up_to_date_as_of"], number)
+        frames.append(flatten_structure(index, number))
+
+    nodes = pd.concat(frames, ignore_index=True)
+    return rollup_agency_sizes(
+        attribute_nodes(nodes, agency_references(agencies_response)))
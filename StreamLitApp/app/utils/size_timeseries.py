@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+import pandas as pd
+
+from StreamLitApp.app.eCFRAPI import versioner_api
+from StreamLitApp.app.ParseeCFR.parse_title_xml import iter_sections
+from .columnar_store import ColumnarStore
+from .derived_indexes import tokenize
+
+class SizeTimeSeries:
+    """
+    Word count of a title over its version history, built incrementally.
+
+    The title is downloaded in full once, at the first date of the series.
+    For every later issue date in get_versions, only the parts with a new
+    section version are fetched, and only those sections are recounted;
+    every other section carries its count forward. The per-section counts
+    are kept, so later runs continue from the last issue date seen.
+    """
+
+    series_dataset = "size_timeseries"
+    state_dataset = "size_timeseries_state"
+
+    def __init__(self, store=None):
+        self.store = store or ColumnarStore()
+        self.parts_fetched = 0
+
+    def _fetch_sections(self, title, snapshot_date, part=None):
+        status_code, is_expected_status_code, response_data = \
+            versioner_api.get_title_source_route(snapshot_date, title, part=part)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch title {title} part {part} on {snapshot_date}: "
+                f"Status code {status_code}")
+        self.parts_fetched += 1
+        return iter_sections(response_data, part=part)
+
+    def _versions(self, title, start_date):
+        status_code, is_expected_status_code, response_data = \
+            versioner_api.get_versions(title, issue_date_gte=start_date)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch versions of title {title}: Status code {status_code}")
+        by_date = defaultdict(list)
+        for version in response_data["content_versions"]:
+            by_date[version["issue_date"]].append(version)
+        return by_date
+
+    def _load(self, title):
+        try:
+            series = self.store.read(self.series_dataset, partition={"title": title})
+            state = self.store.read(self.state_dataset, partition={"title": title})
+        except FileNotFoundError:
+            return None, None
+        counts = {
+            row["identifier"]: (row["part"], int(row["word_count"]))
+            for row in state.to_dict("records")
+        }
+        return series, counts
+
+    def build(self, title, start_date, end_date=None):
+        """
+        Build or extend the series of a title.
+
+        Args:
+            title (str): Title number
+            start_date (str): First date of the series in YYYY-MM-DD format,
+                used only if the title has no stored series yet
+            end_date (str, optional): Last issue date to include
+
+        Returns:
+            pandas.DataFrame: Per-part series with date, title, part,
+            word_count and sections columns
+        """
+        title = str(title)
+        series, counts = self._load(title)
+        if series is None:
+            counts = {
+                section["identifier"]: (section["part"], len(tokenize(section["text"])))
+                for section in self._fetch_sections(title, start_date)
+            }
+            rows = self._snapshot_rows(title, start_date, counts)
+            last_date = start_date
+        else:
+            rows = series.to_dict("records")
+            last_date = series["date"].max().strftime("%Y-%m-%d")
+
+        for issue_date, versions in sorted(self._versions(title, last_date).items()):
+            if issue_date <= last_date or (end_date and issue_date > end_date):
+                continue
+            changed_by_part = defaultdict(set)
+            for version in versions:
+                if version.get("removed"):
+                    counts.pop(version["identifier"], None)
+                else:
+                    changed_by_part[version["part"]].add(version["identifier"])
+
+            for part, identifiers in changed_by_part.items():
+                for section in self._fetch_sections(title, issue_date, part=part):
+                    if section["identifier"] in identifiers:
+                        counts[section["identifier"]] = (
+                            section["part"], len(tokenize(section["text"])))
+            rows.extend(self._snapshot_rows(title, issue_date, counts))
+            last_date = issue_date
+
+        series = pd.DataFrame(rows, columns=["date", "title", "part", "word_count", "sections"])
+        series["date"] = pd.to_datetime(series["date"])
+        self.store.write(self.series_dataset, series, partition={"title": title})
+        self.store.write(
+            self.state_dataset,
+            pd.DataFrame(
+                [(identifier, part, count) for identifier, (part, count) in counts.items()],
+                columns=["identifier", "part", "word_count"]),
+            partition={"title": title})
+        return series
+
+    @staticmethod
+    def _snapshot_rows(title, snapshot_date, counts):
+        totals = defaultdict(lambda: [0, 0])
+        for part, count in counts.values():
+            totals[part][0] += count
+            totals[part][1] += 1
+        return [
+            {"date": snapshot_date, "title": title, "part": part,
+             "word_count": word_count, "sections": sections}
+            for part, (word_count, sections) in sorted(totals.items())
+        ]
+
+def title_series(series):
+    """
+    Total word count per title and date, for components.charts.time_series_chart.
+
+    Args:
+        series (pandas.DataFrame): Per-part series from SizeTimeSeries.build,
+            for one or more titles
+    """
+    return series.groupby(["date", "title"], as_index=False, observed=True)[
+        ["word_count", "sections"]].sum()
+
+def agency_series(series, part_agencies):
+    """
+    Total word count per agency and date.
+
+    Args:
+        series (pandas.DataFrame): Per-part series from SizeTimeSeries.build
+        part_agencies (pandas.DataFrame): title, part and agency_slug
+            columns, e.g. from regulation_size.attribute_nodes
+
+    Returns:
+        pandas.DataFrame: date, agency_slug and word_count columns
+    """
+    part_agencies = part_agencies[["title", "part", "agency_slug"]].astype(str).drop_duplicates()
+    merged = series.astype({"title": str, "part": str}).merge(
+        part_agencies, on=["title", "part"])
+    return merged.groupby(["date", "agency_slug"], as_index=False)["word_count"].sum()
@@ -0,0 +1,106 @@
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+
+# Libraries that only some pages need, and so should not load at startup.
+# (streamlit itself loads parts of plotly, but not plotly.express.)
+LAZY_MODULES = ["matplotlib", "seaborn", "supabase", "plotly.express", "scipy", "nltk"]
+
+def startup_imports(script=None):
+    """
+    The top-level import statements of a script, as one statement that
+    imports the same modules without running the rest of the script.
+
+    Args:
+        script (str or Path, optional): Path of the script; app.py if None
+    """
+    script = Path(script or app_dir / "app.py")
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    statements = [
+        ast.unparse(node) for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+    return "; ".join(statements)
+
+def import_times(statement, cwd=None):
+    """
+    Import time of every module a statement loads, from python -X importtime
+    run in a fresh interpreter.
+
+    Args:
+        statement (str): Python statement, e.g. from startup_imports
+        cwd (str or Path, optional): Working directory; the app directory if
+            None, so the app's own modules resolve as they do under
+            streamlit run
+
+    Returns:
+        pandas.DataFrame: module, self_seconds, cumulative_seconds and depth
+        (0 for modules the statement imports directly), in import order
+
+    Raises:
+        RuntimeError: If the statement fails
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=str(cwd or app_dir), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed: {result.stderr.strip().splitlines()[-1]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        rows.append({
+            "module": stripped.strip(),
+            "self_seconds": int(self_us) / 1e6,
+            "cumulative_seconds": int(cumulative_us) / 1e6,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+        })
+    return pd.DataFrame(rows, columns=["module", "self_seconds", "cumulative_seconds", "depth"])
+
+def startup_report(script=None):
+    """
+    Import cost of starting a script.
+
+    Returns:
+        dict: total_seconds (sum over the modules the script imports), lazy_loaded
+        (LAZY_MODULES that were imported anyway) and slowest (the ten
+        imports with the highest cumulative time)
+    """
+    statement = startup_imports(script)
+    imported = set()
+    for node in ast.parse(statement).body:
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        else:
+            imported.add(node.module)
+    times = import_times(statement)
+    # Interpreter startup modules (site, encodings) are logged at depth 0 too.
+    top_level = times[(times["depth"] == 0) & times["module"].isin(imported)]
+    loaded = set(times["module"])
+    return {
+        "total_seconds": float(top_level["cumulative_seconds"].sum()),
+        "lazy_loaded": [
+            module for module in LAZY_MODULES
+            if module in loaded or any(name.startswith(module + ".") for name in loaded)
+        ],
+        "slowest": top_level.nlargest(10, "cumulative_seconds")[
+            ["module", "cumulative_seconds"]].to_dict("records"),
+    }
+
+if __name__ == "__main__":
+    # Startup import report, from the repository root:
+    # python -m StreamLitApp.app.utils.startup_report
+    report = startup_report()
+    print(f"Startup imports: {report['total_seconds']:.3f}s")
+    print(f"Lazy modules loaded at startup: {report['lazy_loaded'] or 'none'}")
+    for row in report["slowest"]:
+        print(f"  {row['cumulative_seconds']:.3f}s  {row['module']}")
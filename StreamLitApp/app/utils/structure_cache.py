@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+
+try:
+    # Imported as StreamLitApp.app.utils
+    from ..eCFRAPI import versioner_api
+    from ..ParseeCFR.structure_index import StructureIndex
+except ImportError:
+    # Imported as a top-level package, with the app directory on the path
+    from eCFRAPI import versioner_api
+    from ParseeCFR.structure_index import StructureIndex
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+class StructureIndexCache:
+    """
+    StructureIndex per (title, date), kept in memory (least recently used
+    first out) and on disk, so each structure is downloaded once.
+    """
+
+    def __init__(self, root=None, max_entries=64):
+        self.root = Path(root or data_dir / "structure_index")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, date, title):
+        return self.root / f"title-{title}_{date}.npz"
+
+    def is_cached(self, date, title):
+        """True if the index is available without a network call"""
+        key = (str(title), str(date))
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self._path(date, title).exists()
+
+    def get(self, date, title):
+        """
+        Get the structure index of a title on a date.
+
+        Raises:
+            RuntimeError: If the structure has to be fetched and the request
+                fails
+        """
+        key = (str(title), str(date))
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(date, title)
+        if path.exists():
+            with np.load(path) as arrays:
+                index = StructureIndex.from_arrays(dict(arrays))
+        else:
+            status_code, is_expected_status_code, response_data = \
+                versioner_api.get_structure(date=date, title=title)
+            if not is_expected_status_code:
+                raise RuntimeError(
+                    f"Failed to fetch structure of title {title} on {date}: "
+                    f"Status code {status_code}")
+            index = StructureIndex.from_structure(response_data)
+            # Unique per process and thread, as another session may be
+            # saving the same structure
+            tmp_path = path.with_name(
+                f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+            np.savez_compressed(tmp_path, **index.to_arrays())
+            tmp_path.replace(path)
+
+        with self._lock:
+            self._memory[key] = index
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return index
+
+    def ancestry(self, date, title, **hierarchy):
+        """
+        Local equivalent of versioner_api.get_ancestry.
+
+        Returns:
+            list: Node dicts from the title down to the requested node, or
+            None if it does not exist
+        """
+        return self.get(date, title).ancestry(**hierarchy)
+
+    def invalidate(self, title=None):
+        """Drop cached indexes, of one title or all of them"""
+        with self._lock:
+            for key in list(self._memory):
+                if title is None or key[0] == str(title):
+                    del self._memory[key]
+        pattern = "title-*.npz" if title is None else f"title-{title}_*.npz"
+        for path in self.root.glob(pattern):
+            # Temporary files belong to saves still in progress
+            if not path.name.endswith(".tmp.npz"):
+                path.unlink(missing_ok=True)
+
+@st.cache_resource
+def get_structure_index_cache():
+    """
+    Get the process-wide structure index cache.
+
+    Returns:
+        StructureIndexCache shared by every session
+    """
+    return StructureIndexCache()
@@ -1,6 +1,5 @@
 import os
 import streamlit as st
-from supabase import create_client
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -29,6 +28,8 @@ def get_supabase_client():
         return None
     
     try:
+        # Imported here so the client library only loads when it is used
+        from supabase import create_client
         return create_client(SUPABASE_URL, SUPABASE_KEY)
     except Exception as e:
         st.error(f"Error connecting to Supabase: {e}")
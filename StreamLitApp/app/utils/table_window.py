@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+class TableWindow:
+    """
+    Sorted, filtered pages of a frame, for tables too large to send to the
+    browser whole.
+
+    Sort orders are computed once per column and direction, and the rows
+    matching a search once per search, so paging through a large frame only
+    slices row positions and takes the rows of one page.
+    """
+
+    def __init__(self, data, max_searches=8):
+        """
+        Args:
+            data (pandas.DataFrame): Frame to page through; not modified
+            max_searches (int): Number of recent searches whose matching
+                rows are kept
+        """
+        self.data = data
+        self.max_searches = max_searches
+        self._orders = {}
+        self._matches = OrderedDict()
+
+    def __len__(self):
+        return len(self.data)
+
+    def _order(self, column, ascending):
+        key = (column, ascending)
+        if key not in self._orders:
+            # Row positions in sorted order, missing values last
+            values = self.data[column].reset_index(drop=True)
+            self._orders[key] = values.sort_values(
+                ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        return self._orders[key]
+
+    def _text_columns(self):
+        columns = [
+            column for column in self.data.columns
+            if isinstance(self.data[column].dtype, pd.CategoricalDtype)
+            or pd.api.types.is_string_dtype(self.data[column].dtype)
+        ]
+        return columns or list(self.data.columns)
+
+    def _column_matches(self, column, text):
+        values = self.data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Search the categories, not every row
+            categories = pd.Series(values.cat.categories.astype(str))
+            codes = np.flatnonzero(categories.str.contains(text, case=False, regex=False).to_numpy())
+            return np.isin(values.cat.codes.to_numpy(), codes)
+        found = values.astype(str).str.contains(text, case=False, regex=False)
+        return found.fillna(False).to_numpy(dtype=bool) & values.notna().to_numpy()
+
+    def matches(self, query, column=None):
+        """
+        Rows containing query, ignoring case.
+
+        Args:
+            query (str): Text to look for; None or '' matches every row
+            column (str, optional): Column to search; every text column (or
+                every column, if there are none) if None
+
+        Returns:
+            numpy.ndarray: Boolean mask of the matching rows, or None for
+            every row
+        """
+        if not query:
+            return None
+        key = (query, column)
+        if key in self._matches:
+            self._matches.move_to_end(key)
+            return self._matches[key]
+        mask = np.zeros(len(self.data), dtype=bool)
+        for searched in ([column] if column is not None else self._text_columns()):
+            mask |= self._column_matches(searched, query)
+        self._matches[key] = mask
+        while len(self._matches) > self.max_searches:
+            self._matches.popitem(last=False)
+        return mask
+
+    def count(self, query=None, column=None):
+        """Number of rows matching a search"""
+        mask = self.matches(query, column)
+        return len(self.data) if mask is None else int(mask.sum())
+
+    def page(self, page, page_size, sort_by=None, ascending=True, query=None, column=None):
+        """
+        One page of the frame, sorted and searched.
+
+        Args:
+            page (int): Page number, from 1; clamped to the last page
+            page_size (int): Rows per page
+            sort_by (str, optional): Column to sort by; the frame's order if
+                None
+
+        Returns:
+            tuple: (rows, total) - the page's rows and the number of rows
+            matching the search
+        """
+        mask = self.matches(query, column)
+        if sort_by is None:
+            positions = None if mask is None else np.flatnonzero(mask)
+        else:
+            positions = self._order(sort_by, ascending)
+            if mask is not None:
+                positions = positions[mask[positions]]
+
+        total = len(self.data) if positions is None else len(positions)
+        pages = max(1, -(-total // page_size))
+        start = (min(max(page, 1), pages) - 1) * page_size
+        if positions is None:
+            return self.data.iloc[start:start + page_size], total
+        return self.data.iloc[positions[start:start + page_size]], total
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+
+from StreamLitApp.app.ParseeCFR.parse_title_xml import iter_sections
+from .derived_indexes import tokenize
+
+# Get the app directory
+app_dir = Path(__file__).parent.parent
+data_dir = app_dir / "data"
+data_dir.mkdir(exist_ok=True)
+
+class TermAgencyMatrix:
+    """
+    Count of every term in every agency's regulations, as a sparse CSR
+    matrix with one row per term and one column per agency.
+
+    Built offline from parsed title XML, with sections attributed to
+    agencies by their cfr_references (see term_statistics.part_agency_map),
+    and saved as a .npz matrix plus a JSON vocabulary. A keyword-set by
+    agency-set heatmap is then a slice of the matrix.
+    """
+
+    def __init__(self, terms=None, agencies=None, matrix=None):
+        self.terms = list(terms or [])
+        self.agencies = list(agencies or [])
+        self.matrix = matrix if matrix is not None else \
+            sp.csr_matrix((len(self.terms), len(self.agencies)), dtype=np.int64)
+        if self.matrix.shape != (len(self.terms), len(self.agencies)):
+            raise ValueError(
+                f"Matrix of shape {self.matrix.shape} does not match "
+                f"{len(self.terms)} terms and {len(self.agencies)} agencies")
+        self._term_rows = {term: row for row, term in enumerate(self.terms)}
+        self._agency_columns = {agency: column for column, agency in enumerate(self.agencies)}
+        # Word count per agency, for normalized heatmaps
+        self._totals = np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    @classmethod
+    def build(cls, xml_by_title, part_agencies):
+        """
+        Build the matrix from source XML.
+
+        Args:
+            xml_by_title (dict or iterable): Title number to source XML from
+                get_title_source_route, or (title, xml) pairs, so titles can
+                be streamed one at a time
+            part_agencies (dict): (title, part) to the agency slugs of that
+                part
+
+        Returns:
+            TermAgencyMatrix
+        """
+        term_rows = {}
+        agency_columns = {}
+        rows, columns, counts = [], [], []
+        items = xml_by_title.items() if isinstance(xml_by_title, dict) else xml_by_title
+        for title, xml_text in items:
+            title = str(title)
+            # Triplets are collected a title at a time and duplicates summed
+            # when the CSR matrix is built.
+            title_counts = Counter()
+            for section in iter_sections(xml_text):
+                agency_slugs = part_agencies.get((title, section["part"]))
+                if not agency_slugs:
+                    continue
+                section_counts = Counter(tokenize(section["text"]))
+                for agency_slug in agency_slugs:
+                    column = agency_columns.setdefault(agency_slug, len(agency_columns))
+                    for term, count in section_counts.items():
+                        row = term_rows.setdefault(term, len(term_rows))
+                        title_counts[(row, column)] += count
+            if title_counts:
+                keys = np.array(list(title_counts), dtype=np.int64)
+                rows.append(keys[:, 0])
+                columns.append(keys[:, 1])
+                counts.append(np.fromiter(title_counts.values(), dtype=np.int64))
+
+        shape = (len(term_rows), len(agency_columns))
+        if rows:
+            matrix = sp.coo_matrix(
+                (np.concatenate(counts), (np.concatenate(rows), np.concatenate(columns))),
+                shape=shape).tocsr()
+        else:
+            matrix = sp.csr_matrix(shape, dtype=np.int64)
+        matrix.sum_duplicates()
+        return cls(list(term_rows), list(agency_columns), matrix)
+
+    def heatmap(self, terms, agency_slugs=None, normalize=False):
+        """
+        Counts of terms (rows) in agencies (columns).
+
+        Args:
+            terms (list): Keywords; matched as lowercase single words, and
+                absent from every agency if not in the vocabulary
+            agency_slugs (list, optional): Agencies to include; all if None
+            normalize (bool): Divide by each agency's total word count, as
+                mentions per 10,000 words
+
+        Returns:
+            pandas.DataFrame: terms by agency_slugs
+        """
+        terms = list(terms)
+        agency_slugs = list(self.agencies if agency_slugs is None else agency_slugs)
+        known_terms = [i for i, term in enumerate(terms) if term.lower() in self._term_rows]
+        known_agencies = [j for j, slug in enumerate(agency_slugs) if slug in self._agency_columns]
+
+        values = np.zeros((len(terms), len(agency_slugs)), dtype=float if normalize else np.int64)
+        if known_terms and known_agencies:
+            row_index = [self._term_rows[terms[i].lower()] for i in known_terms]
+            column_index = [self._agency_columns[agency_slugs[j]] for j in known_agencies]
+            block = self.matrix[row_index][:, column_index].toarray()
+            if normalize:
+                totals = self._totals[column_index]
+                block = block / np.where(totals, totals, 1) * 10_000
+            values[np.ix_(known_terms, known_agencies)] = block
+        return pd.DataFrame(values, index=terms, columns=agency_slugs)
+
+    def agency_totals(self):
+        """Total word count per agency"""
+        return pd.Series(self._totals, index=self.agencies, name="words")
+
+    def save(self, root=None):
+        """
+        Write the matrix and vocabulary to temporary files first and then
+        move them into place, so a reader never sees either half written.
+        """
+        root = Path(root or data_dir / "term_matrix")
+        root.mkdir(parents=True, exist_ok=True)
+        suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        matrix_tmp = root / f"matrix.{suffix}.npz"
+        vocabulary_tmp = root / f"vocabulary.{suffix}"
+        sp.save_npz(matrix_tmp, self.matrix)
+        with open(vocabulary_tmp, "w") as f:
+            json.dump({"terms": self.terms, "agencies": self.agencies}, f)
+        matrix_tmp.replace(root / "matrix.npz")
+        vocabulary_tmp.replace(root / "vocabulary.json")
+
+    @classmethod
+    def load(cls, root=None):
+        """
+        Raises:
+            FileNotFoundError: If no matrix was saved under root
+            ValueError: If the matrix does not match the vocabulary, e.g.
+                when read between the two files of a save being replaced
+        """
+        root = Path(root or data_dir / "term_matrix")
+        with open(root / "vocabulary.json", "r") as f:
+            vocabulary = json.load(f)
+        return cls(vocabulary["terms"], vocabulary["agencies"], sp.load_npz(root / "matrix.npz").tocsr())
+
+    @staticmethod
+    def exists(root=None):
+        root = Path(root or data_dir / "term_matrix")
+        return (root / "matrix.npz").exists() and (root / "vocabulary.json").exists()
+
+    @staticmethod
+    def version(root=None):
+        """
+        Modification times of the saved files, which change with every
+        save; None if no matrix was saved under root
+        """
+        root = Path(root or data_dir / "term_matrix")
+        try:
+            return tuple(
+                (root / name).stat().st_mtime_ns for name in ("matrix.npz", "vocabulary.json"))
+        except FileNotFoundError:
+            return None
+
+@st.cache_resource(max_entries=1)
+def _load_term_agency_matrix(version):
+    # version only keys the cache, so a rebuilt matrix is loaded again
+    return TermAgencyMatrix.load()
+
+def get_term_agency_matrix():
+    """
+    Get the saved term x agency matrix, loaded once per save.
+
+    Returns:
+        TermAgencyMatrix, or None if none was built yet or a save is being
+        replaced; neither case is cached, so the matrix is picked up on a
+        later call
+    """
+    version = TermAgencyMatrix.version()
+    if version is None:
+        return None
+    try:
+        return _load_term_agency_matrix(version)
+    except (FileNotFoundError, ValueError):
+        return None
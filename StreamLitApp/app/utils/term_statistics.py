@@ -0,0 +1,321 @@
+import hashlib
+import heapq
+import math
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from StreamLitApp.app.eCFRAPI import versioner_api
+from StreamLitApp.app.ParseeCFR.parse_title_xml import iter_sections
+from StreamLitApp.app.ParseeCFR.text_metrics import STOPWORDS
+from .derived_indexes import tokenize
+
+def _term_hashes(terms, seed):
+    # Two stable 64-bit hashes per term. Python's hash() is salted per
+    # process, so it cannot be used for sketches merged across processes.
+    key = seed.to_bytes(8, "little")
+    digests = b"".join(
+        hashlib.blake2b(term.encode("utf-8"), digest_size=16, key=key).digest()
+        for term in terms)
+    hashes = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+    return hashes[:, 0], hashes[:, 1]
+
+class CountMinSketch:
+    """
+    Count-Min Sketch of term frequencies.
+
+    An estimate never undercounts, and overcounts by at most epsilon times
+    the total count with probability 1 - delta. Memory is depth x width
+    counters whatever the number of distinct terms.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, seed=0):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.seed = seed
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    def _indexes(self, terms):
+        # Row i hashes with h1 + i * h2 (Kirsch-Mitzenmacher).
+        h1, h2 = _term_hashes(terms, self.seed)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, counts):
+        """Add a Counter (or dict) of term counts"""
+        if not counts:
+            return
+        terms = list(counts)
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(terms))
+        indexes = self._indexes(terms)
+        for row in range(self.depth):
+            np.add.at(self.table[row], indexes[row], values)
+        self.total += int(values.sum())
+
+    def estimate(self, terms):
+        """Estimated counts of terms, as an int64 array"""
+        if not len(terms):
+            return np.zeros(0, dtype=np.int64)
+        indexes = self._indexes(list(terms))
+        return self.table[np.arange(self.depth)[:, None], indexes].min(axis=0)
+
+    def merge(self, other):
+        """Add another sketch with the same parameters into this one"""
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Count-Min Sketches with different parameters cannot be merged")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters: the capacity most frequent terms, each with
+    an upper bound on its count and the most that bound may overcount.
+
+    Any term with a true count above total / capacity is guaranteed to be
+    kept.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # Min-heap of (count, term); entries go stale as counts grow and are
+        # refreshed lazily when they reach the top.
+        self._heap = []
+
+    def _pop_min(self):
+        while True:
+            count, term = heapq.heappop(self._heap)
+            current = self.counts.get(term)
+            if current == count:
+                return term, count
+            if current is not None:
+                heapq.heappush(self._heap, (current, term))
+
+    def update(self, counts):
+        """Add a Counter (or dict) of term counts"""
+        for term, count in counts.items():
+            if term in self.counts:
+                self.counts[term] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[term] = count
+                self.errors[term] = 0
+                heapq.heappush(self._heap, (count, term))
+            else:
+                evicted, minimum = self._pop_min()
+                del self.counts[evicted]
+                del self.errors[evicted]
+                self.counts[term] = minimum + count
+                self.errors[term] = minimum
+                heapq.heappush(self._heap, (minimum + count, term))
+
+    def minimum(self):
+        """Count every term not kept may have, at most"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """
+        Merge another summary into this one. A term missing from a full
+        summary is credited with that summary's minimum, as its error.
+        """
+        mine, theirs = self.minimum(), other.minimum()
+        counts = {}
+        errors = {}
+        for term in self.counts.keys() | other.counts.keys():
+            counts[term] = self.counts.get(term, mine) + other.counts.get(term, theirs)
+            errors[term] = self.errors.get(term, mine) + other.errors.get(term, theirs)
+        kept = heapq.nlargest(self.capacity, counts, key=counts.get)
+        self.counts = {term: counts[term] for term in kept}
+        self.errors = {term: errors[term] for term in kept}
+        self._heap = [(count, term) for term, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "counts": self.counts, "errors": self.errors}
+
+    def __setstate__(self, state):
+        self.__init__(state["capacity"])
+        self.counts = state["counts"]
+        self.errors = state["errors"]
+        self._heap = [(count, term) for term, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+class AgencyTermStatistics:
+    """
+    Most frequent terms per agency over a stream of sections, in memory
+    bounded by the number of agencies, not the size of the corpus.
+
+    Each agency has a Count-Min Sketch, for frequency estimates of any term,
+    and a Space-Saving summary, for the candidate top terms. Statistics built
+    over different titles (e.g. in worker processes) are combined with
+    merge().
+
+    Args:
+        epsilon (float): Count-Min error, as a fraction of an agency's total
+        delta (float): Probability an estimate exceeds that error
+        capacity (int): Heavy hitters kept per agency; top_terms is reliable
+            for n well below this
+        stopwords (bool): Skip function words (text_metrics.STOPWORDS)
+        seed (int): Hash seed; statistics must share it to be merged
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, capacity=200, stopwords=True, seed=0):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.capacity = capacity
+        self.stopwords = stopwords
+        self.seed = seed
+        self.sketches = {}
+        self.heavy_hitters = {}
+        self.sections = Counter()
+
+    def _agency(self, agency_slug):
+        if agency_slug not in self.sketches:
+            self.sketches[agency_slug] = CountMinSketch(self.epsilon, self.delta, self.seed)
+            self.heavy_hitters[agency_slug] = SpaceSaving(self.capacity)
+        return self.sketches[agency_slug], self.heavy_hitters[agency_slug]
+
+    def counts(self, text):
+        """Term counts of a text, as used for every update"""
+        terms = tokenize(text)
+        if self.stopwords:
+            terms = [term for term in terms if term not in STOPWORDS and not term.isdigit()]
+        return Counter(terms)
+
+    def add_section(self, agency_slugs, text):
+        """Count a section's terms for each agency it belongs to"""
+        counts = self.counts(text)
+        for agency_slug in agency_slugs:
+            sketch, heavy_hitters = self._agency(agency_slug)
+            sketch.update(counts)
+            heavy_hitters.update(counts)
+            self.sections[agency_slug] += 1
+
+    def add_title(self, title, xml_text, part_agencies):
+        """
+        Count every section of a title's source XML.
+
+        Args:
+            title (str): Title number
+            xml_text (str): Source XML from get_title_source_route
+            part_agencies (dict): (title, part) to the agency slugs of that
+                part; see part_agency_map
+        """
+        title = str(title)
+        for section in iter_sections(xml_text):
+            agency_slugs = part_agencies.get((title, section["part"]))
+            if agency_slugs:
+                self.add_section(agency_slugs, section["text"])
+        return self
+
+    def merge(self, other):
+        """Merge statistics built with the same parameters into these"""
+        for agency_slug, sketch in other.sketches.items():
+            mine, heavy_hitters = self._agency(agency_slug)
+            mine.merge(sketch)
+            heavy_hitters.merge(other.heavy_hitters[agency_slug])
+        self.sections.update(other.sections)
+        return self
+
+    def top_terms(self, agency_slug, n=20):
+        """
+        Most frequent terms of an agency.
+
+        Returns:
+            pandas.DataFrame: term, count (the lower of the Count-Min and
+            Space-Saving estimates, never below the true count), error_bound
+            (the most count may overcount) and share of the agency's terms
+        """
+        columns = ["term", "count", "error_bound", "share"]
+        if agency_slug not in self.sketches:
+            return pd.DataFrame(columns=columns)
+        sketch = self.sketches[agency_slug]
+        heavy_hitters = self.heavy_hitters[agency_slug]
+        terms = list(heavy_hitters.counts)
+        estimates = sketch.estimate(terms)
+        sketch_bound = math.ceil(self.epsilon * sketch.total)
+
+        rows = []
+        for term, estimate in zip(terms, estimates):
+            space_saving = heavy_hitters.counts[term]
+            count = min(int(estimate), space_saving)
+            bound = min(sketch_bound, heavy_hitters.errors[term])
+            rows.append((term, count, bound, count / sketch.total if sketch.total else 0.0))
+        df = pd.DataFrame(rows, columns=columns)
+        return df.sort_values(["count", "term"], ascending=[False, True], ignore_index=True).head(n)
+
+    def top_terms_frame(self, n=20):
+        """top_terms of every agency, with an agency_slug column"""
+        frames = [
+            self.top_terms(agency_slug, n).assign(agency_slug=agency_slug)
+            for agency_slug in sorted(self.sketches)
+        ]
+        columns = ["agency_slug", "term", "count", "error_bound", "share"]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def memory_bytes(self):
+        """Approximate size of the sketches; fixed per agency"""
+        return sum(sketch.table.nbytes for sketch in self.sketches.values())
+
+def part_agency_map(attributed):
+    """
+    (title, part) to agency slugs, from part-level rows of
+    regulation_size.attribute_nodes (title, part and agency_slug columns).
+    """
+    mapping = defaultdict(set)
+    for title, part, agency_slug in attributed[["title", "part", "agency_slug"]] \
+            .astype(str).itertuples(index=False):
+        mapping[(title, part)].add(agency_slug)
+    return {key: sorted(slugs) for key, slugs in mapping.items()}
+
+def _title_statistics(args):
+    title, snapshot_date, part_agencies, options = args
+    status_code, is_expected_status_code, response_data = \
+        versioner_api.get_title_source_route(snapshot_date, title)
+    if not is_expected_status_code:
+        raise RuntimeError(
+            f"Failed to fetch title {title} on {snapshot_date}: Status code {status_code}")
+    return AgencyTermStatistics(**options).add_title(title, response_data, part_agencies)
+
+def build_term_statistics(titles, snapshot_date, part_agencies, max_workers=None, **options):
+    """
+    Term statistics over several titles, one worker process per title, each
+    fetching and counting its title before the results are merged.
+
+    Args:
+        titles (list): Title numbers
+        snapshot_date (str): Date in YYYY-MM-DD format
+        part_agencies (dict): From part_agency_map
+        max_workers (int, optional): Number of processes; 1 runs in this
+            process
+        **options: AgencyTermStatistics parameters
+
+    Returns:
+        AgencyTermStatistics: The merged statistics
+    """
+    statistics = AgencyTermStatistics(**options)
+    tasks = [
+        (str(title), snapshot_date,
+         {key: slugs for key, slugs in part_agencies.items() if key[0] == str(title)},
+         options)
+        for title in titles
+    ]
+    if max_workers == 1 or len(tasks) <= 1:
+        for result in map(_title_statistics, tasks):
+            statistics.merge(result)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for result in executor.map(_title_statistics, tasks):
+                statistics.merge(result)
+    return statistics
@@ -0,0 +1,205 @@
+import difflib
+import re
+from datetime import date, timedelta
+
+import pandas as pd
+
+from StreamLitApp.app.eCFRAPI import versioner_api
+from StreamLitApp.app.ParseeCFR.parse_title_xml import iter_sections
+from .blob_store import BlobStore
+from .columnar_store import ColumnarStore
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.;:])\s+")
+
+class SectionHashStore:
+    """
+    Content hash of every known section per (title, date) snapshot.
+
+    Hashes are the BlobStore digests of the section text, so the text of any
+    hash recorded here can be read back from the blob store, and a section
+    that is identical across snapshots is stored once.
+
+    The text is kept in a blob store of its own, next to the columnar
+    store: no snapshot manifest references it, so a shared store's gc()
+    would delete it.
+    """
+
+    dataset = "section_hashes"
+
+    def __init__(self, store=None, blobs=None):
+        """
+        Args:
+            store (ColumnarStore, optional): Store of the hashes
+            blobs (BlobStore, optional): Store of the section text, never
+                garbage collected; section_text beside the columnar store's
+                root if None
+        """
+        self.store = store or ColumnarStore()
+        self.blobs = blobs or BlobStore(root=self.store.root.parent / "section_text")
+        self._snapshots = {}
+
+    def _snapshot(self, title, snapshot_date):
+        key = (str(title), str(snapshot_date))
+        if key not in self._snapshots:
+            try:
+                df = self.store.read(
+                    self.dataset, partition={"title": key[0], "date": key[1]})
+                self._snapshots[key] = dict(zip(df["identifier"], df["hash"]))
+            except FileNotFoundError:
+                self._snapshots[key] = {}
+        return self._snapshots[key]
+
+    def get(self, title, snapshot_date, identifier):
+        """
+        Hash of a section in a snapshot.
+
+        Returns:
+            str: The hash, '' if the section is known to be absent, or None
+            if the snapshot has no record of the section
+        """
+        return self._snapshot(title, snapshot_date).get(identifier)
+
+    def put(self, title, snapshot_date, identifier, text):
+        """Record a section's text; None records that it is absent"""
+        digest = "" if text is None else self.blobs.put_blob(text.encode("utf-8"))[0]
+        self._snapshot(title, snapshot_date)[identifier] = digest
+        return digest
+
+    def text(self, digest):
+        return self.blobs.get_blob(digest).decode("utf-8") if digest else ""
+
+    def save(self, title, snapshot_date):
+        snapshot = self._snapshot(title, snapshot_date)
+        self.store.write(
+            self.dataset,
+            pd.DataFrame({"identifier": list(snapshot), "hash": list(snapshot.values())}),
+            partition={"title": str(title), "date": str(snapshot_date)})
+
+def diff_text(before, after):
+    """
+    Sentence-level diff of two section texts.
+
+    Returns:
+        list: One dict per change with op ('replace', 'insert' or 'delete'),
+        before and after (the sentences on each side)
+    """
+    before = SENTENCE_BOUNDARY.split(before) if before else []
+    after = SENTENCE_BOUNDARY.split(after) if after else []
+    matcher = difflib.SequenceMatcher(a=before, b=after, autojunk=False)
+    return [
+        {"op": op, "before": before[i1:i2], "after": after[j1:j2]}
+        for op, i1, i2, j1, j2 in matcher.get_opcodes()
+        if op != "equal"
+    ]
+
+class VersionDiff:
+    """
+    Compare a title at two dates one section at a time.
+
+    get_versions tells which sections had a new version issued between the
+    dates; only those are fetched, with the part and section parameters of
+    the title source route, and any whose content hash did not actually
+    change are skipped before diffing.
+    """
+
+    def __init__(self, hashes=None):
+        self.hashes = hashes or SectionHashStore()
+        self.sections_fetched = 0
+
+    def changed_sections(self, title, date_from, date_to):
+        """
+        Sections with a version issued after date_from, up to date_to.
+
+        Returns:
+            dict: identifier to its latest content version in that range
+        """
+        after = (date.fromisoformat(date_from) + timedelta(days=1)).isoformat()
+        status_code, is_expected_status_code, response_data = versioner_api.get_versions(
+            title, issue_date_gte=after, issue_date_lte=date_to)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch versions of title {title}: Status code {status_code}")
+
+        latest = {}
+        for version in response_data["content_versions"]:
+            current = latest.get(version["identifier"])
+            if current is None or version["issue_date"] >= current["issue_date"]:
+                latest[version["identifier"]] = version
+        return latest
+
+    def section_hash(self, title, snapshot_date, part, identifier):
+        """Hash of a section on a date, fetching only the section if unknown"""
+        digest = self.hashes.get(title, snapshot_date, identifier)
+        if digest is not None:
+            return digest
+
+        status_code, is_expected_status_code, response_data = \
+            versioner_api.get_title_source_route(
+                snapshot_date, title, part=part, section=identifier)
+        self.sections_fetched += 1
+        if status_code == 404:
+            return self.hashes.put(title, snapshot_date, identifier, None)
+        if not is_expected_status_code:
+            raise RuntimeError(
+                f"Failed to fetch section {identifier} of title {title} on "
+                f"{snapshot_date}: Status code {status_code}")
+
+        text = next(
+            (section["text"] for section in iter_sections(response_data, part=part)
+             if section["identifier"] == identifier),
+            None)
+        return self.hashes.put(title, snapshot_date, identifier, text)
+
+    def compare(self, title, date_from, date_to):
+        """
+        Section-level diff of a title between two dates.
+
+        Args:
+            title (str): Title number
+            date_from (str): Earlier date in YYYY-MM-DD format
+            date_to (str): Later date in YYYY-MM-DD format
+
+        Returns:
+            tuple: (diffs, report). diffs is a list of dicts with identifier,
+            part, status ('added', 'removed' or 'modified'), hash_from,
+            hash_to and changes (from diff_text). report counts the
+            candidate, skipped and fetched sections.
+        """
+        title = str(title)
+        candidates = self.changed_sections(title, date_from, date_to)
+        diffs = []
+        skipped = 0
+        fetched_before = self.sections_fetched
+
+        for identifier, version in sorted(candidates.items()):
+            part = version["part"]
+            hash_from = self.section_hash(title, date_from, part, identifier)
+            if version.get("removed"):
+                hash_to = self.hashes.put(title, date_to, identifier, None)
+            else:
+                hash_to = self.section_hash(title, date_to, part, identifier)
+
+            if hash_from == hash_to:
+                skipped += 1
+                continue
+
+            status = "added" if not hash_from else "removed" if not hash_to else "modified"
+            diffs.append({
+                "identifier": identifier,
+                "part": part,
+                "status": status,
+                "hash_from": hash_from,
+                "hash_to": hash_to,
+                "changes": diff_text(self.hashes.text(hash_from), self.hashes.text(hash_to)),
+            })
+
+        self.hashes.save(title, date_from)
+        self.hashes.save(title, date_to)
+        report = {
+            "title": title,
+            "candidates": len(candidates),
+            "changed": len(diffs),
+            "skipped_unchanged": skipped,
+            "sections_fetched": self.sections_fetched - fetched_before,
+        }
+        return diffs, report
@@ -0,0 +1,155 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """
+    Background writer that persists data after it has already been returned to
+    the caller.
+
+    Writes are keyed; submitting a new write for a key that is still pending
+    replaces the pending one, so only the latest data for a key is written.
+    """
+
+    def __init__(self, name="ecfr-write-behind"):
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._in_flight = None
+        self._closed = False
+
+        self._written = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._last_error = None
+        self._last_write_seconds = None
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, key, write_fn):
+        """
+        Queue write_fn to be run on the background worker.
+
+        Args:
+            key (hashable): Identifies what is being written, e.g. a table and
+                backup file. A pending write with the same key is replaced.
+            write_fn (callable): Function taking no arguments that does the write.
+        """
+        with self._condition:
+            if self._closed:
+                # After shutdown there is no worker, so write in the caller.
+                self._execute(key, write_fn)
+                return
+
+            if key in self._pending:
+                # Keep the original enqueue time so lag reflects the oldest
+                # unwritten data for this key.
+                _, enqueued_at = self._pending[key]
+                self._pending[key] = (write_fn, enqueued_at)
+                self._coalesced += 1
+            else:
+                self._pending[key] = (write_fn, time.monotonic())
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued write has been run.
+
+        Returns:
+            bool: True if the queue drained, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight is not None:
+                if not self._worker.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=None):
+        """Flush outstanding writes and stop the worker."""
+        with self._condition:
+            if self._closed:
+                return
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+
+    def metrics(self):
+        """
+        Get queue depth and lag metrics.
+
+        Returns:
+            dict: depth (writes pending or running), lag_seconds (age of the
+            oldest unwritten data), written, coalesced, failed,
+            last_write_seconds and last_error
+        """
+        with self._condition:
+            now = time.monotonic()
+            enqueue_times = [enqueued_at for _, enqueued_at in self._pending.values()]
+            if self._in_flight is not None:
+                enqueue_times.append(self._in_flight)
+            return {
+                'depth': len(self._pending) + (self._in_flight is not None),
+                'lag_seconds': now - min(enqueue_times) if enqueue_times else 0.0,
+                'written': self._written,
+                'coalesced': self._coalesced,
+                'failed': self._failed,
+                'last_write_seconds': self._last_write_seconds,
+                'last_error': self._last_error,
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending and self._closed:
+                    return
+                key, (write_fn, enqueued_at) = self._pending.popitem(last=False)
+                self._in_flight = enqueued_at
+
+            self._execute(key, write_fn)
+
+            with self._condition:
+                self._in_flight = None
+                self._condition.notify_all()
+
+    def _execute(self, key, write_fn):
+        start = time.monotonic()
+        error = None
+        try:
+            write_fn()
+        except Exception as e:
+            logger.exception("Write-behind failed for %s", key)
+            error = e
+
+        with self._condition:
+            if error is None:
+                self._written += 1
+            else:
+                self._failed += 1
+                self._last_error = f"{key}: {error}"
+            self._last_write_seconds = time.monotonic() - start
+
+@st.cache_resource
+def get_write_behind_queue():
+    """
+    Get the process-wide write-behind queue.
+
+    Returns:
+        WriteBehindQueue shared by every session
+    """
+    return WriteBehindQueue()
@@ -0,0 +1,130 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/ParseeCFR/test_citations.py -v
+"""
+
+from StreamLitApp.app.ParseeCFR.citations import parse_citations, resolve_citations
+from StreamLitApp.app.ParseeCFR.structure_index import StructureIndex
+
+def node(node_type, identifier, children=()):
+    return {"type": node_type, "identifier": identifier,
+            "label": f"{node_type} {identifier}", "children": list(children)}
+
+STRUCTURES = {
+    "12": node("title", "12", [node("chapter", "X", [node("part", "1026", [
+        node("subpart", "A", [node("section", "1026.5")]),
+        node("appendix", "Appendix J to Part 1026"),
+    ])])]),
+    "40": node("title", "40", [node("chapter", "I", [node("part", "60", [
+        node("subpart", "A", [node("section", "60.1")]),
+    ])])]),
+}
+
+class FakeCache:
+    def __init__(self, cached=()):
+        self.cached = set(cached)
+        self.gets = []
+
+    def is_cached(self, date, title):
+        return title in self.cached
+
+    def get(self, date, title):
+        self.gets.append(title)
+        if title not in STRUCTURES:
+            raise RuntimeError("not found")
+        return StructureIndex.from_structure(STRUCTURES[title])
+
+def test_parse_citations_normalizes_common_forms():
+    parsed = parse_citations([
+        "12 CFR 1026.5",
+        "12 C.F.R. § 1026.5(b)(1)",
+        "40 CFR Part 60 Subpart A",
+        "40  cfr part 60",
+        "12 CFR Part 1026, Appendix J",
+        "not a citation",
+    ])
+    rows = parsed[["title", "part", "subpart", "section", "appendix"]].values.tolist()
+    assert rows == [
+        ["12", "1026", "", "1026.5", ""],
+        ["12", "1026", "", "1026.5", ""],
+        ["40", "60", "A", "", ""],
+        ["40", "60", "", "", ""],
+        ["12", "1026", "", "", "J"],
+        ["", "", "", "", ""],
+    ]
+    assert parsed["paragraph"][1] == "(b)(1)"
+    assert parsed["valid"].tolist() == [True, True, True, True, True, False]
+
+def test_resolve_citations_dedupes_and_loads_each_title_once():
+    citations = ["12 CFR 1026.5"] * 100 + [
+        "40 CFR Part 60 Subpart A",
+        "12 CFR Part 1026, Appendix J",
+        "12 CFR 9999.1",
+        "7 CFR 1.1",
+        "garbage",
+    ]
+    cache = FakeCache(cached={"12"})
+    resolved, report = resolve_citations(citations, cache, "2024-01-01")
+
+    assert sorted(cache.gets) == ["12", "40", "7"]
+    assert report["unique"] == 5
+    assert report["invalid"] == 1
+    assert report["unresolved"] == 2
+    assert (report["titles_cached"], report["titles_fetched"]) == (1, 2)
+    assert report["parse_per_second"] > 0
+
+    assert resolved["path"][0] == "12/X/1026/A/1026.5"
+    assert resolved["resolved"][:100].all()
+    by_citation = resolved.drop_duplicates("citation").set_index("citation")
+    assert by_citation.loc["40 CFR Part 60 Subpart A", "node_type"] == "subpart"
+    assert by_citation.loc["12 CFR Part 1026, Appendix J", "node_type"] == "appendix"
+    assert not by_citation.loc["12 CFR 9999.1", "resolved"]
+    assert not by_citation.loc["garbage", "resolved"]
+    assert len(resolved) == len(citations)
+
+def test_section_numbers_with_a_suffix_after_the_paragraph():
+    parsed = parse_citations(["26 CFR 1.401(k)-1", "26 CFR 1.401(k)-1(a)(2)"])
+    assert parsed[["part", "section", "paragraph"]].values.tolist() == [
+        ["1", "1.401(k)-1", ""],
+        ["1", "1.401(k)-1", "(a)(2)"],
+    ]
+    assert parsed["valid"].all()
+
+def test_ranges_are_expanded_to_each_section_or_part():
+    parsed = parse_citations([
+        "40 CFR 60.1 through 60.5",
+        "40 CFR 60.1-60.3",
+        "5 CFR parts 2634-2636",
+        "40 CFR 60.1 through 61.5",
+    ])
+    assert parsed["valid"].all()
+    assert parsed.groupby("citation", sort=False)["section"].apply(list).to_dict() == {
+        "40 CFR 60.1 through 60.5": ["60.1", "60.2", "60.3", "60.4", "60.5"],
+        "40 CFR 60.1-60.3": ["60.1", "60.2", "60.3"],
+        "5 CFR parts 2634-2636": ["", "", ""],
+        # Sections of different parts cannot be enumerated
+        "40 CFR 60.1 through 61.5": ["60.1", "61.5"],
+    }
+    assert parsed.loc[parsed["citation"] == "5 CFR parts 2634-2636", "part"].tolist() == \
+        ["2634", "2635", "2636"]
+
+def test_lists_are_split_into_each_section_or_part():
+    parsed = parse_citations([
+        "5 CFR parts 2634 and 2635",
+        "12 CFR §§ 1026.5, 1026.6, and 1026.9",
+        "12 CFR Part 1026, Appendix J",
+    ])
+    assert parsed[["citation", "part", "section", "appendix"]].values.tolist() == [
+        ["5 CFR parts 2634 and 2635", "2634", "", ""],
+        ["5 CFR parts 2634 and 2635", "2635", "", ""],
+        ["12 CFR §§ 1026.5, 1026.6, and 1026.9", "1026", "1026.5", ""],
+        ["12 CFR §§ 1026.5, 1026.6, and 1026.9", "1026", "1026.6", ""],
+        ["12 CFR §§ 1026.5, 1026.6, and 1026.9", "1026", "1026.9", ""],
+        ["12 CFR Part 1026, Appendix J", "1026", "", "J"],
+    ]
+    assert parsed["valid"].all()
+
+def test_resolved_ranges_keep_a_row_per_section():
+    resolved, report = resolve_citations(["40 CFR 60.1 through 60.2"], FakeCache(), "2024-01-01")
+    assert resolved[["section", "resolved"]].values.tolist() == [["60.1", True], ["60.2", False]]
+    assert (report["citations"], report["targets"]) == (1, 2)
@@ -0,0 +1,74 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/ParseeCFR/test_near_duplicates.py -v
+"""
+
+import numpy as np
+
+from StreamLitApp.app.ParseeCFR.near_duplicates import (
+    MinHasher, NearDuplicateIndex, SignatureCache, shingles)
+
+BOILERPLATE = (
+    "Any person who wishes to inspect the records described in this part may do so "
+    "during regular business hours at the office of the agency, after giving notice "
+    "in writing to the records officer at least five business days in advance. ")
+OTHER = (
+    "Grants under this program are awarded to eligible applicants on a competitive "
+    "basis, taking into account the criteria published in the notice inviting "
+    "applications and the availability of appropriated funds for the fiscal year. ")
+
+def title_xml(title, sections):
+    divs = "".join(
+        f'<DIV8 N="{title}.{i}" TYPE="SECTION"><HEAD>Sec.</HEAD><P>{text}</P></DIV8>'
+        for i, text in enumerate(sections, start=1))
+    return f'<DIV1 N="{title}" TYPE="TITLE"><DIV5 N="{title}" TYPE="PART">{divs}</DIV5></DIV1>'
+
+def test_similar_texts_have_similar_signatures():
+    hasher = MinHasher(num_perm=128)
+    signatures = hasher.signatures([
+        shingles(BOILERPLATE), shingles(BOILERPLATE + "Copies cost ten cents."),
+        shingles(OTHER), shingles(""),
+    ])
+
+    assert signatures.shape == (4, 128)
+    assert np.mean(signatures[0] == signatures[1]) > 0.6
+    assert np.mean(signatures[0] == signatures[2]) < 0.2
+    # Batches and single texts give the same signatures.
+    assert (hasher.signatures([shingles(OTHER)])[0] == signatures[2]).all()
+
+def test_clusters_across_titles_with_incremental_snapshots(tmp_path):
+    cache = SignatureCache(tmp_path / "signatures.npz")
+    index = NearDuplicateIndex(cache)
+
+    index.add_snapshot("1", "2024-01-01", title_xml("1", [BOILERPLATE, OTHER]))
+    report = index.add_snapshot("2", "2024-01-01", title_xml("2", [BOILERPLATE + "Also fees."]))
+    # The boilerplate text changed, so its signature was computed.
+    assert report["signatures_computed"] == 1
+
+    clusters = index.clusters(threshold=0.6, across_titles=True,
+                              part_agencies={("1", "1"): ["epa"], ("2", "2"): ["ed"]})
+    assert clusters[["title", "identifier", "agencies"]].values.tolist() == [
+        ["1", "1.1", "epa"], ["2", "2.1", "ed"]]
+    index.save()
+
+    # Reopened, a new snapshot of title 2 replaces its sections, and texts
+    # already seen come from the cache.
+    index = NearDuplicateIndex(SignatureCache(tmp_path / "signatures.npz"))
+    assert index.snapshots() == {"1": "2024-01-01", "2": "2024-01-01"}
+    report = index.add_snapshot("2", "2024-02-01", title_xml("2", [OTHER]))
+    assert report["signatures_computed"] == 0
+    clusters = index.clusters(threshold=0.9)
+    assert clusters["identifier"].tolist() == ["1.2", "2.1"]
+    assert clusters["date"].tolist() == ["2024-01-01", "2024-02-01"]
+
+def test_candidates_grow_linearly_with_repeated_boilerplate(tmp_path):
+    index = NearDuplicateIndex(SignatureCache(tmp_path / "signatures.npz"))
+    counts = {}
+    for size in (50, 200):
+        index.add_snapshot("1", "2024-01-01", title_xml("1", [BOILERPLATE] * size + [OTHER]))
+        counts[size] = len(index.candidate_pairs())
+
+    assert counts == {50: 49, 200: 199}
+    clusters = index.clusters()
+    assert clusters["cluster"].nunique() == 1
+    assert (clusters["size"] == 200).all()
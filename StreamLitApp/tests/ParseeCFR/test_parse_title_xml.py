@@ -0,0 +1,44 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/ParseeCFR/test_parse_title_xml.py -v
+"""
+
+from StreamLitApp.app.ParseeCFR.parse_title_xml import iter_parts, iter_sections
+
+TITLE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<DIV1 N="1" TYPE="TITLE"><HEAD>Title 1</HEAD>
+<DIV3 N="I" TYPE="CHAPTER">
+<DIV5 N="1" TYPE="PART"><HEAD>PART 1—DEFINITIONS</HEAD>
+<DIV8 N="§ 1.1" TYPE="SECTION"><HEAD>§ 1.1 Definitions.</HEAD>
+<P>As used in this chapter, <I>Act</I> means the Federal Register Act.</P></DIV8>
+</DIV5>
+<DIV5 N="2" TYPE="PART"><HEAD>PART 2—GENERAL</HEAD>
+<DIV8 N="2.1" TYPE="SECTION"><HEAD>§ 2.1 Scope.</HEAD><P>First.</P><P>Second.</P></DIV8>
+<DIV9 N="Appendix A to Part 2" TYPE="APPENDIX"><HEAD>Appendix A</HEAD><P>Table.</P></DIV9>
+</DIV5>
+</DIV3></DIV1>"""
+
+def test_iter_sections_reads_identifiers_parts_and_body_text():
+    sections = list(iter_sections(TITLE_XML))
+
+    assert [(s["identifier"], s["part"], s["type"]) for s in sections] == [
+        ("1.1", "1", "section"),
+        ("2.1", "2", "section"),
+        ("Appendix A to Part 2", "2", "appendix"),
+    ]
+    assert sections[0]["heading"] == "§ 1.1 Definitions."
+    assert sections[0]["text"] == \
+        "As used in this chapter, Act means the Federal Register Act."
+    assert sections[1]["text"] == "First. Second."
+
+def test_iter_parts_splits_title_and_round_trips_sections():
+    parts = dict(iter_parts(TITLE_XML))
+    assert list(parts) == ["1", "2"]
+
+    sections = list(iter_sections(parts["2"]))
+    assert [s["identifier"] for s in sections] == ["2.1", "Appendix A to Part 2"]
+
+def test_single_section_xml_uses_given_part():
+    xml = '<DIV8 N="§ 5.3" TYPE="SECTION"><HEAD>§ 5.3</HEAD><P>Text.</P></DIV8>'
+    assert list(iter_sections(xml, part="5"))[0]["part"] == "5"
+    assert list(iter_sections(xml))[0]["part"] == "5"
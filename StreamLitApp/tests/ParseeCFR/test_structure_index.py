@@ -0,0 +1,75 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/ParseeCFR/test_structure_index.py -v
+"""
+
+import timeit
+
+from StreamLitApp.app.ParseeCFR.structure_index import StructureIndex
+
+def node(node_type, identifier, children=(), size=0):
+    return {
+        "type": node_type,
+        "identifier": identifier,
+        "label": f"{node_type} {identifier}",
+        "size": size,
+        "children": list(children),
+    }
+
+STRUCTURE = node("title", "12", [
+    node("chapter", "X", [
+        node("part", "1026", [
+            node("subpart", "A", [
+                node("section", "1026.1", size=100),
+                node("section", "1026.2", size=200),
+            ]),
+            node("subpart", "B", [node("section", "1026.5", size=300)]),
+        ]),
+        node("part", "1030", [
+            node("subpart", "A", [node("section", "1030.1", size=50)]),
+        ]),
+    ]),
+])
+
+def test_ancestry_matches_hierarchy_from_title_down():
+    index = StructureIndex.from_structure(STRUCTURE)
+
+    ancestry = index.ancestry(part="1026", section="1026.5")
+    assert [(n["type"], n["identifier"]) for n in ancestry] == [
+        ("title", "12"),
+        ("chapter", "X"),
+        ("part", "1026"),
+        ("subpart", "B"),
+        ("section", "1026.5"),
+    ]
+    assert index.ancestry(part="1026", section="1030.1") is None
+    assert index.ancestry(part="9999") is None
+
+def test_repeated_identifiers_are_resolved_within_parent():
+    index = StructureIndex.from_structure(STRUCTURE)
+
+    subpart = index.resolve(part="1030", subpart="A")
+    assert index.ancestors(subpart)[-2] == index.find("part", "1030")
+    assert index.resolve(part="1026", subpart="A") != subpart
+
+def test_descendants_children_and_subtree_sizes():
+    index = StructureIndex.from_structure(STRUCTURE)
+    part = index.find("part", "1026")
+
+    assert index.subtree_size(0) == len(index) == 11
+    assert index.subtree_size(part) == 6
+    assert [index.identifiers[i] for i in index.descendants(part)] == \
+        ["A", "1026.1", "1026.2", "B", "1026.5"]
+    assert [index.identifiers[i] for i in index.children(part)] == ["A", "B"]
+    assert index.size[index.descendants(part)].sum() == 600
+
+def test_round_trips_through_arrays():
+    index = StructureIndex.from_structure(STRUCTURE)
+    copy = StructureIndex.from_arrays(index.to_arrays())
+    assert copy.ancestry(section="1030.1") == index.ancestry(section="1030.1")
+
+def test_ancestry_queries_take_microseconds():
+    index = StructureIndex.from_structure(STRUCTURE)
+    seconds = timeit.timeit(
+        lambda: index.ancestry(part="1026", section="1026.5"), number=1000) / 1000
+    assert seconds < 1e-3
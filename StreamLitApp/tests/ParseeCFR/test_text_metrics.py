@@ -0,0 +1,56 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/ParseeCFR/test_text_metrics.py -v
+"""
+
+import pytest
+
+from StreamLitApp.app.ParseeCFR.text_metrics import (
+    aggregate_metrics, benchmark, iter_metrics, text_metrics, title_metrics)
+
+TITLE_XML = """<DIV1 N="1" TYPE="TITLE"><DIV5 N="1" TYPE="PART">
+<DIV8 N="§ 1.1" TYPE="SECTION"><HEAD>§ 1.1 Scope.</HEAD>
+<P>The agency shall publish notices. See 5 U.S.C. 552 for details.</P></DIV8>
+<DIV8 N="§ 1.2" TYPE="SECTION"><HEAD>§ 1.2 Records.</HEAD>
+<P>Records are kept.</P></DIV8>
+</DIV5></DIV1>"""
+
+def test_fast_mode_counts_words_and_sentences():
+    metrics = text_metrics("The agency shall publish notices. See 5 U.S.C. 552 for details.")
+
+    # U.S.C. is three word tokens.
+    assert metrics["words"] == 13
+    # The periods in U.S.C. do not end a sentence.
+    assert metrics["sentences"] == 2
+    assert metrics["avg_sentence_length"] == 6.5
+    # the, shall, for are function words.
+    assert metrics["content_words"] == 10
+    assert metrics["flesch_reading_ease"] is not None
+
+def test_empty_text_has_no_ratios():
+    metrics = text_metrics("")
+    assert metrics["words"] == 0
+    assert metrics["lexical_density"] is None
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        text_metrics("text", mode="other")
+
+def test_sections_are_measured_in_batches_and_rolled_up():
+    from StreamLitApp.app.ParseeCFR.parse_title_xml import iter_sections
+
+    batches = list(iter_metrics(iter_sections(TITLE_XML), batch_size=1))
+    assert [batch["identifier"].tolist() for batch in batches] == [["1.1"], ["1.2"]]
+
+    metrics = title_metrics({"1": TITLE_XML, "2": TITLE_XML}, max_workers=2)
+    assert metrics["title"].tolist() == ["1", "1", "2", "2"]
+
+    totals = aggregate_metrics(metrics)
+    assert totals["words"].tolist() == [16, 16]
+    assert totals["sentences"].tolist() == [3, 3]
+    assert totals["avg_sentence_length"].tolist() == [16 / 3, 16 / 3]
+
+def test_benchmark_reports_throughput_per_mode():
+    report = benchmark(["The agency shall act."] * 10, modes=["fast"], repeat=1)
+    assert report["mode"].tolist() == ["fast"]
+    assert report.loc[0, "texts_per_second"] > 0
@@ -0,0 +1,97 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_blob_store.py -v
+"""
+
+import pytest
+
+from StreamLitApp.app.utils.blob_store import BlobStore
+
+def make_part(section_texts):
+    return {
+        "title": "1",
+        "part": "2",
+        "sections": [
+            {"identifier": f"2.{i}", "text": text * 80}
+            for i, text in enumerate(section_texts)
+        ],
+    }
+
+def make_xml(section_texts):
+    sections = "".join(
+        f'<DIV8 N="2.{i}" TYPE="SECTION"><P>{text * 20}</P></DIV8>'
+        for i, text in enumerate(section_texts))
+    return f'<DIV5 N="2" TYPE="PART"><HEAD>Part 2</HEAD>{sections}</DIV5>'
+
+def test_json_snapshots_round_trip_and_share_sections(tmp_path):
+    store = BlobStore(root=tmp_path)
+    old = make_part(["alpha ", "beta ", "gamma "])
+    new = make_part(["alpha ", "beta ", "delta "])
+
+    store.put_snapshot("1", "2", "2024-01-01", old)
+    _, new_hashes = store.put_snapshot("1", "2", "2024-02-01", new)
+
+    # Only the changed section and the manifest are new.
+    assert len(new_hashes) == 2
+    assert store.get_snapshot("1", "2", "2024-01-01") == old
+    assert store.get_snapshot("1", "2") == new
+
+def test_xml_snapshots_dedupe_sections(tmp_path):
+    store = BlobStore(root=tmp_path)
+    old = make_xml(["alpha ", "beta "])
+    new = make_xml(["alpha ", "changed "])
+
+    store.put_snapshot("1", "2", "2024-01-01", old)
+    _, new_hashes = store.put_snapshot("1", "2", "2024-02-01", new)
+
+    assert len(new_hashes) == 2
+    assert store.get_snapshot("1", "2", "2024-01-01") == old
+    assert store.get_snapshot("1", "2", "2024-02-01") == new
+
+def test_blobs_are_compressed(tmp_path):
+    store = BlobStore(root=tmp_path)
+    data = b"regulation text " * 1000
+    digest, is_new = store.put_blob(data)
+
+    assert is_new
+    assert len(store.read_compressed(digest)) < len(data) / 10
+    assert store.get_blob(digest) == data
+    assert store.put_blob(data) == (digest, False)
+
+def test_gc_frees_only_unreferenced_blobs(tmp_path):
+    store = BlobStore(root=tmp_path)
+    store.put_snapshot("1", "2", "2024-01-01", make_part(["alpha ", "beta "]))
+    store.put_snapshot("1", "2", "2024-02-01", make_part(["alpha ", "gamma "]))
+
+    assert store.gc()["removed"] == 0
+
+    store.delete_snapshot("1", "2", "2024-01-01")
+    result = store.gc()
+    assert result["removed"] == 2
+    assert result["bytes_freed"] > 0
+    assert store.get_snapshot("1", "2") == make_part(["alpha ", "gamma "])
+    assert store.snapshots() == [("1", "2", "2024-02-01")]
+
+def test_stores_sharing_a_root_keep_each_others_snapshots(tmp_path):
+    app = BlobStore(root=tmp_path)
+    pipeline = BlobStore(root=tmp_path)
+    app.put_snapshot("1", "2", "2024-01-01", make_part(["alpha "]))
+    pipeline.put_snapshot("1", "3", "2024-01-01", make_part(["beta "]))
+    app.put_snapshot("1", "4", "2024-01-01", make_part(["gamma "]))
+
+    assert BlobStore(root=tmp_path).snapshots() == [
+        ("1", "2", "2024-01-01"), ("1", "3", "2024-01-01"), ("1", "4", "2024-01-01")]
+    assert app.gc()["removed"] == 0
+    assert app.get_snapshot("1", "3") == make_part(["beta "])
+
+def test_missing_blobs_can_be_fetched_from_elsewhere(tmp_path):
+    source = BlobStore(root=tmp_path / "source")
+    manifest_hash, new_hashes = source.put_snapshot(
+        "1", "2", "2024-01-01", make_part(["alpha "]))
+
+    target = BlobStore(root=tmp_path / "target")
+    with pytest.raises(KeyError):
+        target.get_content(manifest_hash)
+    content = target.get_content(manifest_hash, fetch_missing=source.read_compressed)
+    assert content == make_part(["alpha "])
+    assert target.stats()["blobs"] == len(new_hashes)
@@ -0,0 +1,73 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_columnar_store.py -v
+"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+
+def test_sample_data_round_trips_with_declared_dtypes(tmp_path):
+    store = ColumnarStore(root=tmp_path)
+    df = pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=4, freq="D"),
+        "value": [1.0, 2.0, 3.0, 4.0],
+        "category": ["A", "B", "A", "B"],
+        "metric1": [0.1, 0.2, 0.3, 0.4],
+        "metric2": [1.1, 1.2, 1.3, 1.4],
+    })
+    store.write("sample_data", df)
+
+    result = store.read("sample_data")
+    assert pd.api.types.is_datetime64_any_dtype(result["date"])
+    assert isinstance(result["category"].dtype, pd.CategoricalDtype)
+    assert result["value"].tolist() == df["value"].tolist()
+
+def test_partitions_are_read_individually_or_together(tmp_path):
+    store = ColumnarStore(root=tmp_path)
+    for title in (1, 2):
+        store.write(
+            "ecfr_parts",
+            pd.DataFrame({"title_number": [title] * 2, "identifier": ["1", "2"]}),
+            partition={"title": title})
+
+    one = store.read("ecfr_parts", partition={"title": 2})
+    assert one["title_number"].tolist() == [2, 2]
+
+    both = store.read("ecfr_parts")
+    assert len(both) == 4
+    filtered = store.read("ecfr_parts", filters=[("title", "=", 1)])
+    assert filtered["title_number"].unique().tolist() == [1]
+
+def test_dataset_reads_skip_partial_writes(tmp_path):
+    store = ColumnarStore(root=tmp_path)
+    store.write("ecfr_parts", pd.DataFrame({"identifier": ["1"]}), partition={"title": 1})
+
+    def interrupted_write(table, where, **kwargs):
+        # A write in progress: its temporary file is not valid Parquet yet
+        Path(where).write_bytes(b"PAR1 partial")
+        assert store.read("ecfr_parts")["identifier"].tolist() == ["1"]
+        raise OSError("interrupted")
+
+    with patch("StreamLitApp.app.utils.columnar_store.pq.write_table", interrupted_write):
+        with pytest.raises(OSError):
+            store.write("ecfr_parts", pd.DataFrame({"identifier": ["2"]}), partition={"title": 2})
+    assert store.read("ecfr_parts")["identifier"].tolist() == ["1"]
+
+def test_nested_api_fields_are_stored_as_json(tmp_path):
+    store = ColumnarStore(root=tmp_path)
+    df = pd.DataFrame({
+        "slug": ["a", "b"],
+        "cfr_references": [[{"title": 7, "chapter": "I"}], [{"title": 2}]],
+        "children": [[], [{"name": "x"}]],
+    })
+    store.write("ecfr_agencies", df)
+    assert store.read("ecfr_agencies")["slug"].tolist() == ["a", "b"]
+
+def test_missing_dataset_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ColumnarStore(root=tmp_path).read("ecfr_titles")
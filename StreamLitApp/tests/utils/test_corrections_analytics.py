@@ -0,0 +1,107 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_corrections_analytics.py -v
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+from StreamLitApp.app.utils.corrections_analytics import (
+    CorrectionsStore,
+    agency_correction_rates,
+    corrections_frame,
+    corrections_per_title_year,
+    time_to_correct,
+)
+from StreamLitApp.app.utils.regulation_size import agency_references
+
+def correction(id, title, occurred, corrected, chapter="", part="1"):
+    return {
+        "id": id,
+        "title": title,
+        "year": int(corrected[:4]),
+        "corrective_action": "Amended",
+        "fr_citation": "88 FR 1",
+        "error_occurred": occurred,
+        "error_corrected": corrected,
+        "last_modified": corrected,
+        "cfr_references": [{
+            "cfr_reference": f"{title} CFR {part}",
+            "hierarchy": {"title": str(title), "chapter": chapter, "part": part},
+        }],
+    }
+
+CORRECTIONS = [
+    correction(1, 7, "2022-01-01", "2022-01-11", chapter="I"),
+    correction(2, 7, "2022-06-01", "2023-06-01", chapter="I"),
+    correction(3, 12, "2023-01-01", "2023-01-03", part="1026"),
+]
+
+def test_corrections_frame_is_typed():
+    corrections, references = corrections_frame(CORRECTIONS)
+
+    assert isinstance(corrections["title"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(corrections["error_corrected"])
+    assert corrections["days_to_correct"].tolist() == [10, 365, 2]
+    assert references["part"].tolist() == ["1", "1", "1026"]
+
+def test_aggregations():
+    corrections, references = corrections_frame(CORRECTIONS)
+
+    per_year = corrections_per_title_year(corrections)
+    assert per_year.loc["7"].tolist() == [1, 1]
+    assert per_year.loc["12"].tolist() == [0, 1]
+
+    summary = time_to_correct(corrections).set_index("title")
+    assert summary.loc["7", "count"] == 2
+    assert summary.loc["12", "p50"] == 2
+
+    agencies = agency_references({"agencies": [
+        {"name": "Agriculture", "slug": "usda",
+         "cfr_references": [{"title": 7, "chapter": "I"}], "children": []},
+        {"name": "CFPB", "slug": "cfpb",
+         "cfr_references": [{"title": 12, "part": "1026"}], "children": []},
+    ]})
+    rates = agency_correction_rates(corrections, references, agencies)
+    assert dict(zip(rates["agency_slug"], rates["corrections"])) == {"usda": 2, "cfpb": 1}
+    assert rates["corrections_per_year"].tolist() == [1.0, 0.5]
+
+@patch("StreamLitApp.app.utils.corrections_analytics.admin_api")
+def test_refresh_fetches_only_days_since_last_refresh(mock_api, tmp_path):
+    mock_api.get_corrections.return_value = (200, True, {"ecfr_corrections": CORRECTIONS})
+    store = CorrectionsStore(ColumnarStore(root=tmp_path))
+    store.refresh(today=date(2023, 6, 1))
+    mock_api.get_corrections.assert_called_once_with(error_corrected_date=None)
+
+    mock_api.get_corrections.reset_mock()
+    new = correction(4, 12, "2023-01-01", "2023-06-02", part="1026")
+    mock_api.get_corrections.side_effect = lambda error_corrected_date: (
+        200, True,
+        {"ecfr_corrections": [new] if error_corrected_date == "2023-06-02" else []})
+
+    corrections, references = store.refresh(today=date(2023, 6, 3))
+    dates = [call.kwargs["error_corrected_date"]
+             for call in mock_api.get_corrections.call_args_list]
+    assert dates == ["2023-06-01", "2023-06-02", "2023-06-03"]
+    assert sorted(corrections["id"].tolist()) == [1, 2, 3, 4]
+    assert len(references) == 4
+    assert len(store.load()[0]) == 4
+
+@patch("StreamLitApp.app.utils.corrections_analytics.admin_api")
+def test_refresh_long_after_the_last_correction_stays_incremental(mock_api, tmp_path):
+    mock_api.get_corrections.return_value = (200, True, {"ecfr_corrections": CORRECTIONS})
+    store = CorrectionsStore(ColumnarStore(root=tmp_path))
+    store.refresh(today=date(2024, 3, 1))
+    assert store.last_refresh() == date(2024, 3, 1)
+
+    mock_api.get_corrections.reset_mock()
+    mock_api.get_corrections.return_value = (200, True, {"ecfr_corrections": []})
+    corrections, _ = store.refresh(today=date(2024, 3, 2))
+    dates = [call.kwargs["error_corrected_date"]
+             for call in mock_api.get_corrections.call_args_list]
+    assert dates == ["2024-03-01", "2024-03-02"]
+    assert len(corrections) == 3
+    assert store.last_refresh() == date(2024, 3, 2)
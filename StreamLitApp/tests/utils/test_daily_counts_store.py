@@ -0,0 +1,72 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_daily_counts_store.py -v
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+from StreamLitApp.app.utils.daily_counts_store import DailyCountsStore
+
+@patch("StreamLitApp.app.utils.daily_counts_store.search_api")
+def test_only_days_after_last_stored_day_are_fetched(mock_api, tmp_path):
+    mock_api.get_counts_daily.return_value = (200, True, {"dates": {
+        "2024-01-01": 3, "2024-01-02": 5}})
+    store = DailyCountsStore(ColumnarStore(root=tmp_path))
+
+    counts = store.get("Congress*", ["usda"], today=date(2024, 1, 2))
+    assert counts["count"].tolist() == [3, 5]
+    mock_api.get_counts_daily.assert_called_once_with(
+        "Congress*", agency_slugs=["usda"], last_modified_on_or_after=None)
+
+    # Same day: served locally.
+    mock_api.get_counts_daily.reset_mock()
+    store.get("Congress*", ["usda"], today=date(2024, 1, 2))
+    mock_api.get_counts_daily.assert_not_called()
+
+    # Next day: only the new days are requested and merged in.
+    mock_api.get_counts_daily.return_value = (200, True, {"dates": {"2024-01-03": 7}})
+    counts = DailyCountsStore(ColumnarStore(root=tmp_path)).get(
+        "Congress*", ["usda"], today=date(2024, 1, 3))
+    mock_api.get_counts_daily.assert_called_once_with(
+        "Congress*", agency_slugs=["usda"], last_modified_on_or_after="2024-01-03")
+    assert counts["count"].tolist() == [3, 5, 7]
+
+@patch("StreamLitApp.app.utils.daily_counts_store.search_api")
+def test_get_many_fetches_each_agency(mock_api, tmp_path):
+    def counts_daily(query, agency_slugs=None, last_modified_on_or_after=None):
+        return 200, True, {"dates": {"2024-01-01": len(agency_slugs[0])}}
+    mock_api.get_counts_daily.side_effect = counts_daily
+
+    store = DailyCountsStore(ColumnarStore(root=tmp_path), max_workers=4)
+    counts = store.get_many("tax", ["a", "bb", "ccc"], today=date(2024, 1, 1))
+    assert dict(zip(counts["agency_slug"], counts["count"])) == {"a": 1, "bb": 2, "ccc": 3}
+    assert mock_api.get_counts_daily.call_count == 3
+
+@patch("StreamLitApp.app.utils.daily_counts_store.search_api")
+def test_failed_fetch_raises(mock_api, tmp_path):
+    mock_api.get_counts_daily.return_value = (500, False, {"error": "down"})
+    store = DailyCountsStore(ColumnarStore(root=tmp_path))
+    with pytest.raises(RuntimeError):
+        store.get("tax")
+    assert store.stored("tax").empty
+
+@patch("StreamLitApp.app.utils.daily_counts_store.search_api")
+def test_stores_sharing_a_root_keep_each_others_refreshes(mock_api, tmp_path):
+    mock_api.get_counts_daily.return_value = (200, True, {"dates": {"2024-01-01": 3}})
+    today = date(2024, 1, 2)
+    first = DailyCountsStore(ColumnarStore(root=tmp_path))
+    second = DailyCountsStore(ColumnarStore(root=tmp_path))
+
+    first.get("Congress*", ["usda"], today=today)
+    second.get("Congress*", ["epa"], today=today)
+    assert mock_api.get_counts_daily.call_count == 2
+
+    # Each store sees the other's refresh, on disk and in memory
+    reopened = DailyCountsStore(ColumnarStore(root=tmp_path))
+    assert sorted(entry["agency_slugs"][0] for entry in reopened._manifest.values()) == ["epa", "usda"]
+    first.get("Congress*", ["epa"], today=today)
+    assert mock_api.get_counts_daily.call_count == 2
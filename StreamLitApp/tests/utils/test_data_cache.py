@@ -0,0 +1,192 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_data_cache.py -v
+"""
+
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from StreamLitApp.app.utils.data_cache import DataCache
+from StreamLitApp.app.utils.ecfr_service import FALLBACK_TTL, ECFRService
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_per_namespace_ttl():
+    clock = FakeClock()
+    cache = DataCache(default_ttl=10, ttls={"parts": 100}, clock=clock)
+    loads = []
+    load = lambda: loads.append(1) or len(loads)
+
+    assert cache.get("titles", None, load) == 1
+    assert cache.get("parts", "12", load) == 2
+    clock.now = 50
+    assert cache.get("titles", None, load) == 3
+    assert cache.get("parts", "12", load) == 2
+    assert cache.metrics()["hits"] == 1
+
+def test_least_recently_used_entries_are_evicted():
+    cache = DataCache(max_entries=2)
+    cache.put("parts", "1", "a")
+    cache.put("parts", "2", "b")
+    cache.get("parts", "1", lambda: "reloaded")
+    cache.put("parts", "3", "c")
+
+    assert cache.get("parts", "1", lambda: "reloaded") == "a"
+    assert cache.get("parts", "2", lambda: "reloaded") == "reloaded"
+    assert cache.metrics()["evictions"] == 2
+
+def test_concurrent_loads_of_one_entry_run_the_loader_once():
+    cache = DataCache()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.2)
+        return "titles"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("titles", None, slow_load)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["titles"] * 8
+    assert len(calls) == 1
+
+def test_uncacheable_values_are_returned_but_not_kept():
+    cache = DataCache()
+    assert cache.get("titles", None, lambda: pd.DataFrame(), cacheable=lambda df: not df.empty).empty
+    assert cache.metrics()["entries"] == 0
+
+def test_invalidate_and_refresh():
+    cache = DataCache()
+    for title in ("1", "2"):
+        cache.put("parts", title, f"parts {title}")
+        cache.put("history", (title, "5", 10), f"history {title}")
+    cache.put("titles", None, "titles")
+
+    assert cache.invalidate("history", match=lambda key: key[0] == "1") == 1
+    assert cache.invalidate("parts") == 2
+    assert cache.metrics()["namespaces"] == {"history": 1, "titles": 1}
+    assert cache.refresh("titles", None, lambda: "new titles") == "new titles"
+    assert cache.get("titles", None, lambda: "other") == "new titles"
+    assert cache.invalidate() == 2
+
+def test_load_overtaken_by_invalidate_is_not_cached():
+    cache = DataCache()
+    started, release = threading.Event(), threading.Event()
+
+    def stale_load():
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    loader = threading.Thread(target=lambda: cache.get("parts", "12", stale_load))
+    loader.start()
+    started.wait(5)
+    cache.invalidate("parts", "12")
+    release.set()
+    loader.join()
+
+    assert cache.metrics()["entries"] == 0
+    assert cache.get("parts", "12", lambda: "fresh") == "fresh"
+
+def test_cacheable_can_shorten_the_time_to_live():
+    clock = FakeClock()
+    cache = DataCache(default_ttl=3600, clock=clock)
+    assert cache.get("titles", None, lambda: "backup", cacheable=lambda value: 60) == "backup"
+    clock.now = 61
+    assert cache.get("titles", None, lambda: "fetched") == "fetched"
+
+@patch("StreamLitApp.app.utils.ecfr_service.requests")
+@patch("StreamLitApp.app.utils.ecfr_service.get_delta_sync")
+@patch("StreamLitApp.app.utils.ecfr_service.get_write_behind_queue")
+@patch("StreamLitApp.app.utils.ecfr_service.get_supabase_client", return_value=None)
+def test_service_retries_soon_after_falling_back_to_a_backup(
+        mock_supabase, mock_writer, mock_delta_sync, mock_requests, tmp_path):
+    clock = FakeClock()
+    service = ECFRService(
+        cache=DataCache(ttls={"parts": 6 * 3600}, clock=clock),
+        refresh_state_path=tmp_path / "refresh_state.json")
+    service.store = MagicMock()
+    service.store.read.return_value = pd.DataFrame({"identifier": ["1"], "title_number": [12]})
+    mock_requests.get.side_effect = ConnectionError("offline")
+
+    assert list(service.fetch_title_parts(12)["identifier"]) == ["1"]
+    service.fetch_title_parts(12)
+    assert mock_requests.get.call_count == 1
+    clock.now = FALLBACK_TTL + 1
+    service.fetch_title_parts(12)
+    assert mock_requests.get.call_count == 2
+
+@patch("StreamLitApp.app.utils.ecfr_service.get_delta_sync")
+@patch("StreamLitApp.app.utils.ecfr_service.get_write_behind_queue")
+@patch("StreamLitApp.app.utils.ecfr_service.get_supabase_client")
+def test_service_drops_a_refreshed_titles_data(mock_supabase, mock_writer, mock_delta_sync, tmp_path):
+    service = ECFRService(refresh_state_path=tmp_path / "refresh_state.json")
+    frame = pd.DataFrame({"identifier": ["1"]})
+    service._load_titles = MagicMock(return_value=frame)
+    service._load_title_parts = MagicMock(return_value=frame)
+
+    service.fetch_titles()
+    service.fetch_title_parts(12)
+    service.fetch_title_parts(12)
+    service.fetch_title_parts(40)
+    assert service._load_title_parts.call_count == 2
+
+    pipeline = MagicMock()
+    pipeline.add_listener(service.on_title_refreshed)
+    listener = pipeline.add_listener.call_args.args[0]
+    listener({"title": 12, "mode": "delta", "parts_fetched": 1,
+              "sections_updated": 3, "sections_removed": 0})
+
+    assert service.cache_metrics()["namespaces"] == {"parts": 1}
+    service.fetch_title_parts(12)
+    service.fetch_titles()
+    assert service._load_title_parts.call_count == 3
+    assert service._load_titles.call_count == 2
+
+def write_refresh_state(path, synced, mtime):
+    path.write_text(json.dumps({
+        title: {"latest_issue_date": "2024-01-01", "synced_at": synced_at}
+        for title, synced_at in synced.items()
+    }))
+    os.utime(path, ns=(mtime, mtime))
+
+@patch("StreamLitApp.app.utils.ecfr_service.get_delta_sync")
+@patch("StreamLitApp.app.utils.ecfr_service.get_write_behind_queue")
+@patch("StreamLitApp.app.utils.ecfr_service.get_supabase_client")
+def test_service_follows_a_pipeline_in_another_process(mock_supabase, mock_writer, mock_delta_sync, tmp_path):
+    state_path = tmp_path / "refresh_state.json"
+    write_refresh_state(state_path, {"12": "2024-01-01T00:00", "40": "2024-01-01T00:00"}, 1)
+    service = ECFRService(refresh_state_path=state_path)
+    service._load_title_parts = MagicMock(return_value=pd.DataFrame({"identifier": ["1"]}))
+
+    service.fetch_title_parts(12)
+    service.fetch_title_parts(40)
+    assert service.check_refreshes() == []
+
+    # The pipeline process refreshed title 12
+    write_refresh_state(state_path, {"12": "2024-01-02T00:00", "40": "2024-01-01T00:00"}, 2)
+    service.fetch_title_parts(12)
+    service.fetch_title_parts(40)
+    assert [call.args for call in service._load_title_parts.call_args_list] == [(12,), (40,), (12,)]
+
+    # A title synced for the first time counts as refreshed
+    write_refresh_state(state_path, {"12": "2024-01-02T00:00", "40": "2024-01-01T00:00",
+                                     "7": "2024-01-02T00:00"}, 3)
+    assert service.check_refreshes() == ["7"]
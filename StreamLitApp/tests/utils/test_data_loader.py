@@ -0,0 +1,28 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_data_loader.py -v
+"""
+
+import os
+from unittest.mock import patch
+
+from StreamLitApp.app.utils import data_loader
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+
+def test_edited_csv_replaces_the_parquet_copy(tmp_path):
+    csv_path = tmp_path / "sample_data.csv"
+    csv_path.write_text("date,value,category\n2023-01-01,1,A\n")
+    store = ColumnarStore(root=tmp_path / "columnar")
+    data_loader._load_sample_data.clear()
+
+    with patch.object(data_loader, "csv_path", csv_path), \
+            patch.object(data_loader, "ColumnarStore", return_value=store):
+        assert data_loader.load_sample_data()["value"].tolist() == [1]
+        # Read back from the Parquet copy while the CSV is unchanged
+        csv_path.write_text("date,value,category\n2023-01-01,2,A\n")
+        os.utime(csv_path, ns=(0, 0))
+        assert data_loader.load_sample_data()["value"].tolist() == [1]
+
+        os.utime(csv_path)
+        assert data_loader.load_sample_data()["value"].tolist() == [2]
+        assert data_loader.load_indexed_data() is not None
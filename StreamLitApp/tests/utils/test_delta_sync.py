@@ -0,0 +1,115 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_delta_sync.py -v
+"""
+
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+
+from StreamLitApp.app.utils.delta_sync import DeltaSync
+
+def make_parts(rows):
+    return pd.DataFrame(
+        [{"title_number": 1, "identifier": identifier, "name": name}
+         for identifier, name in rows])
+
+def test_only_new_or_changed_rows_are_upserted(tmp_path):
+    supabase = MagicMock()
+    sync = DeltaSync(supabase, manifest_path=tmp_path / "manifest.json")
+    keys = ["title_number", "identifier"]
+
+    report = sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "b")]),
+                       key_columns=keys, scope=1)
+    assert (report["written"], report["skipped"]) == (2, 0)
+
+    supabase.reset_mock()
+    report = sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "changed")]),
+                       key_columns=keys, scope=1)
+    assert (report["written"], report["skipped"]) == (1, 1)
+    upserted = supabase.table.return_value.upsert.call_args[0][0]
+    assert upserted == [{"title_number": 1, "identifier": "2", "name": "changed"}]
+
+    supabase.reset_mock()
+    report = sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "changed")]),
+                       key_columns=keys, scope=1)
+    assert (report["written"], report["skipped"]) == (0, 2)
+    supabase.table.return_value.upsert.assert_not_called()
+
+def test_missing_rows_are_tombstoned_within_scope(tmp_path):
+    supabase = MagicMock()
+    sync = DeltaSync(supabase, manifest_path=tmp_path / "manifest.json")
+    keys = ["title_number", "identifier"]
+
+    sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "b")]),
+              key_columns=keys, scope=1)
+    sync.sync("ecfr_parts", make_parts([("9", "z")]), key_columns=keys, scope=2)
+
+    supabase.reset_mock()
+    report = sync.sync("ecfr_parts", make_parts([("1", "a")]),
+                       key_columns=keys, scope=1)
+    assert report["tombstoned"] == 1
+    update = supabase.table.return_value.update
+    assert "deleted_at" in update.call_args[0][0]
+    update.return_value.match.assert_called_once_with(
+        {"title_number": 1, "identifier": "2"})
+    assert list(sync.tombstones("ecfr_parts", scope=1)) == ['[1, "2"]']
+    assert sync.tombstones("ecfr_parts", scope=2) == {}
+
+def test_manifest_persists_across_instances(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    df = make_parts([("1", "a")])
+    DeltaSync(MagicMock(), manifest_path=manifest_path).sync(
+        "ecfr_parts", df, key_columns=["title_number", "identifier"])
+
+    report = DeltaSync(MagicMock(), manifest_path=manifest_path).sync(
+        "ecfr_parts", df, key_columns=["title_number", "identifier"])
+    assert report["skipped"] == 1
+
+def test_failed_upsert_does_not_record_hashes(tmp_path):
+    supabase = MagicMock()
+    supabase.table.return_value.upsert.return_value.execute.side_effect = \
+        RuntimeError("down")
+    sync = DeltaSync(supabase, manifest_path=tmp_path / "manifest.json")
+    df = make_parts([("1", "a")])
+
+    with pytest.raises(RuntimeError, match="down"):
+        sync.sync("ecfr_parts", df, key_columns=["identifier"])
+
+    supabase.table.return_value.upsert.return_value.execute.side_effect = None
+    assert sync.sync("ecfr_parts", df, key_columns=["identifier"])["written"] == 1
+
+def test_returning_row_clears_its_tombstone(tmp_path):
+    supabase = MagicMock()
+    sync = DeltaSync(supabase, manifest_path=tmp_path / "manifest.json")
+    keys = ["title_number", "identifier"]
+    sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "b")]), key_columns=keys)
+    sync.sync("ecfr_parts", make_parts([("1", "a")]), key_columns=keys)
+
+    supabase.reset_mock()
+    report = sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "b")]), key_columns=keys)
+    assert report["written"] == 1
+    upserted = supabase.table.return_value.upsert.call_args[0][0]
+    assert upserted == [{"title_number": 1, "identifier": "2", "name": "b", "deleted_at": None}]
+    assert sync.tombstones("ecfr_parts") == {}
+
+def test_failed_tombstone_keeps_upserted_rows_and_is_retried(tmp_path):
+    supabase = MagicMock()
+    sync = DeltaSync(supabase, manifest_path=tmp_path / "manifest.json")
+    keys = ["title_number", "identifier"]
+    sync.sync("ecfr_parts", make_parts([("1", "a"), ("2", "b")]), key_columns=keys)
+
+    update = supabase.table.return_value.update.return_value.match.return_value.execute
+    update.side_effect = RuntimeError("column ecfr_parts.deleted_at does not exist")
+    df = make_parts([("1", "changed")])
+    with pytest.raises(RuntimeError, match="nullable deleted_at column"):
+        sync.sync("ecfr_parts", df, key_columns=keys)
+    assert sync.tombstones("ecfr_parts") == {}
+
+    update.side_effect = None
+    supabase.reset_mock()
+    report = DeltaSync(supabase, manifest_path=tmp_path / "manifest.json").sync(
+        "ecfr_parts", df, key_columns=keys)
+    assert (report["written"], report["tombstoned"]) == (0, 1)
+    supabase.table.return_value.update.return_value.match.assert_called_once_with(
+        {"title_number": 1, "identifier": "2"})
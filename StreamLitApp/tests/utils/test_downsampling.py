@@ -0,0 +1,48 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_downsampling.py -v
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from StreamLitApp.app.utils.downsampling import (
+    benchmark, downsample, lttb_indices, minmax_indices)
+
+def series(points=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=points, freq="D"),
+        "value": np.cumsum(rng.normal(size=points)),
+    })
+
+def test_lttb_keeps_endpoints_and_budget():
+    data = series()
+    positions = lttb_indices(data["date"], data["value"], 500)
+    assert len(positions) == 500
+    assert positions[0] == 0 and positions[-1] == len(data) - 1
+    assert (np.diff(positions) > 0).all()
+
+def test_minmax_keeps_every_spike():
+    data = series()
+    data.loc[1234, "value"] = 1e6
+    data.loc[4321, "value"] = -1e6
+    positions = minmax_indices(data["value"], 100)
+    assert len(positions) <= 202
+    assert {1234, 4321} <= set(positions)
+
+def test_downsample_returns_rows_within_budget():
+    data = series()
+    assert downsample(data, "date", "value", 20_000) is data
+    for method in ["lttb", "minmax"]:
+        sampled = downsample(data, "date", "value", 1000, method)
+        assert len(sampled) <= 1000
+        assert sampled["date"].is_monotonic_increasing
+    with pytest.raises(ValueError):
+        downsample(data, "date", "value", 1000, "other")
+
+def test_benchmark_shrinks_payload():
+    report = benchmark(points=50_000, max_points=1000).set_index("method")
+    assert report.loc["full", "points"] == 50_000
+    assert report.loc["lttb", "payload_bytes"] < report.loc["full", "payload_bytes"] / 10
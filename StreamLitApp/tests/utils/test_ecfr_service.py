@@ -0,0 +1,42 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_ecfr_service.py -v
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from StreamLitApp.app.utils.blob_store import BlobStore
+from StreamLitApp.app.utils.ecfr_service import ECFRService
+
+@patch("StreamLitApp.app.utils.ecfr_service.get_delta_sync")
+@patch("StreamLitApp.app.utils.ecfr_service.get_write_behind_queue")
+@patch("StreamLitApp.app.utils.ecfr_service.get_supabase_client")
+def test_blobs_of_a_failed_upload_are_sent_again(mock_supabase, mock_writer, mock_delta_sync, tmp_path):
+    service = ECFRService()
+    service.blobs = BlobStore(root=tmp_path)
+    remote = set()
+    blobs_table = MagicMock()
+    blobs_table.select.return_value.in_.side_effect = lambda column, hashes: MagicMock(
+        execute=MagicMock(return_value=MagicMock(
+            data=[{"hash": digest} for digest in hashes if digest in remote])))
+    service.supabase.table.return_value = blobs_table
+
+    manifest_hash, _ = service.blobs.put_snapshot("1", "2", "2024-01-01", {
+        "sections": [{"identifier": "2.1", "text": "alpha " * 80}]})
+    blobs_table.upsert.return_value.execute.side_effect = RuntimeError("down")
+    with pytest.raises(RuntimeError, match="down"):
+        service._upload_blobs(manifest_hash)
+
+    # The snapshot is stored locally again, with nothing new, and every blob
+    # Supabase lacks is still uploaded
+    _, new_hashes = service.blobs.put_snapshot("1", "2", "2024-01-02", {
+        "sections": [{"identifier": "2.1", "text": "alpha " * 80}]})
+    assert new_hashes == []
+    blobs_table.upsert.return_value.execute.side_effect = None
+    uploaded = service._upload_blobs(manifest_hash)
+    assert set(uploaded) == service.blobs.manifest_hashes(manifest_hash)
+
+    remote.update(uploaded)
+    assert service._upload_blobs(manifest_hash) == []
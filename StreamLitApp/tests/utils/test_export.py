@@ -0,0 +1,116 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_export.py -v
+"""
+
+import io
+import os
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+from StreamLitApp.app.utils.export import (
+    EXPORT_MAX_AGE, csv_chunks, export_chunks, export_name, iter_frame_batches,
+    iter_search_results, iter_store_batches, parquet_chunks, write_export)
+
+def search_page(page, total_pages, per_page=2):
+    results = [
+        {"type": "Section", "hierarchy": {"title": "12", "part": str(page * 10 + i)}}
+        for i in range(per_page)
+    ]
+    if page == 2:
+        # A field the first page did not have is dropped
+        results[0]["score"] = 1.5
+    return 200, True, {"results": results, "meta": {"current_page": page, "total_pages": total_pages}}
+
+@patch("StreamLitApp.app.utils.export.search_api")
+def test_search_results_follow_pagination_into_csv(mock_api):
+    mock_api.get_results.side_effect = lambda query, per_page, page, **filters: search_page(page, 3)
+
+    csv = b"".join(csv_chunks(iter_search_results("tax", per_page=2, agency_slugs=["irs"])))
+    df = pd.read_csv(io.BytesIO(csv))
+
+    assert mock_api.get_results.call_count == 3
+    assert mock_api.get_results.call_args.kwargs == {"per_page": 2, "page": 3, "agency_slugs": ["irs"]}
+    assert list(df.columns) == ["type", "hierarchy.title", "hierarchy.part"]
+    assert list(df["hierarchy.part"]) == [10, 11, 20, 21, 30, 31]
+
+@patch("StreamLitApp.app.utils.export.search_api")
+def test_failed_search_page_raises(mock_api):
+    mock_api.get_results.return_value = (503, False, None)
+    with pytest.raises(RuntimeError, match="503"):
+        list(iter_search_results("tax"))
+
+def test_parquet_chunks_write_one_row_group_per_batch():
+    df = pd.DataFrame({"n": np.arange(10), "note": [None] * 5 + list("abcde")})
+    data = b"".join(parquet_chunks(iter_frame_batches(df, batch_size=5)))
+
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 2
+    read = parquet.read().to_pandas()
+    assert list(read["n"]) == list(range(10))
+    assert list(read["note"][5:]) == list("abcde")
+
+def test_store_export_is_written_in_bounded_batches(tmp_path):
+    store = ColumnarStore(root=tmp_path / "columnar")
+    for title in (1, 2):
+        store.write("ecfr_parts", pd.DataFrame({"identifier": np.arange(1000) + title * 1000}),
+                    partition={"title": title})
+
+    batches = list(iter_store_batches(store, "ecfr_parts", batch_size=300))
+    assert max(len(batch) for batch in batches) <= 300
+    assert sum(len(batch) for batch in batches) == 2000
+
+    path = write_export(iter_store_batches(store, "ecfr_parts", partition={"title": 2}),
+                        export_name("parts", "title 2"), "parquet", root=tmp_path / "exports")
+    assert path.name.startswith("parts_title_2_") and path.suffix == ".parquet"
+    assert pq.read_table(path).num_rows == 1000
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="xlsx"):
+        export_chunks([], "xlsx")
+
+@patch("StreamLitApp.app.utils.export.search_api")
+def test_parquet_export_takes_later_pages_with_other_types(mock_api):
+    pages = {
+        1: [{"score": 2, "note": None}],
+        2: [{"score": 1.5, "note": 3}],
+        3: [{"score": 1, "note": "text"}],
+    }
+    mock_api.get_results.side_effect = lambda query, per_page, page, **filters: \
+        (200, True, {"results": pages[page], "meta": {"total_pages": 3}})
+
+    data = b"".join(parquet_chunks(iter_search_results("tax", per_page=1)))
+
+    read = pq.read_table(io.BytesIO(data)).to_pandas()
+    assert list(read["score"]) == [2.0, 1.5, 1.0]
+    assert list(read["note"][1:]) == ["3.0", "text"]
+
+def test_exports_of_the_same_query_are_kept_apart_and_old_ones_removed(tmp_path):
+    df = pd.DataFrame({"n": [1, 2]})
+    stale = tmp_path / "ecfr_results_tax_0000.csv"
+    stale.write_text("n\n0\n")
+    old = time.time() - EXPORT_MAX_AGE - 60
+    os.utime(stale, (old, old))
+
+    first = write_export(iter_frame_batches(df), export_name("ecfr_results", "tax"), root=tmp_path)
+    second = write_export(iter_frame_batches(df), export_name("ecfr_results", "tax"), root=tmp_path)
+
+    assert first != second
+    assert sorted(tmp_path.iterdir()) == sorted([first, second])
+    assert export_name("ecfr_results", "tax", "irs", "treasury") == "ecfr_results_tax_irs_treasury"
+
+def test_interrupted_export_leaves_no_file(tmp_path):
+    def batches():
+        yield pd.DataFrame({"n": [1]})
+        raise RuntimeError("offline")
+
+    with pytest.raises(RuntimeError, match="offline"):
+        write_export(batches(), "tax", root=tmp_path)
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,67 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_figure_renderer.py -v
+"""
+
+import gc
+import tracemalloc
+
+import pandas as pd
+
+from StreamLitApp.app.utils.figure_renderer import FigureRenderer, figure_key, render_png
+
+def draw_bars(ax, data, query):
+    ax.barh(data["agency_name"], data["total_count"])
+    ax.set_title(query)
+
+def results(seed):
+    return pd.DataFrame({
+        "agency_name": [f"Agency {i}" for i in range(20)],
+        "total_count": [(seed * 7 + i) % 50 for i in range(20)],
+    })
+
+def test_figure_key_depends_on_data_and_params():
+    assert figure_key(results(1), "tax") == figure_key(results(1), "tax")
+    assert figure_key(results(1), "tax") != figure_key(results(2), "tax")
+    assert figure_key(results(1), "tax") != figure_key(results(1), "fee")
+
+def test_renders_once_per_key_and_evicts():
+    renderer = FigureRenderer(max_entries=2)
+    png = renderer.render("a", draw_bars, results(1), "tax", figsize=(4, 3))
+    assert png.startswith(b"\x89PNG")
+    assert renderer.render("a", draw_bars, results(1), "tax") is png
+    assert renderer.submit("a", draw_bars, results(1), "tax").result() is png
+    assert (renderer.renders, renderer.hits) == (1, 2)
+
+    renderer.submit("b", draw_bars, results(2), "tax").result()
+    renderer.submit("c", draw_bars, results(3), "tax").result()
+    assert len(renderer) == 2
+
+def test_memory_stays_flat_over_many_renders():
+    import matplotlib.pyplot as plt
+
+    renderer = FigureRenderer(max_entries=4)
+
+    def run(count, offset):
+        for seed in range(offset, offset + count):
+            renderer.render(str(seed), draw_bars, results(seed).head(5), "tax",
+                            figsize=(2, 2), dpi=50)
+
+    run(5, 0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(10, 5)
+        gc.collect()
+        baseline, _ = tracemalloc.get_traced_memory()
+        run(25, 15)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Figures are not left open with pyplot, and 25 more renders do not
+    # grow memory beyond the bounded cache's churn.
+    assert plt.get_fignums() == []
+    assert current - baseline < 1_000_000
+    assert render_png(draw_bars, results(0), "tax", figsize=(2, 2)).startswith(b"\x89PNG")
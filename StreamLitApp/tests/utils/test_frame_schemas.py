@@ -0,0 +1,49 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_frame_schemas.py -v
+"""
+
+import pandas as pd
+
+from StreamLitApp.app.utils.frame_schemas import apply_schema, memory_report
+
+def history_records(rows=2000):
+    return pd.DataFrame({
+        "title_number": ["12"] * rows,
+        "part_number": [str(1000 + i % 40) for i in range(rows)],
+        "identifier": [f"{1000 + i % 40}.{i % 25}" for i in range(rows)],
+        "type": ["section"] * rows,
+        "version_date": ["2024-01-%02d" % (1 + i % 28) for i in range(rows)],
+        "removed": [i % 100 == 0 for i in range(rows)],
+    }).astype(object)
+
+def test_history_is_typed_and_smaller():
+    raw = history_records()
+    typed = apply_schema(raw, "ecfr_history")
+
+    assert str(typed["title_number"].dtype) == "Int16"
+    assert str(typed["part_number"].dtype) == "Int32"
+    assert isinstance(typed["identifier"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(typed["version_date"])
+    assert str(typed["removed"].dtype) == "boolean"
+    # The input is not modified.
+    assert raw["title_number"].dtype == object
+
+    report = memory_report(typed, untyped=raw)
+    total = report.iloc[-1]
+    assert total["column"] == "total"
+    assert total["bytes"] < total["untyped_bytes"] / 4
+
+def test_non_numeric_part_numbers_are_kept_as_categories():
+    raw = pd.DataFrame({"title_number": ["1", None], "part_number": ["2", "2a"]})
+    typed = apply_schema(raw, "ecfr_history")
+
+    assert typed["title_number"].tolist()[0] == 1
+    assert typed["title_number"].isna().tolist() == [False, True]
+    assert typed["part_number"].tolist() == ["2", "2a"]
+
+def test_undeclared_tables_and_empty_frames_pass_through():
+    df = pd.DataFrame({"a": [1]})
+    assert apply_schema(df, "other") is df
+    empty = pd.DataFrame()
+    assert apply_schema(empty, "ecfr_titles") is empty
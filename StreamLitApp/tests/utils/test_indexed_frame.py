@@ -0,0 +1,47 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_indexed_frame.py -v
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from StreamLitApp.app.utils.indexed_frame import TimeIndexedFrame
+
+def sample(rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=rows, freq="6h")[rng.permutation(rows)],
+        "value": rng.normal(size=rows),
+        "category": rng.choice(["A", "B", "C"], size=rows),
+    })
+
+def test_filter_matches_a_full_scan():
+    data = sample()
+    indexed = TimeIndexedFrame(data)
+    assert indexed.categories == ["A", "B", "C"]
+    assert indexed.frame.index.is_monotonic_increasing
+
+    for start, end, category in [
+        (date(2023, 1, 10), date(2023, 2, 1), None),
+        (date(2023, 1, 10), date(2023, 1, 10), "B"),
+        (date(2022, 1, 1), date(2030, 1, 1), "C"),
+        (date(2023, 3, 1), date(2023, 2, 1), "A"),
+    ]:
+        expected = data[
+            (data["date"].dt.date >= start) & (data["date"].dt.date <= end)
+            & ((data["category"] == category) if category else True)
+        ].sort_values("date")
+        result = indexed.filter(start, end, category)
+        assert result["date"].tolist() == expected["date"].tolist()
+        assert result["value"].tolist() == expected["value"].tolist()
+
+def test_date_range_is_a_view_and_unknown_category_is_empty():
+    indexed = TimeIndexedFrame(sample())
+    result = indexed.filter(date(2023, 1, 2), date(2023, 1, 3))
+    assert np.shares_memory(result["value"].to_numpy(), indexed.frame["value"].to_numpy())
+    assert len(result) == 8
+    assert indexed.filter(category="Z").empty
+    assert len(indexed.filter(category="All")) == len(indexed)
@@ -0,0 +1,97 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_prefetcher.py -v
+"""
+
+import threading
+from concurrent.futures import wait
+from unittest.mock import MagicMock
+
+from StreamLitApp.app.utils.prefetcher import Prefetcher
+
+def test_prefetches_structure_then_most_viewed_and_listed_parts():
+    service = MagicMock()
+    structures = MagicMock()
+    prefetcher = Prefetcher(service, structures, max_workers=1, top_parts=3)
+    for part, views in (("1", 1), ("5", 3), ("7", 2)):
+        for _ in range(views):
+            prefetcher.record_view(12, part)
+    prefetcher.record_view(40, "9")
+
+    assert prefetcher.popular_parts(12) == ["5", "7", "1"]
+    assert prefetcher.likely_parts(12, ["2", "5", "3"]) == ["5", "7", "1"]
+    prefetcher.top_parts = 4
+    wait(prefetcher.prefetch(12, "2024-01-01", parts=["2", "5", "3"], session="a"))
+
+    structures.get.assert_called_once_with("2024-01-01", "12")
+    assert [call.args for call in service.fetch_part_content.call_args_list] == \
+        [("12", "5"), ("12", "7"), ("12", "1"), ("12", "2")]
+    service.fetch_title_parts.assert_not_called()
+    assert prefetcher.metrics()["completed"] == 5
+
+def test_unviewed_title_prefetches_its_first_parts():
+    service = MagicMock()
+    prefetcher = Prefetcher(service, max_workers=1, top_parts=2)
+    wait(prefetcher.prefetch(12, parts=[1, 2, 3]))
+    assert [call.args for call in service.fetch_part_content.call_args_list] == [("12", "1"), ("12", "2")]
+
+def test_rerun_with_same_selection_does_not_fetch_again():
+    service = MagicMock()
+    prefetcher = Prefetcher(service)
+    first = prefetcher.prefetch(12, parts=["1"], session="a")
+    assert prefetcher.prefetch(12, parts=["1"], session="a") == first
+    wait(first)
+    assert service.fetch_part_content.call_count == 1
+
+def test_new_selection_cancels_pending_fetches_only_for_its_session():
+    release = threading.Event()
+    service = MagicMock()
+    service.fetch_part_content.side_effect = lambda title, part: release.wait(5)
+    prefetcher = Prefetcher(service, max_workers=1)
+
+    prefetcher.prefetch(1, parts=["1"], session="a")
+    queued_b = prefetcher.prefetch(2, parts=["1"], session="b")
+    queued_a = prefetcher.prefetch(3, parts=["1"], session="a")
+    replaced = prefetcher.prefetch(4, parts=["1"], session="a")
+    release.set()
+    wait(queued_b + replaced)
+
+    assert all(future.cancelled() for future in queued_a)
+    assert [call.args[0] for call in service.fetch_part_content.call_args_list] == ["1", "2", "4"]
+    assert prefetcher.metrics() == {"completed": 3, "cancelled": 1, "failed": 0, "pending": 0}
+
+def test_only_the_most_recent_sessions_are_tracked():
+    release = threading.Event()
+    service = MagicMock()
+    service.fetch_part_content.side_effect = lambda title, part: release.wait(5)
+    prefetcher = Prefetcher(service, max_workers=1, max_sessions=2)
+
+    running = prefetcher.prefetch(1, parts=["1"], session="a")
+    evicted = prefetcher.prefetch(2, parts=["1"], session="b")
+    prefetcher.prefetch(1, parts=["1"], session="a")
+    kept = prefetcher.prefetch(3, parts=["1"], session="c")
+    release.set()
+    wait(running + kept)
+
+    assert list(prefetcher._active) == ["a", "c"]
+    assert all(future.cancelled() for future in evicted)
+    assert prefetcher.metrics()["cancelled"] == 1
+
+def test_structure_waits_for_the_sessions_prefetch():
+    release = threading.Event()
+    index = object()
+    structures = MagicMock()
+    structures.get.side_effect = lambda date, title: release.wait(5) and index
+    prefetcher = Prefetcher(MagicMock(), structures)
+
+    prefetcher.prefetch(12, "2024-01-01", session="a")
+    threading.Timer(0.05, release.set).start()
+    assert prefetcher.structure(12, "2024-01-01", session="a") is index
+    assert Prefetcher(MagicMock()).structure(12, "2024-01-01") is None
+
+def test_failed_fetches_are_counted():
+    service = MagicMock()
+    service.fetch_part_content.side_effect = RuntimeError("offline")
+    prefetcher = Prefetcher(service)
+    wait(prefetcher.prefetch(12, parts=["1"]))
+    assert prefetcher.metrics()["failed"] == 1
@@ -0,0 +1,106 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_refresh_pipeline.py -v
+"""
+
+from unittest.mock import patch
+
+from StreamLitApp.app.utils.blob_store import BlobStore
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+from StreamLitApp.app.utils.refresh_pipeline import RefreshPipeline
+
+def section_xml(identifier, text):
+    return (
+        f'<DIV8 N="{identifier}" TYPE="SECTION">'
+        f'<HEAD>§ {identifier} Heading.</HEAD><P>{text}</P></DIV8>')
+
+def part_xml(part, sections):
+    body = "".join(section_xml(identifier, text) for identifier, text in sections)
+    return f'<DIV5 N="{part}" TYPE="PART"><HEAD>PART {part}</HEAD>{body}</DIV5>'
+
+def title_xml(parts):
+    body = "".join(part_xml(part, sections) for part, sections in parts.items())
+    return f'<DIV1 N="1" TYPE="TITLE">{body}</DIV1>'
+
+def titles_response(issue_date):
+    return 200, True, {"titles": [
+        {"number": 1, "name": "General Provisions", "latest_amended_on": issue_date,
+         "latest_issue_date": issue_date, "up_to_date_as_of": issue_date,
+         "reserved": False},
+        {"number": 35, "name": "Reserved", "reserved": True},
+    ]}
+
+def make_pipeline(tmp_path):
+    return RefreshPipeline(
+        state_path=tmp_path / "state.json",
+        blobs=BlobStore(root=tmp_path / "blobs"),
+        store=ColumnarStore(root=tmp_path / "columnar"))
+
+@patch("StreamLitApp.app.utils.refresh_pipeline.versioner_api")
+def test_first_run_downloads_title_once_then_only_changed_parts(mock_api, tmp_path):
+    parts = {
+        "1": [("1.1", "one two three"), ("1.2", "four five")],
+        "2": [("2.1", "six seven")],
+    }
+    mock_api.get_titles.return_value = titles_response("2024-01-01")
+    mock_api.get_title_source_route.return_value = (200, True, title_xml(parts))
+
+    pipeline = make_pipeline(tmp_path)
+    reports = pipeline.run()
+    assert [report["mode"] for report in reports] == ["full"]
+    assert reports[0]["sections_updated"] == 3
+    assert pipeline.word_counts.frame("1")["word_count"].sum() == 7
+    assert pipeline.search_index.search("seven") == [("1", "2.1")]
+
+    # Nothing changed: no downloads at all.
+    mock_api.get_title_source_route.reset_mock()
+    assert pipeline.run() == []
+    mock_api.get_title_source_route.assert_not_called()
+
+    # Section 1.2 is amended and 2.1 removed.
+    mock_api.get_titles.return_value = titles_response("2024-02-01")
+    mock_api.get_versions.return_value = (200, True, {"content_versions": [
+        {"identifier": "1.2", "part": "1", "issue_date": "2024-02-01", "removed": False},
+        {"identifier": "2.1", "part": "2", "issue_date": "2024-02-01", "removed": True},
+    ]})
+    mock_api.get_title_source_route.return_value = (
+        200, True, part_xml("1", [("1.1", "one two three"), ("1.2", "amended text here now")]))
+
+    listener_reports = []
+    pipeline.add_listener(listener_reports.append)
+    reports = pipeline.run()
+
+    assert reports == listener_reports
+    assert reports[0]["mode"] == "incremental"
+    assert reports[0]["parts_fetched"] == 1
+    assert reports[0]["sections_updated"] == 1
+    assert reports[0]["sections_removed"] == 1
+    mock_api.get_versions.assert_called_once_with("1", issue_date_gte="2024-01-02")
+    mock_api.get_title_source_route.assert_called_once_with("2024-02-01", "1", part="1")
+
+    counts = pipeline.word_counts.frame("1").set_index("identifier")["word_count"]
+    assert counts.to_dict() == {"1.1": 3, "1.2": 4}
+    assert pipeline.search_index.search("amended") == [("1", "1.2")]
+    assert pipeline.search_index.search("seven") == []
+
+@patch("StreamLitApp.app.utils.refresh_pipeline.versioner_api")
+def test_state_and_indexes_persist_across_runs(mock_api, tmp_path):
+    mock_api.get_titles.return_value = titles_response("2024-01-01")
+    mock_api.get_title_source_route.return_value = (
+        200, True, title_xml({"1": [("1.1", "alpha beta")]}))
+    make_pipeline(tmp_path).run()
+
+    pipeline = make_pipeline(tmp_path)
+    assert pipeline.last_sync("1")["latest_issue_date"] == "2024-01-01"
+    assert pipeline.changed_titles() == []
+    assert pipeline.search_index.search("alpha beta") == [("1", "1.1")]
+
+@patch("StreamLitApp.app.utils.refresh_pipeline.versioner_api")
+def test_failed_title_is_reported_and_retried(mock_api, tmp_path):
+    mock_api.get_titles.return_value = titles_response("2024-01-01")
+    mock_api.get_title_source_route.return_value = (500, False, {"error": "down"})
+
+    pipeline = make_pipeline(tmp_path)
+    assert "error" in pipeline.run()[0]
+    assert pipeline.last_sync("1") is None
+    assert len(pipeline.changed_titles()) == 1
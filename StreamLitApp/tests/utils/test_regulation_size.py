@@ -0,0 +1,86 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_regulation_size.py -v
+"""
+
+from unittest.mock import patch
+
+from StreamLitApp.app.ParseeCFR.structure_index import StructureIndex
+from StreamLitApp.app.utils.regulation_size import (
+    agency_references,
+    attribute_nodes,
+    estimate_agency_sizes,
+    flatten_structure,
+    rollup_agency_sizes,
+)
+
+def node(node_type, identifier, children=(), size=0):
+    return {"type": node_type, "identifier": identifier, "size": size,
+            "children": list(children)}
+
+def title_structure(number, chapters):
+    return node("title", number, [
+        node("chapter", chapter, [
+            node("part", part, [
+                node("section", f"{part}.{i}", size=size)
+                for i, size in enumerate(sizes, start=1)
+            ])
+            for part, sizes in parts.items()
+        ])
+        for chapter, parts in chapters.items()
+    ])
+
+STRUCTURES = {
+    "12": title_structure("12", {"X": {"1026": [100, 200]}, "II": {"200": [50]}}),
+    "2": title_structure("2", {"XXXIV": {"3400": [10]}}),
+}
+
+AGENCIES = {"agencies": [
+    {"name": "Treasury", "slug": "treasury",
+     "cfr_references": [{"title": 12, "chapter": "II"}],
+     "children": [
+         {"name": "CFPB", "slug": "cfpb",
+          "cfr_references": [{"title": 12, "chapter": "X"}, {"title": 12, "part": "1026"}]},
+         {"name": "Fiscal", "slug": "fiscal",
+          "cfr_references": [{"title": 12, "part": "1026"}]},
+     ]},
+    {"name": "Education", "slug": "education",
+     "cfr_references": [{"title": 2, "chapter": "XXXIV"}], "children": []},
+]}
+
+def test_flatten_structure_keeps_leaves_with_enclosing_levels():
+    nodes = flatten_structure(StructureIndex.from_structure(STRUCTURES["12"]), "12")
+
+    assert nodes["identifier"].tolist() == ["1026.1", "1026.2", "200.1"]
+    assert nodes["chapter"].tolist() == ["X", "X", "II"]
+    assert nodes["part"].tolist() == ["1026", "1026", "200"]
+    assert nodes["size"].sum() == 350
+
+def test_sizes_roll_up_without_double_counting():
+    nodes = flatten_structure(StructureIndex.from_structure(STRUCTURES["12"]), "12")
+    attributed = attribute_nodes(nodes, agency_references(AGENCIES))
+    agency_sizes, parent_sizes = rollup_agency_sizes(attributed)
+
+    sizes = dict(zip(agency_sizes["agency_slug"], agency_sizes["size"]))
+    # CFPB references part 1026 twice (by chapter and by part).
+    assert sizes == {"cfpb": 300, "fiscal": 300, "treasury": 50}
+
+    parents = parent_sizes.set_index("parent_slug")
+    assert parents.loc["treasury", "size"] == 350
+    assert parents.loc["treasury", "agency_name"] == "Treasury"
+
+@patch("StreamLitApp.app.utils.regulation_size.versioner_api")
+def test_estimate_agency_sizes_uses_cached_structures(mock_api):
+    mock_api.get_titles.return_value = (200, True, {"titles": [
+        {"number": 2, "up_to_date_as_of": "2024-01-01", "reserved": False},
+        {"number": 12, "up_to_date_as_of": "2024-01-02", "reserved": False},
+        {"number": 35, "reserved": True},
+    ]})
+
+    class Cache:
+        def get(self, date, title):
+            return StructureIndex.from_structure(STRUCTURES[title])
+
+    _, parent_sizes = estimate_agency_sizes(AGENCIES, cache=Cache())
+    sizes = dict(zip(parent_sizes["parent_slug"], parent_sizes["size"]))
+    assert sizes == {"treasury": 350, "education": 10}
@@ -0,0 +1,75 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_size_timeseries.py -v
+"""
+
+from unittest.mock import patch
+
+import pandas as pd
+
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+from StreamLitApp.app.utils.size_timeseries import (
+    SizeTimeSeries,
+    agency_series,
+    title_series,
+)
+
+def part_xml(part, sections):
+    body = "".join(
+        f'<DIV8 N="{identifier}" TYPE="SECTION"><HEAD>§ {identifier}</HEAD><P>{text}</P></DIV8>'
+        for identifier, text in sections)
+    return f'<DIV5 N="{part}" TYPE="PART">{body}</DIV5>'
+
+SNAPSHOTS = {
+    ("2017-01-01", None): '<DIV1 N="12" TYPE="TITLE">' + part_xml("1", [
+        ("1.1", "one two"), ("1.2", "three")]) + part_xml("2", [("2.1", "four five six")]) + "</DIV1>",
+    ("2018-01-01", "1"): part_xml("1", [("1.1", "one two seven eight"), ("1.2", "three")]),
+    ("2019-01-01", "2"): part_xml("2", [("2.1", "four"), ("2.2", "new words here")]),
+}
+
+VERSIONS = [
+    {"identifier": "1.1", "part": "1", "issue_date": "2017-01-01", "removed": False},
+    {"identifier": "1.1", "part": "1", "issue_date": "2018-01-01", "removed": False},
+    {"identifier": "1.2", "part": "1", "issue_date": "2019-01-01", "removed": True},
+    {"identifier": "2.1", "part": "2", "issue_date": "2019-01-01", "removed": False},
+    {"identifier": "2.2", "part": "2", "issue_date": "2019-01-01", "removed": False},
+]
+
+def source_route(snapshot_date, title, part=None):
+    return 200, True, SNAPSHOTS[(snapshot_date, part)]
+
+def versions(title, issue_date_gte=None):
+    return 200, True, {"content_versions": [
+        v for v in VERSIONS if v["issue_date"] >= issue_date_gte]}
+
+@patch("StreamLitApp.app.utils.size_timeseries.versioner_api")
+def test_series_recounts_only_changed_parts(mock_api, tmp_path):
+    mock_api.get_title_source_route.side_effect = source_route
+    mock_api.get_versions.side_effect = versions
+
+    builder = SizeTimeSeries(store=ColumnarStore(root=tmp_path))
+    series = builder.build("12", "2017-01-01")
+
+    assert builder.parts_fetched == 3
+    totals = title_series(series)
+    assert totals["word_count"].tolist() == [6, 8, 8]
+    assert totals["sections"].tolist() == [3, 3, 3]
+    assert pd.api.types.is_datetime64_any_dtype(totals["date"])
+
+    by_agency = agency_series(series, pd.DataFrame({
+        "title": ["12", "12"], "part": ["1", "2"], "agency_slug": ["a", "b"]}))
+    latest = by_agency[by_agency["date"] == "2019-01-01"]
+    assert dict(zip(latest["agency_slug"], latest["word_count"])) == {"a": 4, "b": 4}
+
+@patch("StreamLitApp.app.utils.size_timeseries.versioner_api")
+def test_later_runs_continue_from_stored_state(mock_api, tmp_path):
+    mock_api.get_title_source_route.side_effect = source_route
+    mock_api.get_versions.side_effect = versions
+
+    SizeTimeSeries(store=ColumnarStore(root=tmp_path)).build(
+        "12", "2017-01-01", end_date="2018-01-01")
+
+    builder = SizeTimeSeries(store=ColumnarStore(root=tmp_path))
+    series = builder.build("12", "2017-01-01")
+    assert builder.parts_fetched == 1
+    assert title_series(series)["word_count"].tolist() == [6, 8, 8]
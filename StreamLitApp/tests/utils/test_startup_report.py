@@ -0,0 +1,42 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_startup_report.py -v
+
+STARTUP_IMPORT_BUDGET_SECONDS overrides the budget, e.g. on slow CI machines.
+"""
+
+import os
+import subprocess
+import sys
+
+from StreamLitApp.app.utils.startup_report import (
+    LAZY_MODULES, app_dir, import_times, startup_imports, startup_report)
+
+BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "3.0"))
+
+def test_startup_imports_are_read_from_app_script():
+    statement = startup_imports()
+    assert "import streamlit as st" in statement
+    # Pages are imported when shown, not at startup.
+    assert "pages.overview" not in statement
+
+def test_startup_stays_within_import_budget():
+    report = startup_report()
+    assert report["lazy_loaded"] == []
+    assert report["total_seconds"] < BUDGET_SECONDS, report["slowest"]
+
+def test_first_page_does_not_load_other_pages_libraries():
+    times = import_times("import pages.overview")
+    loaded = set(times["module"])
+    for module in ["matplotlib", "seaborn", "supabase", "scipy", "nltk"]:
+        assert module in LAZY_MODULES
+        assert module not in loaded
+
+def test_pages_import_with_only_the_app_directory_on_the_path():
+    # As under `streamlit run app.py` from the app directory, without the
+    # repository root that conftest adds
+    env = {name: value for name, value in os.environ.items() if name != "PYTHONPATH"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import pages.overview, utils.prefetcher, utils.refresh_pipeline"],
+        cwd=str(app_dir), env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,72 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_structure_cache.py -v
+"""
+
+import threading
+from unittest.mock import patch
+
+import numpy as np
+
+from StreamLitApp.app.utils.structure_cache import StructureIndexCache
+
+STRUCTURE = {
+    "type": "title", "identifier": "1", "label": "Title 1",
+    "children": [{
+        "type": "part", "identifier": "2", "label": "Part 2",
+        "children": [{"type": "section", "identifier": "2.1", "label": "§ 2.1"}],
+    }],
+}
+
+@patch("StreamLitApp.app.utils.structure_cache.versioner_api")
+def test_structure_is_fetched_once_per_title_and_date(mock_api, tmp_path):
+    mock_api.get_structure.return_value = (200, True, STRUCTURE)
+    cache = StructureIndexCache(root=tmp_path)
+
+    assert not cache.is_cached("2024-01-01", "1")
+    ancestry = cache.ancestry("2024-01-01", "1", part="2", section="2.1")
+    assert [n["identifier"] for n in ancestry] == ["1", "2", "2.1"]
+    cache.get("2024-01-01", "1")
+    assert mock_api.get_structure.call_count == 1
+
+    # A new cache reads the index back from disk.
+    other = StructureIndexCache(root=tmp_path)
+    assert other.is_cached("2024-01-01", "1")
+    assert other.ancestry("2024-01-01", "1", section="2.1") == ancestry
+    assert mock_api.get_structure.call_count == 1
+
+    other.invalidate(title="1")
+    assert not other.is_cached("2024-01-01", "1")
+
+@patch("StreamLitApp.app.utils.structure_cache.versioner_api")
+def test_memory_cache_is_bounded(mock_api, tmp_path):
+    mock_api.get_structure.return_value = (200, True, STRUCTURE)
+    cache = StructureIndexCache(root=tmp_path, max_entries=2)
+    for day in ("01", "02", "03"):
+        cache.get(f"2024-01-{day}", "1")
+    assert len(cache._memory) == 2
+
+@patch("StreamLitApp.app.utils.structure_cache.versioner_api")
+def test_concurrent_saves_of_one_structure_use_their_own_temp_files(mock_api, tmp_path):
+    mock_api.get_structure.return_value = (200, True, STRUCTURE)
+    saved = []
+    barrier = threading.Barrier(2, timeout=5)
+    savez_compressed = np.savez_compressed
+
+    def savez(path, **arrays):
+        saved.append(path.name)
+        savez_compressed(path, **arrays)
+        # Both saves write before either renames
+        barrier.wait()
+
+    caches = [StructureIndexCache(root=tmp_path) for _ in range(2)]
+    with patch("StreamLitApp.app.utils.structure_cache.np.savez_compressed", side_effect=savez):
+        threads = [threading.Thread(target=cache.get, args=("2024-01-01", "1")) for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(set(saved)) == 2
+    assert [path.name for path in tmp_path.iterdir()] == ["title-1_2024-01-01.npz"]
+    assert StructureIndexCache(root=tmp_path).ancestry("2024-01-01", "1", section="2.1")
@@ -0,0 +1,48 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_table_window.py -v
+"""
+
+import numpy as np
+import pandas as pd
+
+from StreamLitApp.app.utils.table_window import TableWindow
+
+def frame():
+    return pd.DataFrame({
+        "name": ["Banking", "Energy", None, "Aeronautics", "Agriculture"],
+        "category": pd.Categorical(["B", "E", "E", "A", "A"]),
+        "value": [3.0, np.nan, 1.0, 5.0, 2.0],
+    }, index=[10, 11, 12, 13, 14])
+
+def test_pages_slice_the_frame_in_order():
+    window = TableWindow(frame())
+    rows, total = window.page(2, 2)
+    assert total == 5
+    assert list(rows.index) == [12, 13]
+    rows, _ = window.page(9, 2)
+    assert list(rows.index) == [14]
+
+def test_sort_puts_missing_values_last_both_ways():
+    window = TableWindow(frame())
+    assert list(window.page(1, 5, sort_by="value")[0].index) == [12, 14, 10, 13, 11]
+    assert list(window.page(1, 5, sort_by="value", ascending=False)[0].index) == [13, 10, 14, 12, 11]
+
+def test_search_matches_text_and_category_columns_ignoring_case():
+    window = TableWindow(frame())
+    assert window.count("AG") == 1
+    assert window.count("e") == 4
+    assert window.count("a", column="category") == 2
+    rows, total = window.page(1, 1, sort_by="value", ascending=False, query="a")
+    assert (list(rows.index), total) == ([13], 3)
+
+def test_sort_orders_and_searches_are_computed_once():
+    window = TableWindow(frame(), max_searches=1)
+    window.page(1, 2, sort_by="value", query="a")
+    order = window._order("value", True)
+    mask = window.matches("a")
+    window.page(2, 2, sort_by="value", query="a")
+    assert window._order("value", True) is order
+    assert window.matches("a") is mask
+    window.matches("b")
+    assert window.matches("a") is not mask
@@ -0,0 +1,69 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_term_matrix.py -v
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from StreamLitApp.app.utils.term_matrix import TermAgencyMatrix, get_term_agency_matrix
+
+TITLE_XML = """<DIV1 N="1" TYPE="TITLE">
+<DIV5 N="1" TYPE="PART"><DIV8 N="§ 1.1" TYPE="SECTION"><HEAD>§ 1.1</HEAD>
+<P>Permits and permits and fees.</P></DIV8></DIV5>
+<DIV5 N="2" TYPE="PART"><DIV8 N="§ 2.1" TYPE="SECTION"><HEAD>§ 2.1</HEAD>
+<P>Grants and fees.</P></DIV8></DIV5>
+</DIV1>"""
+
+PART_AGENCIES = {("1", "1"): ["epa"], ("1", "2"): ["epa", "ed"]}
+
+def test_heatmap_slices_keywords_by_agencies(tmp_path):
+    matrix = TermAgencyMatrix.build({"1": TITLE_XML}, PART_AGENCIES)
+
+    heatmap = matrix.heatmap(["Permits", "fees", "unknown"], ["ed", "epa", "dot"])
+    assert heatmap.values.tolist() == [[0, 2, 0], [1, 2, 0], [0, 0, 0]]
+    assert matrix.agency_totals().to_dict() == {"epa": 8, "ed": 3}
+
+    normalized = matrix.heatmap(["fees"], ["ed"], normalize=True)
+    assert normalized.loc["fees", "ed"] == pytest.approx(10_000 / 3)
+
+    matrix.save(tmp_path)
+    loaded = TermAgencyMatrix.load(tmp_path)
+    assert loaded.heatmap(["grants"]).values.tolist() == [[1, 1]]
+    assert TermAgencyMatrix.exists(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["matrix.npz", "vocabulary.json"]
+
+def test_empty_build():
+    matrix = TermAgencyMatrix.build([], PART_AGENCIES)
+    assert matrix.heatmap(["fees"], ["epa"]).values.tolist() == [[0]]
+
+def test_matrix_built_after_a_miss_is_picked_up(tmp_path):
+    with patch("StreamLitApp.app.utils.term_matrix.data_dir", tmp_path):
+        assert get_term_agency_matrix() is None
+        TermAgencyMatrix.build({"1": TITLE_XML}, PART_AGENCIES).save(tmp_path / "term_matrix")
+        assert get_term_agency_matrix().heatmap(["grants"]).values.tolist() == [[1, 1]]
+
+def test_rebuilt_matrix_is_picked_up(tmp_path):
+    root = tmp_path / "term_matrix"
+    with patch("StreamLitApp.app.utils.term_matrix.data_dir", tmp_path):
+        TermAgencyMatrix.build({"1": TITLE_XML}, PART_AGENCIES).save(root)
+        assert get_term_agency_matrix().agencies == ["epa", "ed"]
+
+        TermAgencyMatrix.build({"1": TITLE_XML}, {("1", "2"): ["ed"]}).save(root)
+        # Saved within the same clock tick as the first on coarse filesystems
+        os.utime(root / "vocabulary.json", ns=(1, 1))
+        assert get_term_agency_matrix().agencies == ["ed"]
+
+def test_matrix_not_matching_its_vocabulary_is_not_loaded(tmp_path):
+    root = tmp_path / "term_matrix"
+    TermAgencyMatrix.build({"1": TITLE_XML}, PART_AGENCIES).save(root)
+    # As if read between the two files of another save being replaced
+    TermAgencyMatrix.build({"1": TITLE_XML}, {("1", "2"): ["ed"]}).save(tmp_path / "other")
+    os.replace(tmp_path / "other" / "matrix.npz", root / "matrix.npz")
+
+    with pytest.raises(ValueError, match="does not match"):
+        TermAgencyMatrix.load(root)
+    with patch("StreamLitApp.app.utils.term_matrix.data_dir", tmp_path):
+        assert get_term_agency_matrix() is None
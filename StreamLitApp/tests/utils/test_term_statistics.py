@@ -0,0 +1,70 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_term_statistics.py -v
+"""
+
+import pickle
+from collections import Counter
+from unittest.mock import patch
+
+import pandas as pd
+
+from StreamLitApp.app.utils.term_statistics import (
+    AgencyTermStatistics, CountMinSketch, SpaceSaving, build_term_statistics, part_agency_map)
+
+TITLE_XML = """<DIV1 N="1" TYPE="TITLE">
+<DIV5 N="1" TYPE="PART"><DIV8 N="§ 1.1" TYPE="SECTION"><HEAD>§ 1.1</HEAD>
+<P>Permits and permits and fees.</P></DIV8></DIV5>
+<DIV5 N="2" TYPE="PART"><DIV8 N="§ 2.1" TYPE="SECTION"><HEAD>§ 2.1</HEAD>
+<P>Grants for grants.</P></DIV8></DIV5>
+</DIV1>"""
+
+def test_count_min_sketch_never_undercounts_and_merges():
+    a, b = CountMinSketch(epsilon=0.01), CountMinSketch(epsilon=0.01)
+    a.update(Counter({"permit": 5, "fee": 2}))
+    b.update(Counter({"permit": 3}))
+
+    assert list(a.merge(b).estimate(["permit", "fee"])) >= [8, 2]
+    assert a.total == 10
+
+def test_space_saving_keeps_heavy_hitters_in_fixed_capacity():
+    summary = SpaceSaving(capacity=5)
+    # a and b occur more than total / capacity = 46 times.
+    stream = ["a"] * 60 + ["b"] * 50 + [f"rare{i}" for i in range(100)] + ["c"] * 20
+    for term in stream:
+        summary.update({term: 1})
+
+    assert len(summary.counts) == 5
+    assert {"a", "b"} <= set(summary.counts)
+    # Counts are upper bounds, within the recorded error.
+    for term, true in [("a", 60), ("b", 50)]:
+        assert summary.counts[term] - summary.errors[term] <= true <= summary.counts[term]
+
+    restored = pickle.loads(pickle.dumps(summary))
+    restored.update({"a": 1})
+    assert restored.counts["a"] == summary.counts["a"] + 1
+
+def test_agency_top_terms_and_merge_across_titles():
+    part_agencies = part_agency_map(pd.DataFrame({
+        "title": ["1", "1", "1"], "part": ["1", "2", "2"],
+        "agency_slug": ["epa", "epa", "ed"],
+    }))
+    first = AgencyTermStatistics(epsilon=0.01, capacity=10).add_title("1", TITLE_XML, part_agencies)
+    second = AgencyTermStatistics(epsilon=0.01, capacity=10).add_title("1", TITLE_XML, part_agencies)
+
+    merged = first.merge(second)
+    top = merged.top_terms("epa", n=2)
+    assert top["term"].tolist() == ["grants", "permits"]
+    assert top["count"].tolist() == [4, 4]
+    # 'and' and 'for' are stopwords.
+    assert "and" not in merged.top_terms_frame()["term"].tolist()
+    assert merged.sections == Counter({"epa": 4, "ed": 2})
+
+@patch("StreamLitApp.app.utils.term_statistics.versioner_api")
+def test_build_term_statistics_fetches_each_title(mock_api):
+    mock_api.get_title_source_route.return_value = (200, True, TITLE_XML)
+    statistics = build_term_statistics(
+        ["1"], "2024-01-01", {("1", "1"): ["epa"]}, max_workers=1, epsilon=0.01)
+
+    assert statistics.top_terms("epa")["term"].tolist() == ["permits", "fees"]
+    assert statistics.memory_bytes() == statistics.sketches["epa"].table.nbytes
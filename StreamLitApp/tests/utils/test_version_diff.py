@@ -0,0 +1,90 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_version_diff.py -v
+"""
+
+from unittest.mock import patch
+
+from StreamLitApp.app.utils.blob_store import BlobStore
+from StreamLitApp.app.utils.columnar_store import ColumnarStore
+from StreamLitApp.app.utils.version_diff import SectionHashStore, VersionDiff, diff_text
+
+TEXT = {
+    ("2024-01-01", "1.1"): "Scope. This part applies to all agencies.",
+    ("2024-02-01", "1.1"): "Scope. This part applies to executive agencies.",
+    ("2024-01-01", "1.2"): "Definitions. Act means the Act.",
+    ("2024-02-01", "1.2"): "Definitions. Act means the Act.",
+    ("2024-02-01", "1.3"): "New section.",
+    ("2024-01-01", "1.4"): "Old section.",
+}
+
+def source_route(snapshot_date, title, part=None, section=None):
+    text = TEXT.get((snapshot_date, section))
+    if text is None:
+        return 404, False, None
+    return 200, True, (
+        f'<DIV8 N="{section}" TYPE="SECTION"><HEAD>§ {section}</HEAD><P>{text}</P></DIV8>')
+
+def make_diff(tmp_path):
+    return VersionDiff(SectionHashStore(store=ColumnarStore(root=tmp_path / "columnar")))
+
+def test_section_text_survives_snapshot_store_gc(tmp_path):
+    snapshots = BlobStore(root=tmp_path / "blobs")
+    snapshots.put_snapshot("1", "1", "2024-01-01", {"sections": []})
+    hashes = SectionHashStore(store=ColumnarStore(root=tmp_path / "columnar"))
+    digest = hashes.put("1", "2024-01-01", "1.1", TEXT[("2024-01-01", "1.1")])
+
+    snapshots.gc()
+    assert hashes.text(digest) == TEXT[("2024-01-01", "1.1")]
+    assert hashes.blobs.root == tmp_path / "section_text"
+
+@patch("StreamLitApp.app.utils.version_diff.versioner_api")
+def test_compare_fetches_only_candidate_sections_and_skips_equal_hashes(mock_api, tmp_path):
+    mock_api.get_versions.return_value = (200, True, {"content_versions": [
+        {"identifier": "1.1", "part": "1", "issue_date": "2024-01-15", "removed": False},
+        {"identifier": "1.1", "part": "1", "issue_date": "2024-02-01", "removed": False},
+        {"identifier": "1.2", "part": "1", "issue_date": "2024-02-01", "removed": False},
+        {"identifier": "1.3", "part": "1", "issue_date": "2024-02-01", "removed": False},
+        {"identifier": "1.4", "part": "1", "issue_date": "2024-02-01", "removed": True},
+    ]})
+    mock_api.get_title_source_route.side_effect = source_route
+
+    diffs, report = make_diff(tmp_path).compare("1", "2024-01-01", "2024-02-01")
+
+    mock_api.get_versions.assert_called_once_with(
+        "1", issue_date_gte="2024-01-02", issue_date_lte="2024-02-01")
+    for call in mock_api.get_title_source_route.call_args_list:
+        assert call.kwargs["section"] in {"1.1", "1.2", "1.3", "1.4"}
+    assert report["candidates"] == 4
+    assert report["skipped_unchanged"] == 1
+    assert report["sections_fetched"] == 7
+
+    statuses = {d["identifier"]: d["status"] for d in diffs}
+    assert statuses == {"1.1": "modified", "1.3": "added", "1.4": "removed"}
+    modified = next(d for d in diffs if d["identifier"] == "1.1")
+    assert modified["changes"] == [{
+        "op": "replace",
+        "before": ["This part applies to all agencies."],
+        "after": ["This part applies to executive agencies."],
+    }]
+
+@patch("StreamLitApp.app.utils.version_diff.versioner_api")
+def test_known_snapshot_hashes_are_not_fetched_again(mock_api, tmp_path):
+    mock_api.get_versions.return_value = (200, True, {"content_versions": [
+        {"identifier": "1.1", "part": "1", "issue_date": "2024-02-01", "removed": False},
+    ]})
+    mock_api.get_title_source_route.side_effect = source_route
+    make_diff(tmp_path).compare("1", "2024-01-01", "2024-02-01")
+
+    mock_api.get_title_source_route.reset_mock()
+    diffs, report = make_diff(tmp_path).compare("1", "2024-01-01", "2024-02-01")
+    mock_api.get_title_source_route.assert_not_called()
+    assert report["sections_fetched"] == 0
+    assert diffs[0]["status"] == "modified"
+
+def test_diff_text_reports_inserts_and_deletes():
+    changes = diff_text("A. B. C.", "A. C. D.")
+    assert changes == [
+        {"op": "delete", "before": ["B."], "after": []},
+        {"op": "insert", "before": [], "after": ["D."]},
+    ]
@@ -0,0 +1,73 @@
+"""
+USAGE:
+pytest StreamLitApp/tests/utils/test_write_behind.py -v
+"""
+
+import threading
+
+from StreamLitApp.app.utils.write_behind import WriteBehindQueue
+
+def test_submit_returns_before_write_runs():
+    queue = WriteBehindQueue()
+    release = threading.Event()
+    written = []
+
+    queue.submit("slow", lambda: (release.wait(), written.append("slow")))
+    assert written == []
+    assert queue.metrics()["depth"] == 1
+
+    release.set()
+    assert queue.flush(timeout=5)
+    assert written == ["slow"]
+    assert queue.metrics()["depth"] == 0
+    queue.shutdown()
+
+def test_pending_writes_for_same_key_are_coalesced():
+    queue = WriteBehindQueue()
+    release = threading.Event()
+    written = []
+
+    # Block the worker so the following writes stay pending.
+    queue.submit("blocker", release.wait)
+    for i in range(5):
+        queue.submit("ecfr_titles", lambda i=i: written.append(i))
+
+    metrics = queue.metrics()
+    assert metrics["depth"] == 2
+    assert metrics["coalesced"] == 4
+    assert metrics["lag_seconds"] >= 0
+
+    release.set()
+    queue.flush(timeout=5)
+    assert written == [4]
+    queue.shutdown()
+
+def test_failed_write_is_recorded_and_queue_keeps_running():
+    queue = WriteBehindQueue()
+    written = []
+
+    def fail():
+        raise RuntimeError("storage unavailable")
+
+    queue.submit("bad", fail)
+    queue.submit("good", lambda: written.append("good"))
+    queue.flush(timeout=5)
+
+    metrics = queue.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["written"] == 1
+    assert "storage unavailable" in metrics["last_error"]
+    assert written == ["good"]
+    queue.shutdown()
+
+def test_shutdown_flushes_pending_writes():
+    queue = WriteBehindQueue()
+    written = []
+    for i in range(10):
+        queue.submit(i, lambda i=i: written.append(i))
+    queue.shutdown(timeout=5)
+
+    assert sorted(written) == list(range(10))
+    # Writes submitted after shutdown run in the caller.
+    queue.submit("late", lambda: written.append("late"))
+    assert written[-1] == "late"
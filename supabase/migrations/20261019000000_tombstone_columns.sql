@@ -0,0 +1,7 @@
+-- Rows no longer returned by the eCFR API are tombstoned rather than deleted
+-- (utils/delta_sync.py): deleted_at is set when a row disappears from its
+-- fetch and cleared when it comes back.
+alter table ecfr_titles add column if not exists deleted_at timestamptz;
+alter table ecfr_agencies add column if not exists deleted_at timestamptz;
+alter table ecfr_parts add column if not exists deleted_at timestamptz;
+alter table ecfr_history add column if not exists deleted_at timestamptz;
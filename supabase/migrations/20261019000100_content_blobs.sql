@@ -0,0 +1,21 @@
+-- Part content is stored as compressed, content-addressed blobs
+-- (utils/blob_store.py): ecfr_content keeps the hash of a snapshot's
+-- manifest blob instead of the content itself, and ecfr_blobs holds every
+-- blob a manifest references, uploaded before the ecfr_content row
+-- (ECFRService._upload_blobs).
+create table if not exists ecfr_blobs (
+    -- SHA-256 of the blob's uncompressed bytes
+    hash text primary key,
+    -- Base64 of the compressed blob, as BlobStore.compress writes it
+    data text not null
+);
+
+alter table ecfr_content add column if not exists content_hash text;
+-- Rows written with content_hash no longer carry the content
+alter table ecfr_content alter column content drop not null;
+
+-- With row level security on, the app's anon key needs to read and write
+-- the blobs like the other ecfr_ tables:
+-- alter table ecfr_blobs enable row level security;
+-- create policy "ecfr_blobs read" on ecfr_blobs for select using (true);
+-- create policy "ecfr_blobs write" on ecfr_blobs for insert with check (true);